@@ -21,7 +21,7 @@ def amenities_no_id():
         - Return the new Amenity object in JSON format, with status code 201.
     """
     if request.method == 'GET':
-        amenities = storage.all(Amenity).values()
+        amenities = storage.query(Amenity)
         amenities_list = [amenity.to_dict() for amenity in amenities]
         return jsonify(amenities_list)
 
@@ -29,14 +29,8 @@ def cities_by_state(state_id):
         abort(404, 'Not found')
 
     if request.method == 'GET':
-        cities = []
-        if hasattr(state, 'cities'):
-            state_cities = [city.to_dict() for city in state.cities]
-        else:
-            all_cities = storage.all(City).values()
-            state_cities = [city.to_dict() for city in all_cities
-                            if city.state_id == state_id]
-        return jsonify(state_cities)
+        cities = storage.query(City, where={"state_id": state_id})
+        return jsonify([city.to_dict() for city in cities])
 
     if request.method == 'POST':
         if not request.is_json:
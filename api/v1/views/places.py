@@ -30,13 +30,8 @@ def places_by_city(city_id):
         abort(404, 'Not found')
 
     if request.method == 'GET':
-        if hasattr(city, 'places'):
-            places_list = [place.to_dict() for place in city.places]
-        else:
-            all_places = storage.all(Place).values()
-            places_list = [place.to_dict() for place in all_places
-                           if place.place_id == place_id]
-        return jsonify(places_list)
+        places = storage.query(Place, where={"city_id": city_id})
+        return jsonify([place.to_dict() for place in places])
 
     if request.method == 'POST':
         if not request.is_json:
@@ -57,6 +52,43 @@ def places_by_city(city_id):
         return jsonify(new_place.to_dict()), 201
 
 
+@app_views.route('/places/nearby', methods=['GET'], strict_slashes=False)
+def places_nearby():
+    """
+    Handle requests for the Place objects closest to a point.
+
+    GET:
+        - Expects the query parameters lat and lng, in degrees;
+          if missing or invalid, returns a 400 error with "Invalid lat/lng".
+        - Accepts radius_km (default 10) and limit (default 20);
+          if invalid, returns a 400 error with "Invalid radius_km/limit".
+        - Returns the Place objects within radius_km of the point,
+          nearest first, each with its "distance_km".
+    """
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+    except (KeyError, ValueError):
+        return make_response(jsonify({"error": "Invalid lat/lng"}), 400)
+    try:
+        radius_km = float(request.args.get("radius_km", 10))
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        radius_km = limit = 0
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        return make_response(jsonify({"error": "Invalid lat/lng"}), 400)
+    if not radius_km > 0 or limit < 1:
+        return make_response(
+            jsonify({"error": "Invalid radius_km/limit"}), 400)
+    places_list = []
+    for place, distance in storage.nearby(Place, lat, lng, radius_km,
+                                          limit):
+        place_dict = place.to_dict()
+        place_dict["distance_km"] = round(distance, 3)
+        places_list.append(place_dict)
+    return jsonify(places_list)
+
+
 @app_views.route('/places/<place_id>', methods=['GET', 'PUT', 'DELETE'],
                  strict_slashes=False)
 def places_by_id(place_id=None):
@@ -32,13 +32,8 @@ def reviews_by_place(place_id):
         abort(404, 'Not found')
 
     if request.method == 'GET':
-        if hasattr(place, 'reviews'):
-            reviews_list = [review.to_dict() for review in place.reviews]
-        else:
-            all_reviews = storage.all(Review).values()
-            reviews_list = [review.to_dict() for review in all_reviews
-                            if review.place_id == place_id]
-        return jsonify(reviews_list)
+        reviews = storage.query(Review, where={"place_id": place_id})
+        return jsonify([review.to_dict() for review in reviews])
 
     if request.method == 'POST':
         if not request.is_json:
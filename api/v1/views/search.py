@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Implements the keyword search over Place and Review objects."""
+from api.v1.views import app_views
+from flask import jsonify, make_response, request
+from models import storage
+from models.place import Place
+from models.review import Review
+
+types = {"place": Place, "review": Review}
+
+
+@app_views.route('/search', methods=['GET'], strict_slashes=False)
+def search():
+    """
+    Handle keyword search requests.
+
+    GET:
+        - Expects the query parameter q; if missing or blank,
+          returns a 400 error with "Missing q".
+        - Accepts type, place or review (default both);
+          if invalid, returns a 400 error with "Invalid type".
+        - Accepts limit (default 20); if invalid,
+          returns a 400 error with "Invalid limit".
+        - Returns the matching objects, best first, each with its "score".
+    """
+    query = request.args.get("q", "")
+    if not query.strip():
+        return make_response(jsonify({"error": "Missing q"}), 400)
+    kind = request.args.get("type")
+    if kind is not None and kind not in types:
+        return make_response(jsonify({"error": "Invalid type"}), 400)
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return make_response(jsonify({"error": "Invalid limit"}), 400)
+    found = []
+    for cls in [types[kind]] if kind else types.values():
+        found.extend(storage.search(cls, query, limit))
+    found.sort(key=lambda item: -item[1])
+    results = []
+    for obj, score in found[:limit]:
+        obj_dict = obj.to_dict()
+        obj_dict["score"] = round(score, 4)
+        results.append(obj_dict)
+    return jsonify(results)
@@ -18,7 +18,7 @@ def states_no_id():
         - Expects a JSON body; if missing or invalid, retiurns 400.
     """
     if request.method == 'GET':
-        states = storage.all(State).values()
+        states = storage.query(State)
         states_list = [state.to_dict() for state in states]
         return jsonify(states_list)
 
@@ -21,10 +21,12 @@ def users_no_id():
           return a 400 error with "Missing email".
         - If the JSON body does not contain the key "password",
           return a 400 error with "Missing password".
+        - If another User has the same email,
+          return a 400 error with "Email already exists".
         - Return the new User object in JSON format, with status code 201.
     """
     if request.method == 'GET':
-        users = storage.all(User).values()
+        users = storage.query(User)
         users_list = [user.to_dict() for user in users]
         return jsonify(users_list)
 
@@ -39,6 +41,11 @@ def users_no_id():
             return make_response(jsonify({"error": "Missing email"}), 400)
         if "password" not in json_data:
             return make_response(jsonify({"error": "Missing password"}), 400)
+        if not isinstance(json_data["email"], str):
+            return make_response(jsonify({"error": "Invalid email"}), 400)
+        if storage.find_by(User, "email", json_data["email"]) is not None:
+            return make_response(jsonify({"error": "Email already exists"}),
+                                 400)
         new_user = User(**json_data)
         storage.new(new_user)
         storage.save()
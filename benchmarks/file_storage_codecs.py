@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Compares the FileStorage codecs: encode time, decode time and file size
+
+usage: ./benchmarks/file_storage_codecs.py [count ...]
+
+Counts default to 10000 100000 1000000 synthetic objects, spread over
+the model classes. Decoding includes building the model instances.
+"""
+import os
+import sys
+import tempfile
+import time
+from models.amenity import Amenity
+from models.city import City
+from models.engine.codecs import codecs
+from models.engine.file_storage import classes
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+def synthetic(count):
+    """returns a dictionary of count objects keyed like FileStorage"""
+    makers = [
+        lambda i: State(name="State {:d}".format(i)),
+        lambda i: City(state_id="s", name="City {:d}".format(i)),
+        lambda i: User(email="u{:d}@hbnb.io".format(i), password="pwd",
+                       first_name="First", last_name="Last"),
+        lambda i: Amenity(name="Amenity {:d}".format(i)),
+        lambda i: Place(city_id="c", user_id="u", name="Place {:d}".format(i),
+                        description="A nice place " * 4, number_rooms=2,
+                        number_bathrooms=1, max_guest=4, price_by_night=90,
+                        latitude=37.77, longitude=-122.41),
+        lambda i: Review(place_id="p", user_id="u",
+                         text="Great stay, would come back " * 3),
+    ]
+    objects = {}
+    for i in range(count):
+        obj = makers[i % len(makers)](i)
+        objects[obj.__class__.__name__ + "." + obj.id] = obj
+    return objects
+
+
+def run(codec, objects, file_path):
+    """returns (encode seconds, decode seconds, file size) for codec"""
+    start = time.perf_counter()
+    codec.write(file_path, [codec.encode(key, obj)
+                            for key, obj in objects.items()])
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for key, record in codec.read(file_path):
+        classes[record["__class__"]](**record)
+    decode = time.perf_counter() - start
+    return encode, decode, os.path.getsize(file_path)
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print("{:>9} {:<11} {:>10} {:>10} {:>12}".format(
+        "objects", "codec", "encode s", "decode s", "bytes"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            objects = synthetic(count)
+            for name, codec in sorted(codecs.items()):
+                file_path = os.path.join(tmp, "file" + codec.extension)
+                encode, decode, size = run(codec, objects, file_path)
+                print("{:>9d} {:<11} {:>10.3f} {:>10.3f} {:>12d}".format(
+                    count, name, encode, decode, size))
+                os.remove(file_path)
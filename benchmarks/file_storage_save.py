@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Times FileStorage.save() with and without dirty-object tracking
+
+usage: ./benchmarks/file_storage_save.py [number of objects]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+def full_save(storage, file_path):
+    """serializes every object, like save() did before dirty tracking"""
+    json_objects = {}
+    for key, obj in storage.all().items():
+        json_objects[key] = obj.to_dict()
+    with open(file_path, 'w') as f:
+        json.dump(json_objects, f)
+
+
+def timed(func, *args):
+    """returns the seconds taken by func(*args)"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "file.json")
+        FileStorage._FileStorage__file_path = file_path
+        storage = FileStorage()
+        storage.delete_all()
+        for i in range(count):
+            if i % 2:
+                obj = Review(place_id="p", user_id="u", text="ok")
+            else:
+                obj = Place(city_id="c", user_id="u", name="P{}".format(i))
+            storage.new(obj)
+        print("{:d} objects".format(count))
+        print("first save (all dirty): {:8.3f}s".format(
+            timed(storage.save)))
+        print("full re-serialization:  {:8.3f}s".format(
+            timed(full_save, storage, file_path)))
+        obj.text = "changed"
+        print("save, 1 object dirty:   {:8.3f}s".format(
+            timed(storage.save)))
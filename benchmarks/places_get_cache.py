@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""
+Counts the database round-trips of repeated GET /api/v1/places/<id>
+with and without the DBStorage entity cache
+
+usage: ./benchmarks/places_get_cache.py [number of requests]
+
+Each mode runs in its own process on a temporary SQLite database, since
+the storage reads HBNB_DB_CACHE_SIZE when it is created.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(requests):
+    """serves the requests and prints statements, seconds and cache stats"""
+    from sqlalchemy import event
+    from api.v1.app import app
+    from models import storage
+    from models.city import City
+    from models.place import Place
+    from models.state import State
+    from models.user import User
+    state = State(name="California")
+    city = City(name="San Francisco", state_id=state.id)
+    user = User(email="bench@hbnb.io", password="pwd")
+    place = Place(name="Loft", city_id=city.id, user_id=user.id)
+    storage.bulk_new([state, city, user, place])
+    storage.close()
+    statements = []
+    event.listen(storage._DBStorage__engine, "before_cursor_execute",
+                 lambda *args: statements.append(1))
+    client = app.test_client()
+    url = "/api/v1/places/" + place.id
+    start = time.perf_counter()
+    for i in range(requests):
+        assert client.get(url).status_code == 200
+    seconds = time.perf_counter() - start
+    print(len(statements), seconds, storage.cache_stats())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(int(sys.argv[2]))
+        sys.exit(0)
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for size in ("0", "1024"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, HBNB_TYPE_STORAGE="sqlite",
+                       HBNB_SQLITE_PATH=os.path.join(tmp, "hbnb.db"),
+                       HBNB_DB_CACHE_SIZE=size)
+            out = subprocess.run([sys.executable, __file__, "--child",
+                                  str(requests)], env=env, check=True,
+                                 stdout=subprocess.PIPE,
+                                 universal_newlines=True).stdout.split(" ", 2)
+        label = "entity cache" if size != "0" else "no cache"
+        print("{:12s} {:6d} statements  {:8.3f} ms/request  {}".format(
+            label, int(out[0]), float(out[1]) / requests * 1000,
+            out[2].strip()))
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Times nearby-place lookups through the grid index against a full scan
+
+usage: ./benchmarks/places_nearby.py [number of places] [radius km]
+
+Places are spread uniformly between latitudes -60 and 70. The default is
+1000000 places and a 10 km radius, over 100 random query points.
+"""
+import random
+import sys
+import time
+from models.engine.indexes import GridIndex, haversine
+
+
+def brute_force(points, lat, lng, radius_km, limit):
+    """measures the distance to every point, like a scan of all(Place)"""
+    found = []
+    for key, (plat, plng) in points.items():
+        distance = haversine(lat, lng, plat, plng)
+        if distance <= radius_km:
+            found.append((distance, key))
+    found.sort()
+    return found[:limit]
+
+
+def timed(func, *args):
+    """returns the result of func(*args) and the seconds it took"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    radius_km = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    queries = 100
+    rand = random.Random(0)
+    points = {"Place.{:d}".format(i): (rand.uniform(-60, 70),
+                                       rand.uniform(-180, 180))
+              for i in range(count)}
+    index = GridIndex("latitude", "longitude")
+    start = time.perf_counter()
+    for key, (lat, lng) in points.items():
+        index.add(key, {"latitude": lat, "longitude": lng})
+    build = time.perf_counter() - start
+    targets = [(rand.uniform(-60, 70), rand.uniform(-180, 180))
+               for i in range(queries)]
+    indexed = scanned = 0.0
+    for lat, lng in targets[:5]:
+        expected, seconds = timed(brute_force, points, lat, lng,
+                                  radius_km, 20)
+        scanned += seconds
+        found = index.within(lat, lng, radius_km)[:20]
+        assert found == expected, "index and scan disagree"
+    for lat, lng in targets:
+        found, seconds = timed(index.within, lat, lng, radius_km)
+        indexed += seconds
+    print("{:d} places, {:g} km radius".format(count, radius_km))
+    print("grid build:       {:10.3f} s".format(build))
+    print("brute-force scan: {:10.3f} ms/query".format(scanned / 5 * 1000))
+    print("grid index:       {:10.3f} ms/query".format(
+        indexed / queries * 1000))
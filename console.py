@@ -66,8 +66,12 @@ class HBNBCommand(cmd.Cmd):
         else:
             print("** class doesn't exist **")
             return False
+        try:
+            instance.save()
+        except ValueError as error:
+            print("** {} **".format(error))
+            return False
         print(instance.id)
-        instance.save()
 
     def do_show(self, arg):
         """Prints an instance as a string based on the class and id"""
@@ -96,7 +100,7 @@ class HBNBCommand(cmd.Cmd):
             if len(args) > 1:
                 key = args[0] + "." + args[1]
                 if key in models.storage.all():
-                    models.storage.all().pop(key)
+                    models.storage.delete(models.storage.all()[key])
                     models.storage.save()
                 else:
                     print("** no instance found **")
@@ -147,8 +151,12 @@ class HBNBCommand(cmd.Cmd):
                                         args[3] = float(args[3])
                                     except:
                                         args[3] = 0.0
-                            setattr(models.storage.all()[k], args[2], args[3])
-                            models.storage.all()[k].save()
+                            try:
+                                setattr(models.storage.all()[k], args[2],
+                                        args[3])
+                                models.storage.all()[k].save()
+                            except ValueError as error:
+                                print("** {} **".format(error))
                         else:
                             print("** value missing **")
                     else:
@@ -7,6 +7,9 @@ from os import getenv
 
 
 storage_t = getenv("HBNB_TYPE_STORAGE")
+if storage_t == "sqlite":
+    # DBStorage runs the same SQLAlchemy models on an embedded SQLite file
+    storage_t = "db"
 
 if storage_t == "db":
     from models.engine.db_storage import DBStorage
@@ -23,22 +23,31 @@ class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
-        created_at = Column(DateTime, default=datetime.utcnow)
+        created_at = Column(DateTime, default=datetime.utcnow, index=True)
         updated_at = Column(DateTime, default=datetime.utcnow)
+    else:
+        # boolean - set by FileStorage once it holds the instance, kept out
+        # of __dict__ so that to_dict() and __str__ do not show it
+        __slots__ = ("__dict__", "__weakref__", "_stored")
+    # dictionary - kind of index of attributes: hash, unique, sorted,
+    # spatial for a (latitude, longitude) pair or text for words
+    indexed = {}
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
+        if models.storage_t != "db":
+            object.__setattr__(self, "_stored", False)
         if kwargs:
             for key, value in kwargs.items():
                 if key != "__class__":
                     setattr(self, key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
                 self.created_at = datetime.strptime(kwargs["created_at"], time)
-            else:
+            elif type(kwargs.get("created_at", None)) is not datetime:
                 self.created_at = datetime.utcnow()
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
                 self.updated_at = datetime.strptime(kwargs["updated_at"], time)
-            else:
+            elif type(kwargs.get("updated_at", None)) is not datetime:
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
                 self.id = str(uuid.uuid4())
@@ -47,6 +56,23 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute and flags the instance as changed
+
+            Only the attributes of a stored instance are checked and
+            flagged. Raises ValueError if value is taken in a unique index.
+            """
+            if not self._stored:
+                super().__setattr__(name, value)
+                return
+            storage = getattr(models, "storage", None)
+            if storage is not None:
+                storage.check_unique(self, name, value)
+            super().__setattr__(name, value)
+            if storage is not None:
+                storage.touch(self, name)
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
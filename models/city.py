@@ -12,12 +12,14 @@ class City(BaseModel, Base):
     """Representation of city """
     if models.storage_t == "db":
         __tablename__ = 'cities'
-        state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
+        state_id = Column(String(60), ForeignKey('states.id'), nullable=False,
+                          index=True)
         name = Column(String(128), nullable=False)
         places = relationship("Place", backref="cities")
     else:
         state_id = ""
         name = ""
+    indexed = {"state_id": "hash"}
 
     def __init__(self, *args, **kwargs):
         """initializes city"""
@@ -0,0 +1,330 @@
+#!/usr/bin/python3
+"""
+Contains the serialization codecs used by FileStorage
+
+A codec turns objects into encoded fragments, writes snapshots made of
+fragments and reads records back from snapshots and journals. The codec
+is selected with HBNB_FILE_CODEC: json (default), marshal, marshal.gz
+and, when the msgpack package is installed, msgpack and msgpack.gz.
+"""
+
+from datetime import datetime, timedelta
+import gzip
+import io
+import json
+import marshal
+import os
+import struct
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+time = "%Y-%m-%dT%H:%M:%S.%f"
+epoch = datetime(1970, 1, 1)
+microsecond = timedelta(microseconds=1)
+
+
+class TornJournalError(ValueError):
+    """raised by read_journal() after the last good entry of a journal
+
+    offset is the size in bytes of the good entries: the journal must be
+    truncated to it before anything is appended, or the appended entries
+    would follow the torn one and never be read.
+    """
+
+    def __init__(self, path, offset):
+        """Builds the error of the journal at path torn at offset"""
+        super().__init__("{} is torn at byte {:d}".format(path, offset))
+        self.path = path
+        self.offset = offset
+
+
+def _iter_json_object(f, chunk_size=64 * 1024):
+    """yields the (key, value) pairs of the JSON object in file f
+
+    Reads f in chunks so that only one value is decoded at a time.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def skip(expected=None):
+        """skips whitespace and an optional expected character"""
+        nonlocal buf, pos, eof
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = buf == ""
+        if pos == len(buf):
+            raise ValueError("unexpected end of JSON object")
+        if expected is not None:
+            if buf[pos] not in expected:
+                raise ValueError("expected one of " + expected)
+            pos += 1
+            return buf[pos - 1]
+        return buf[pos]
+
+    def decode():
+        """decodes the next value, reading more chunks when truncated"""
+        nonlocal buf, pos, eof
+        skip()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = chunk == ""
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            if end == len(buf) and not eof:
+                # a number or literal may continue in the next chunk
+                chunk = f.read(chunk_size)
+                eof = chunk == ""
+                if chunk:
+                    buf, pos = buf[pos:] + chunk, 0
+                    continue
+            pos = end
+            return value
+
+    skip("{")
+    if skip() == "}":
+        return
+    while True:
+        key = decode()
+        skip(":")
+        yield key, decode()
+        if skip(",}") == "}":
+            return
+
+
+def _replace(path, data, opener=open):
+    """atomically replaces path by data, fsync'ed through a temporary file"""
+    tmp_path = path + ".tmp"
+    with opener(tmp_path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JSONCodec:
+    """the original format: one JSON object of "<class name>.id": record
+
+    The journal holds one JSON array [key, record] per line, with a null
+    record marking a deleted object. Fragments are the pair of encoded
+    key and encoded record.
+    """
+    extension = ".json"
+
+    def encode(self, key, obj):
+        """returns the encoded (key, record) of an object or a record"""
+        record = obj if type(obj) is dict else obj.to_dict()
+        return (json.dumps(key), json.dumps(record))
+
+    def tombstone(self, key):
+        """returns the journal fragment marking key as deleted"""
+        return (json.dumps(key), "null")
+
+    def write(self, path, fragments):
+        """atomically writes a snapshot made of fragments to path"""
+        _replace(path, "{" + ", ".join(key + ": " + record
+                                       for key, record in fragments) + "}")
+
+    def read(self, path):
+        """yields the (key, record) pairs of the snapshot at path"""
+        with open(path, 'r') as f:
+            yield from _iter_json_object(f)
+
+    def append(self, path, fragments):
+        """appends fragments to the journal at path
+
+        Returns:
+            The size of the journal afterwards
+        """
+        with open(path, 'a') as f:
+            f.write("".join("[" + key + ", " + record + "]\n"
+                            for key, record in fragments))
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def read_journal(self, path):
+        """yields the (key, record or None) entries of the journal at path
+
+        Raises TornJournalError at a torn entry, including a last line
+        missing its newline.
+        """
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("missing newline")
+                    key, record = json.loads(line)
+                except (TypeError, ValueError):
+                    raise TornJournalError(path, offset) from None
+                offset += len(line)
+                yield key, record
+
+
+class FramedCodec:
+    """a binary format of length-prefixed (key, record) frames
+
+    Timestamps are stored as integer microseconds since the epoch and
+    read back as datetime objects. A None record marks a deleted object
+    in the journal.
+    """
+    magic = b"HBNB\x01"
+    header = struct.Struct("<I")
+
+    def __init__(self, name, dumps, loads, compress=False):
+        """Builds a codec from a pair of dumps/loads functions"""
+        self.extension = "." + name + (".gz" if compress else "")
+        self.__dumps = dumps
+        self.__loads = loads
+        self.__compress = compress
+        self.__open = gzip.open if compress else open
+
+    @staticmethod
+    def _pack_time(value):
+        """returns a datetime or formatted time as integer microseconds"""
+        if isinstance(value, str):
+            value = datetime.strptime(value, time)
+        return (value - epoch) // microsecond
+
+    def _frame(self, key, record):
+        """returns the length-prefixed encoding of (key, record)"""
+        payload = self.__dumps((key, record))
+        return self.header.pack(len(payload)) + payload
+
+    def encode(self, key, obj):
+        """returns the frame of an object or a record"""
+        if type(obj) is dict:
+            record = dict(obj)
+        else:
+            record = obj.__dict__.copy()
+            record.pop("_sa_instance_state", None)
+            record["__class__"] = obj.__class__.__name__
+        for attr in ("created_at", "updated_at"):
+            if record.get(attr) is not None:
+                record[attr] = self._pack_time(record[attr])
+        return self._frame(key, record)
+
+    def tombstone(self, key):
+        """returns the journal frame marking key as deleted"""
+        return self._frame(key, None)
+
+    def write(self, path, fragments):
+        """atomically writes a snapshot made of frames to path"""
+        _replace(path, self.magic + b"".join(fragments), self.__open)
+
+    def _frames(self, f, path):
+        """yields the (key, record) of the frames in f
+
+        Raises TornJournalError at a frame that is cut short or cannot
+        be decoded.
+        """
+        size = self.header.size
+        offset = 0
+        while True:
+            head = f.read(size)
+            if not head:
+                return
+            try:
+                length, = self.header.unpack(head)
+                payload = f.read(length)
+                if len(payload) < length:
+                    raise EOFError("frame cut short")
+                key, record = self.__loads(payload)
+                if record is not None:
+                    for attr in ("created_at", "updated_at"):
+                        if record.get(attr) is not None:
+                            record[attr] = (epoch +
+                                            record[attr] * microsecond)
+            except Exception:
+                raise TornJournalError(path, offset) from None
+            offset += size + length
+            yield key, record
+
+    def read(self, path):
+        """yields the (key, record) pairs of the snapshot at path
+
+        Snapshots are replaced atomically: a torn frame can only come
+        from an outside truncation, and ends the snapshot.
+        """
+        with self.__open(path, 'rb') as f:
+            if f.read(len(self.magic)) != self.magic:
+                raise ValueError(path + " is not a snapshot of this codec")
+            try:
+                yield from self._frames(f, path)
+            except (TornJournalError, EOFError, gzip.BadGzipFile):
+                return
+
+    def append(self, path, fragments):
+        """appends frames to the journal at path
+
+        Returns:
+            The size of the journal afterwards
+        """
+        with self.__open(path, 'ab') as f:
+            f.write(b"".join(fragments))
+        with open(path, 'rb') as f:
+            os.fsync(f.fileno())
+            return os.fstat(f.fileno()).st_size
+
+    def read_journal(self, path):
+        """yields the (key, record or None) entries of the journal at path
+
+        Raises TornJournalError at a torn frame. Each append of a
+        compressed journal is a gzip member of its own, so a torn member
+        is dropped whole: its offset is where it starts.
+        """
+        if not self.__compress:
+            with open(path, 'rb') as f:
+                yield from self._frames(f, path)
+            return
+        with open(path, 'rb') as f:
+            data = memoryview(f.read())
+        offset = 0
+        while offset < len(data):
+            member = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                payload = member.decompress(data[offset:])
+                if not member.eof:
+                    raise EOFError("gzip member cut short")
+                entries = list(self._frames(io.BytesIO(payload), path))
+            except (EOFError, TornJournalError, zlib.error):
+                raise TornJournalError(path, offset) from None
+            yield from entries
+            offset = len(data) - len(member.unused_data)
+
+
+codecs = {
+    "json": JSONCodec(),
+    "marshal": FramedCodec("marshal", marshal.dumps, marshal.loads),
+    "marshal.gz": FramedCodec("marshal", marshal.dumps, marshal.loads,
+                              compress=True),
+}
+if msgpack is not None:
+    codecs["msgpack"] = FramedCodec("msgpack", msgpack.packb,
+                                    msgpack.unpackb)
+    codecs["msgpack.gz"] = FramedCodec("msgpack", msgpack.packb,
+                                       msgpack.unpackb, compress=True)
+
+
+def get_codec(name):
+    """returns the codec registered under name"""
+    try:
+        return codecs[name]
+    except KeyError:
+        raise ValueError("unknown codec {} (available: {})".format(
+            name, ", ".join(sorted(codecs)))) from None
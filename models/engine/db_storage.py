@@ -1,10 +1,21 @@
 #!/usr/bin/python3
 """
 Contains the class DBStorage
+
+DBStorage connects to MySQL, or to an embedded SQLite database file when
+HBNB_TYPE_STORAGE is sqlite. Reads go to a replica when
+HBNB_MYSQL_REPLICA_HOST (or HBNB_SQLITE_REPLICA_PATH) is set.
 """
 
 import models
 from models.base_model import BaseModel, Base
+from models.engine.entity_cache import EntityCache, detached_copy
+from models.engine.indexes import TextIndex, bounding_box, haversine
+from models.engine.indexes import tokenize
+from models.engine.keyset import cursor_of, parse_cursor
+from models.engine.pool_metrics import PoolMetrics, TimedQueuePool
+from models.engine.query_cache import get_query_cache
+from models.engine.statement_budget import StatementBudget
 from models.amenity import Amenity
 from models.city import City
 from models.place import Place
@@ -13,17 +24,94 @@ from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import joinedload, scoped_session, selectinload
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.pool import StaticPool
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
+loaders = {"selectin": selectinload, "joined": joinedload}
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """enables WAL journaling and foreign keys on a SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _pool_options(memory=False):
+    """returns the create_engine pool options set by the environment
+
+    Connections are pinged before use and recycled after
+    HBNB_DB_POOL_RECYCLE seconds. HBNB_DB_POOL_SIZE, HBNB_DB_MAX_OVERFLOW
+    and HBNB_DB_POOL_TIMEOUT size the pool, except for an in-memory
+    SQLite database which has a single connection.
+    """
+    pre_ping = getenv('HBNB_DB_POOL_PRE_PING', '1') not in ('', '0')
+    options = {"pool_pre_ping": pre_ping,
+               "pool_recycle": int(getenv('HBNB_DB_POOL_RECYCLE', '3600'))}
+    if memory:
+        # a single connection keeps the in-memory database alive
+        options["poolclass"] = StaticPool
+    else:
+        options["poolclass"] = TimedQueuePool
+        options["pool_size"] = int(getenv('HBNB_DB_POOL_SIZE', '5'))
+        options["max_overflow"] = int(getenv('HBNB_DB_MAX_OVERFLOW', '10'))
+        options["pool_timeout"] = float(getenv('HBNB_DB_POOL_TIMEOUT', '30'))
+    return options
+
+
+def _sqlite_engine(path):
+    """returns an engine on the SQLite database file at path"""
+    options = _pool_options(path == ':memory:')
+    options["connect_args"] = {"check_same_thread": False}
+    engine = create_engine('sqlite:///' + path, **options)
+    event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+class RoutingSession(Session):
+    """a session reading from the replica engine found in its info
+
+    SELECTs go to the replica until the session writes. From then on,
+    everything goes to the primary engine the session is bound to, so
+    that the session reads its own writes until it is closed. A
+    statement given an explicit bind runs on that engine, and one with
+    the primary execution option runs on the primary engine.
+    """
+
+    def get_bind(self, mapper=None, **kw):
+        """returns the engine running a statement of the session"""
+        replica = self.info.get("replica")
+        clause = kw.get("clause")
+        if kw.get("bind") is not None or clause is not None and \
+                clause.get_execution_options().get("primary"):
+            return super().get_bind(mapper, **kw)
+        if replica is not None and not self.info.get("wrote"):
+            if not self._flushing and clause is not None and \
+                    clause.is_select:
+                return replica
+            self.info["wrote"] = True
+        return super().get_bind(mapper, **kw)
 
 
 class DBStorage:
     """interacts with the MySQL database"""
     __engine = None
+    __replica = None
     __session = None
+    __metrics = None
+    # PoolMetrics - connections of the replica engine, if any
+    __replica_metrics = None
+    # EntityCache - copies of the objects found by get(), if enabled
+    __cache = None
+    # QueryCache - results of query() and count(), if enabled
+    __results = None
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -32,11 +120,36 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        if getenv('HBNB_TYPE_STORAGE') == 'sqlite':
+            HBNB_SQLITE_PATH = getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+            self.__engine = _sqlite_engine(HBNB_SQLITE_PATH)
+            HBNB_SQLITE_REPLICA_PATH = getenv('HBNB_SQLITE_REPLICA_PATH')
+            if HBNB_SQLITE_REPLICA_PATH:
+                self.__replica = _sqlite_engine(HBNB_SQLITE_REPLICA_PATH)
+        else:
+            url = 'mysql+mysqldb://{}:{}@{}/{}'
+            self.__engine = create_engine(url.format(HBNB_MYSQL_USER,
+                                                     HBNB_MYSQL_PWD,
+                                                     HBNB_MYSQL_HOST,
+                                                     HBNB_MYSQL_DB),
+                                          **_pool_options())
+            HBNB_MYSQL_REPLICA_HOST = getenv('HBNB_MYSQL_REPLICA_HOST')
+            if HBNB_MYSQL_REPLICA_HOST:
+                self.__replica = create_engine(
+                    url.format(HBNB_MYSQL_USER, HBNB_MYSQL_PWD,
+                               HBNB_MYSQL_REPLICA_HOST, HBNB_MYSQL_DB),
+                    **_pool_options())
+        self.__metrics = PoolMetrics()
+        self.__metrics.attach(self.__engine)
+        if self.__replica is not None:
+            self.__replica_metrics = PoolMetrics()
+            self.__replica_metrics.attach(self.__replica)
+        HBNB_DB_CACHE_SIZE = int(getenv('HBNB_DB_CACHE_SIZE', '0'))
+        if HBNB_DB_CACHE_SIZE > 0:
+            self.__cache = EntityCache(
+                HBNB_DB_CACHE_SIZE,
+                float(getenv('HBNB_DB_CACHE_TTL', '60')))
+        self.__results = get_query_cache()
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
@@ -54,23 +167,307 @@ class DBStorage:
     def get(self, cls, id):
         """ Retrieves one object based on class and its ID
 
+        The primary key is looked up in the identity map of the session
+        first, then in the entity cache if HBNB_DB_CACHE_SIZE enables it,
+        so an object already loaded costs no query. The cache is filled
+        from the primary engine only: a lagging replica would otherwise
+        keep stale copies for HBNB_DB_CACHE_TTL seconds.
+
         Returns:
             The object if found, otherwise None
         """
         if cls and id:
-            key = "{}.{}".format(cls.__name__, id)
-            objects = self.all(cls)
-            return objects.get(key)
+            cls = classes.get(cls, cls) if isinstance(cls, str) else cls
+            if cls not in classes.values():
+                return None
+            if self.__cache is None:
+                return self.__session.get(cls, id)
+            # merging a cached copy would overwrite unsaved changes
+            obj = self.__session.identity_map.get(identity_key(cls, id))
+            if obj is not None:
+                return obj
+            copy = self.__cache.get(cls, id)
+            if copy is not None:
+                return self.__session.merge(copy, load=False)
+            version = self.__cache.version()
+            obj = self.__session.get(cls, id,
+                                     bind_arguments={"bind": self.__engine})
+            if obj is not None:
+                self.__cache.put(obj, version)
+            return obj
         return None
 
+    def _cached(self, key):
+        """returns the query result cache if key may be served from it
+
+        The cache is skipped while the session has unsaved or uncommitted
+        writes, which its results would not reflect, and for unhashable
+        keys.
+        """
+        session = self.__session
+        if self.__results is None or session.new or session.dirty or \
+                session.deleted or session.info.get("result_classes"):
+            return None
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return self.__results
+
     def count(self, cls=None):
         """ Counts the number of objects in storage
 
+        Counts with SELECT COUNT(*): one query for a class, and a single
+        UNION ALL of the per-table counts when cls is None. If
+        HBNB_QUERY_CACHE_SIZE enables it, the count is read on the primary
+        engine and cached until an object of the class is written.
+
         Returns:
             The count of the objects matching the given class,
             or all objects if None
         """
-        return len(self.all(cls))
+        if cls is not None:
+            cls = classes.get(cls) if isinstance(cls, str) else cls
+            if cls not in classes.values():
+                return 0
+            names = (cls.__name__,)
+        else:
+            names = tuple(classes)
+        key = ("count",) + names
+        results = self._cached(key)
+        if results is not None:
+            count = results.get(key, names)
+            if count is not None:
+                return count
+            generations = results.generation(names)
+        if cls is not None:
+            query = self.__session.query(sqlalchemy.func.count(cls.id))
+        else:
+            counts = [self.__session.query(sqlalchemy.func.count(clss.id))
+                      for clss in classes.values()]
+            query = counts[0].union_all(*counts[1:])
+        if results is not None:
+            # a lagging replica would keep a stale count cached
+            query = query.execution_options(primary=True)
+        count = sum(row[0] for row in query)
+        if results is not None:
+            results.put(key, names, generations, count)
+        return count
+
+    def query(self, cls, where=None, order_by=None, limit=None, offset=0,
+              load=None):
+        """returns the objects of cls matching where, ordered and sliced
+
+        where maps attributes to the values they must equal. order_by
+        names an attribute, prefixed by "-" for a descending order. The
+        whole query runs as a single SELECT. load names the relationships
+        to load with the objects, as a list for "selectin" loading (one
+        more SELECT per relationship) or as a dict of relationship name
+        to "selectin" or "joined" (a LEFT OUTER JOIN).
+
+        If HBNB_QUERY_CACHE_SIZE enables it, queries without load are
+        read on the primary engine and cached as detached copies until an
+        object of cls is written, and merged back into the session without
+        a SELECT.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        names = (cls.__name__,)
+        key = ("query", cls.__name__, tuple(sorted((where or {}).items())),
+               order_by, limit, offset)
+        results = None if load else self._cached(key)
+        if results is not None:
+            copies = results.get(key, names)
+            if copies is not None:
+                return [self.__session.merge(copy, load=False)
+                        for copy in copies]
+            generations = results.generation(names)
+        query = self.__session.query(cls)
+        if results is not None:
+            # a lagging replica would keep stale results cached
+            query = query.execution_options(primary=True)
+        if load:
+            if not isinstance(load, dict):
+                load = dict.fromkeys(load, "selectin")
+            query = query.options(*(loaders[strategy](getattr(cls, attr))
+                                    for attr, strategy in load.items()))
+        if where:
+            query = query.filter_by(**where)
+        if order_by:
+            column = getattr(cls, order_by.lstrip("-"))
+            if order_by.startswith("-"):
+                column = column.desc()
+            query = query.order_by(column)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        objects = query.all()
+        if results is not None and len(objects) <= results.max_rows:
+            results.put(key, names, generations,
+                        [detached_copy(obj) for obj in objects])
+        return objects
+
+    def iter(self, cls, after=None, batch_size=1000):
+        """yields the objects of cls ordered by (created_at, id)
+
+        Only the objects after the cursor after are yielded, see
+        models.engine.keyset. Rows are read by keyset queries of
+        batch_size rows on the created_at index, each resuming after the
+        last row of the previous one. No cursor stays open between
+        batches, so the session can still load relationships while
+        iterating, and memory does not grow with the table.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        after = parse_cursor(after)
+        while True:
+            query = self.__session.query(cls).order_by(cls.created_at, cls.id)
+            if after is not None:
+                query = query.filter(sqlalchemy.or_(
+                    cls.created_at > after[0],
+                    sqlalchemy.and_(cls.created_at == after[0],
+                                    cls.id > after[1])))
+            batch = query.limit(batch_size).all()
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = cursor_of(batch[-1])
+
+    def related(self, cls, attr, value):
+        """returns the objects of cls whose attribute attr equals value"""
+        return self.query(cls, where={attr: value})
+
+    def find_by(self, cls, attr, value):
+        """returns the first object of cls whose attr equals value
+
+        Returns:
+            The object if found, otherwise None
+        """
+        objects = self.query(cls, where={attr: value}, limit=1)
+        return objects[0] if objects else None
+
+    def find_range(self, cls, **bounds):
+        """returns the objects of cls whose attributes lie within bounds
+
+        Each bound is a (low, high) pair, included, either side None for
+        an open range. The objects are ordered by the first attribute.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        query = self.__session.query(cls)
+        for attr, (low, high) in bounds.items():
+            column = getattr(cls, attr)
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        if bounds:
+            query = query.order_by(getattr(cls, next(iter(bounds))))
+        return query.all()
+
+    def nearby(self, cls, lat, lng, radius_km, limit=None):
+        """returns the objects of cls within radius_km of a point
+
+        The bounding box of the circle is filtered on the indexed
+        latitude and longitude columns, exact distances in km are then
+        measured on the rows found. Returns (object, distance) pairs,
+        nearest first, at most limit of them.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        south, north, west, east = bounding_box(lat, lng, radius_km)
+        query = self.__session.query(cls).filter(
+            cls.latitude >= south, cls.latitude <= north)
+        if west is not None and west <= east:
+            query = query.filter(cls.longitude >= west,
+                                 cls.longitude <= east)
+        elif west is not None:
+            query = query.filter(sqlalchemy.or_(cls.longitude >= west,
+                                                cls.longitude <= east))
+        found = []
+        for obj in query:
+            distance = haversine(lat, lng, obj.latitude, obj.longitude)
+            if distance <= radius_km:
+                found.append((distance, obj.id, obj))
+        found.sort(key=lambda item: item[:2])
+        return [(obj, distance) for distance, id, obj in found[:limit]]
+
+    def search(self, cls, query, limit=None):
+        """returns the objects of cls matching the words of query
+
+        MySQL ranks the rows with its FULLTEXT index. Other engines select
+        the rows containing a word of query and rank them with BM25.
+        Returns (object, score) pairs, best first, at most limit of them.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        attrs = next(attr for attr, kind in cls.indexed.items()
+                     if kind == "text")
+        attrs = attrs if isinstance(attrs, tuple) else (attrs,)
+        if self.__engine.dialect.name == "mysql":
+            match = "MATCH ({}) AGAINST (:query IN NATURAL LANGUAGE MODE)" \
+                .format(", ".join(attrs))
+            sql = "SELECT id, {0} AS score FROM {1} WHERE {0} " \
+                  "ORDER BY score DESC".format(match, cls.__tablename__)
+            if limit is not None:
+                sql += " LIMIT {:d}".format(limit)
+            rows = self.__session.execute(sqlalchemy.text(sql),
+                                          {"query": query}).fetchall()
+            ids = [row[0] for row in rows]
+            objects = {obj.id: obj for obj in self.__session.query(cls)
+                       .filter(cls.id.in_(ids))}
+            return [(objects[id], score) for id, score in rows
+                    if id in objects]
+        words = set(tokenize(query))
+        if not words:
+            return []
+        conditions = [getattr(cls, attr).ilike(
+            "%" + word.replace("_", "\\_") + "%", escape="\\")
+            for attr in attrs for word in words]
+        index = TextIndex(*attrs)
+        objects = {}
+        for obj in self.__session.query(cls).filter(
+                sqlalchemy.or_(*conditions)):
+            index.add(obj.id, obj)
+            objects[obj.id] = obj
+        return [(objects[id], score)
+                for score, id in index.search(query, limit)]
+
+    def statement_budget(self, limit):
+        """returns a StatementBudget of limit statements on the engine
+
+        Its block fails when it runs more statements, as N+1 queries do.
+        """
+        return StatementBudget([self.__engine, self.__replica] if
+                               self.__replica else self.__engine, limit)
+
+    def cache_stats(self):
+        """returns the entity cache metrics, or None if it is disabled"""
+        if self.__cache is None:
+            return None
+        return self.__cache.stats()
+
+    def query_cache_stats(self):
+        """returns the query result cache metrics, or None if disabled"""
+        if self.__results is None:
+            return None
+        return self.__results.stats()
+
+    def pool_stats(self):
+        """returns the connection pool and session lifetime metrics
+
+        The pool metrics are those of the primary engine. With a replica,
+        the metrics of its pool are under "replica".
+        """
+        stats = self.__metrics.stats()
+        if self.__replica_metrics is not None:
+            replica = self.__replica_metrics.stats()
+            for name in ("sessions", "max_session", "mean_session"):
+                # sessions are only timed on the primary metrics
+                del replica[name]
+            stats["replica"] = replica
+        return stats
 
     def new(self, obj):
         """add the object to the current database session"""
@@ -80,28 +477,81 @@ class DBStorage:
         """commit all changes of the current database session"""
         self.__session.commit()
 
+    def bulk_new(self, objs):
+        """adds objs to the session and commits them at once
+
+        The inserts of each table are sent as one executemany.
+
+        Returns:
+            The number of objects added
+        """
+        objs = list(objs)
+        self.__session.add_all(objs)
+        self.save()
+        return len(objs)
+
     def delete(self, obj=None):
-        """delete from the current database session obj if not None"""
+        """delete from the current database session obj if not None
+
+        Like new(), the deletion is written by the next save().
+        """
         if obj is not None:
             self.__session.delete(obj)
-            self.save()
+
+    def bulk_delete(self, cls, ids, batch_size=500):
+        """deletes the objects of cls with the given ids and commits
+
+        Runs one DELETE ... WHERE id IN (...) per batch_size ids.
+
+        Returns:
+            The number of objects deleted
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        ids = list(ids)
+        deleted = 0
+        for start in range(0, len(ids), batch_size):
+            query = self.__session.query(cls).filter(
+                cls.id.in_(ids[start:start + batch_size]))
+            deleted += query.delete(synchronize_session="fetch")
+        self.save()
+        if self.__cache is not None:
+            self.__cache.invalidate((cls.__name__, id) for id in ids)
+        if self.__results is not None:
+            self.__results.bump((cls.__name__,))
+        return deleted
 
     def delete_all(self):
-        """ Deletes all objects from __objects """
-        self.__objects = {}
+        """deletes every row of every table and commits
+
+        Runs one DELETE per table, children first, and empties the
+        session.
+        """
+        for table in reversed(Base.metadata.sorted_tables):
+            self.__session.execute(table.delete())
         self.save()
+        self.__session.expunge_all()
+        if self.__cache is not None:
+            self.__cache.clear()
+        if self.__results is not None:
+            self.__results.clear()
 
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
-        sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        sess_factory = sessionmaker(bind=self.__engine, class_=RoutingSession,
+                                    info={"replica": self.__replica},
+                                    expire_on_commit=False)
+        self.__metrics.watch(sess_factory)
+        if self.__cache is not None:
+            self.__cache.watch(sess_factory)
+        if self.__results is not None:
+            self.__results.watch(sess_factory)
         Session = scoped_session(sess_factory)
         self.__session = Session
 
     def close(self):
         """call remove() method on the private session attribute"""
+        if self.__session.registry.has():
+            self.__metrics.closed(self.__session())
         self.__session.remove()
-
-
-db_storage = DBStorage()
-db_storage.reload()
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+"""
+Contains the EntityCache class, the entity cache of DBStorage
+"""
+
+from collections import OrderedDict
+import threading
+import time
+from models.engine.session_cache import SessionCache
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+
+def detached_copy(obj):
+    """returns a detached copy of the loaded columns of obj"""
+    state = inspect(obj)
+    copy = state.mapper.class_manager.new_instance()
+    for attr in state.mapper.column_attrs:
+        if attr.key in state.dict:
+            setattr(copy, attr.key, state.dict[attr.key])
+    make_transient_to_detached(copy)
+    return copy
+
+
+class EntityCache(SessionCache):
+    """a process-wide LRU cache of detached copies of objects by (class, id)
+
+    Copies live for ttl seconds and at most max_size of them are kept.
+    They are never attached to a session: callers merge them into theirs
+    with Session.merge(copy, load=False), which runs no query. Objects
+    flushed or deleted by a watched session are invalidated when the
+    flush happens and again once it is committed.
+    """
+    info_key = "cache_keys"
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        """Builds an empty cache"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__lock = threading.Lock()
+        # OrderedDict - (expiry time, copy) by (class name, id), oldest use
+        # first
+        self.__entries = OrderedDict()
+        # integer - number of invalidations so far
+        self.__version = 0
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0,
+                        "expirations": 0, "invalidations": 0}
+
+    def version(self):
+        """returns a token to hand to put() for an object loaded next"""
+        with self.__lock:
+            return self.__version
+
+    def get(self, cls, id):
+        """returns the cached copy of the object of cls with id, or None"""
+        key = (cls.__name__, id)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self.__entries[key]
+                self.__stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self.__stats["misses"] += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__stats["hits"] += 1
+            return entry[1]
+
+    def put(self, obj, version):
+        """caches a copy of obj, loaded after version() returned version
+
+        Nothing is cached if an invalidation happened in between, since
+        obj may then predate a commit.
+        """
+        if self.max_size <= 0:
+            return
+        copy = detached_copy(obj)
+        key = (obj.__class__.__name__, obj.id)
+        with self.__lock:
+            if version != self.__version:
+                return
+            self.__entries[key] = (time.monotonic() + self.ttl, copy)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__stats["evictions"] += 1
+
+    def invalidate(self, keys):
+        """drops the (class name, id) keys from the cache"""
+        with self.__lock:
+            self.__version += 1
+            for key in keys:
+                if self.__entries.pop(key, None) is not None:
+                    self.__stats["invalidations"] += 1
+
+    def clear(self):
+        """drops every copy"""
+        with self.__lock:
+            self.__version += 1
+            self.__stats["invalidations"] += len(self.__entries)
+            self.__entries.clear()
+
+    def _written(self, session):
+        """returns the keys of the objects a flush of session writes"""
+        return {(obj.__class__.__name__, obj.id)
+                for obj in list(session.dirty) + list(session.deleted)}
+
+    def _expire(self, keys):
+        """invalidates the written keys"""
+        self.invalidate(keys)
+
+    def _counts(self):
+        """returns the hit, miss, eviction and invalidation counts, and
+        the number of copies"""
+        with self.__lock:
+            return dict(self.__stats), len(self.__entries)
@@ -3,7 +3,23 @@
 Contains the FileStorage class
 """
 
-import json
+from collections.abc import Mapping
+from contextlib import contextmanager
+import os
+from os import getenv
+import shutil
+import threading
+from types import MappingProxyType
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from models.engine.codecs import TornJournalError, get_codec
+from models.engine.group_commit import GroupCommitWriter
+from models.engine.indexes import GridIndex, HashIndex, SortedIndex
+from models.engine.indexes import TextIndex, hashable
+from models.engine.keyset import cursor_of, parse_cursor
+from models.engine.query_cache import get_query_cache
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -16,29 +32,615 @@ classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
 
+def build_indexes():
+    """returns an empty index of each attribute declared as indexed
+
+    Indexes are grouped by class name, then by attribute. A spatial
+    index is declared on a (latitude, longitude) pair and a text index
+    on one or more attributes; they are listed under each attribute.
+    Text indexes are lazy: search() builds them when first needed.
+    """
+    indexes = {}
+    for name, cls in classes.items():
+        for attr, kind in cls.indexed.items():
+            attrs = attr if isinstance(attr, tuple) else (attr,)
+            if kind == "spatial":
+                index = GridIndex(*attrs)
+            elif kind == "text":
+                index = TextIndex(*attrs, lazy=True)
+            elif kind == "sorted":
+                index = SortedIndex(attr, getattr(cls, attr, None))
+            else:
+                index = HashIndex(attr, unique=kind == "unique")
+            for key in attrs:
+                indexes.setdefault(name, {})[key] = index
+    return indexes
+
+
+def _sort_key(value):
+    """returns a sort key of value that orders None first"""
+    return (value is not None, value)
+
+
+def _within(value, low, high):
+    """tells if value lies between low and high, either of them None"""
+    return (value is not None and (low is None or value >= low) and
+            (high is None or value <= high))
+
+
+def migrate_to_shards(file_path, shard_dir, codec=get_codec("json"),
+                      journal_path=None):
+    """splits a single file of objects into one file per class
+
+    The changes in the journal at journal_path, if given, are applied on
+    top of the file, up to a torn tail. Each <class name> file uses the
+    same codec as the single file. The shards are written to a temporary
+    directory renamed to shard_dir once complete, so that an interrupted
+    migration is run again.
+    """
+    records = {}
+    try:
+        for key, record in codec.read(file_path):
+            records[key] = record
+    except FileNotFoundError:
+        pass
+    if journal_path is not None:
+        try:
+            for key, record in codec.read_journal(journal_path):
+                if record is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = record
+        except (FileNotFoundError, TornJournalError):
+            pass
+    fragments = {}
+    for key, record in records.items():
+        fragment = codec.encode(key, record)
+        fragments.setdefault(record["__class__"], []).append(fragment)
+    tmp_dir = shard_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        for name, shard_fragments in fragments.items():
+            codec.write(os.path.join(tmp_dir, name + codec.extension),
+                        shard_fragments)
+        os.replace(tmp_dir, shard_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+class _LazyView(Mapping):
+    """read-only view of a class partition that hydrates on access"""
+
+    def __init__(self, storage, partition):
+        """Wraps the partition dictionary of storage"""
+        self.__storage = storage
+        self.__partition = partition
+
+    def __getitem__(self, key):
+        """returns the object stored under key, hydrating it if needed"""
+        return self.__storage._hydrate(key, self.__partition[key])
+
+    def __iter__(self):
+        """iterates over the keys of the partition"""
+        return iter(self.__partition)
+
+    def __len__(self):
+        """returns the number of objects in the partition"""
+        return len(self.__partition)
+
+
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
 
-    # string - path to the JSON file
-    __file_path = "file.json"
+    # codec - serialization format of the files, JSON by default
+    __codec = get_codec(getenv("HBNB_FILE_CODEC", "json"))
+    # string - path to the JSON file (or the file of another codec)
+    __file_path = "file" + __codec.extension
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - the same objects partitioned by <class name>
+    __by_class = {}
+    # dictionary - (source, read-only copy) of __objects (under None) or of
+    # a partition (under its class name), dropped when the source changes
+    __snapshots = {}
+    # boolean - append changes to a journal instead of rewriting the file
+    __journal = getenv("HBNB_FILE_JOURNAL", "0") not in ("", "0")
+    # string - path to the journal of changes made since the last snapshot
+    __journal_path = __file_path + ".log"
+    # integer - journal size in bytes that triggers a compaction
+    __journal_max = int(getenv("HBNB_FILE_JOURNAL_MAX", 4 * 1024 * 1024))
+    # set - keys of the objects already written to the journal
+    __persisted = set()
+    # set - keys of the objects created, changed or deleted since last save
+    __dirty = set()
+    # dictionary - (object, fragment) last encoded by the codec, by key
+    __fragments = {}
+    # boolean - batch saves into group commits on a writer thread
+    __group_commit = getenv("HBNB_FILE_GROUP_COMMIT", "0") not in ("", "0")
+    # float - seconds the writer waits to gather saves into one commit
+    __commit_window = float(getenv("HBNB_FILE_COMMIT_WINDOW", "5")) / 1000
+    # boolean - keep the records read by reload() until first accessed
+    __lazy = getenv("HBNB_FILE_LAZY", "0") not in ("", "0")
+    # tuple - (inode, size, mtime) of the files when last read or written
+    __signature = None
+    # dictionary - how many reloads re-read the files or were skipped
+    __reload_stats = {"performed": 0, "skipped": 0}
+    # boolean - keep one JSON file per class instead of __file_path
+    __sharded = getenv("HBNB_FILE_LAYOUT", "single") == "sharded"
+    # string - directory holding the <class name> shards
+    __shard_dir = getenv("HBNB_FILE_DIR", "file_storage")
+    # set - names of the classes whose shard has been read
+    __loaded = set()
+    # dictionary - (inode, size, mtime) of each shard, by class name
+    __shard_signatures = {}
+    # dictionary - index of the indexed attributes, by class and name
+    __indexes = build_indexes()
+    # dictionary - (indexes of a class, each distinct index once) by class
+    # name, dropped when __indexes is rebuilt
+    __distinct = {}
+    # QueryCache - results of query() by class and parameters, if enabled
+    __results = get_query_cache()
+    # boolean - lock the files and merge the writes of other processes
+    __shared = getenv("HBNB_FILE_MULTIPROCESS", "0") not in ("", "0")
+    # file - lock file held by this process while it reads or writes
+    __lock_file = None
+    # GroupCommitWriter - started by the first save in group commit mode
+    __writer = None
+    # lock - guards the objects and the bookkeeping around them
+    __lock = threading.RLock()
+    # lock - orders the writes to the JSON file and the journal
+    __io_lock = threading.RLock()
+
+    @staticmethod
+    def _class_name(cls):
+        """returns the class name for a class or a class name string"""
+        if isinstance(cls, str):
+            return cls
+        return cls.__name__
+
+    def _partition(self, name):
+        """returns the dictionary holding the objects of class `name`"""
+        partition = self.__by_class.get(name)
+        if partition is None:
+            partition = {}
+            if name in classes:
+                self.__by_class[name] = partition
+        return partition
+
+    def _indexes(self, name):
+        """returns the indexes of class `name`, each of them once
+
+        A spatial or text index is listed in __indexes under each of its
+        attributes but must be updated once per change.
+        """
+        indexes = self.__indexes.get(name)
+        if not indexes:
+            return ()
+        cached = self.__distinct.get(name)
+        if cached is None or cached[0] is not indexes:
+            distinct = {id(index): index for index in indexes.values()}
+            cached = (indexes, tuple(distinct.values()))
+            self.__distinct[name] = cached
+        return cached[1]
+
+    def _put(self, key, value):
+        """stores an object or a lazy record under key
+
+        An instance is flagged as stored, so that its assignments are
+        checked and tracked from then on.
+        """
+        name = key.partition(".")[0]
+        for index in self._indexes(name):
+            index.add(key, value)
+        if not getattr(value, "_stored", True):
+            value._stored = True
+        self.__objects[key] = value
+        self._partition(name)[key] = value
+        self.__snapshots.pop(None, None)
+        self.__snapshots.pop(name, None)
+        if self.__results is not None:
+            self.__results.bump((name,))
+
+    def _require(self, name=None):
+        """reads the shard of class `name`, or of every class, if needed
+
+        Only the sharded layout loads classes on demand. An empty shard
+        directory, as left by an older migration, is migrated again.
+        """
+        if not self.__sharded:
+            return
+        self._check_layout()
+        for name in classes if name is None else [name]:
+            if name in self.__loaded or name not in classes:
+                continue
+            with self.__io_lock:
+                if name not in self.__loaded:
+                    if not os.path.isdir(self.__shard_dir) or \
+                            not os.listdir(self.__shard_dir):
+                        self._prepare_shards()
+                    with self.__lock:
+                        self._load_shard(name)
+                        self.__loaded.add(name)
+
+    def _check_layout(self):
+        """raises ValueError if the sharded layout is used with a journal
+
+        Shards are rewritten whole by save(), which would silently ignore
+        the journal.
+        """
+        if self.__sharded and self.__journal:
+            raise ValueError("HBNB_FILE_JOURNAL cannot be used with "
+                             "HBNB_FILE_LAYOUT=sharded")
+
+    def _prepare_shards(self):
+        """creates the shard directory, migrating __file_path if found
+
+        The changes journaled on top of __file_path are migrated with it.
+        """
+        if os.path.exists(self.__file_path) or \
+                os.path.exists(self.__journal_path):
+            migrate_to_shards(self.__file_path, self.__shard_dir,
+                              self.__codec, self.__journal_path)
+        else:
+            os.makedirs(self.__shard_dir, exist_ok=True)
+
+    def _shard_path(self, name):
+        """returns the path of the shard of class `name`"""
+        return os.path.join(self.__shard_dir, name + self.__codec.extension)
+
+    def _load_shard(self, name):
+        """reads the records of the shard of class `name`"""
+        path = self._shard_path(name)
+        signature = self._path_signature(path)
+        try:
+            for key, record in self.__codec.read(path):
+                self._load(key, record)
+        except Exception:
+            pass
+        self.__shard_signatures[name] = signature
+
+    def _snapshot(self, name=None):
+        """returns a read-only copy of the objects of class `name`, or all
+
+        The copy is shared by readers until those objects change, so
+        iterating it never races with new() or delete().
+        """
+        source = (self.__objects if name is None
+                  else self.__by_class.get(name, {}))
+        cached = self.__snapshots.get(name)
+        if cached is not None and cached[0] is source:
+            return cached[1]
+        with self.__lock:
+            source = (self.__objects if name is None
+                      else self._partition(name))
+            cached = self.__snapshots.get(name)
+            if cached is None or cached[0] is not source:
+                cached = (source, MappingProxyType(dict(source)))
+                if name is None or name in classes:
+                    self.__snapshots[name] = cached
+            return cached[1]
 
     def all(self, cls=None):
-        """returns the dictionary __objects"""
+        """returns a read-only snapshot of __objects
+
+        With a class, returns a snapshot of that class's objects only.
+        """
+        self._require(None if cls is None else self._class_name(cls))
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
-        return self.__objects
+            snapshot = self._snapshot(self._class_name(cls))
+            if self.__lazy:
+                return _LazyView(self, snapshot)
+            return snapshot
+        if self.__lazy:
+            for key, value in self._snapshot().items():
+                self._hydrate(key, value)
+        return self._snapshot()
+
+    def _hydrate(self, key, value):
+        """returns the instance for a stored value
+
+        Records kept by a lazy reload are turned into instances and
+        replace the record in storage.
+        """
+        if type(value) is not dict:
+            return value
+        with self.__lock:
+            value = self.__objects.get(key, value)
+            if type(value) is not dict:
+                return value
+            obj = classes[value["__class__"]](**value)
+            self._put(key, obj)
+            return obj
+
+    def nearby(self, cls, lat, lng, radius_km, limit=None):
+        """returns the objects of cls within radius_km of a point
+
+        The objects come with their distance in km as (object, distance)
+        pairs, nearest first, at most limit of them.
+        """
+        name = self._class_name(cls)
+        index = self._index_of(name, GridIndex)
+        with self.__lock:
+            partition = self._partition(name)
+            found = [(distance, key) for distance, key
+                     in index.within(lat, lng, radius_km)
+                     if key in partition][:limit]
+            return [(self._hydrate(key, partition[key]), distance)
+                    for distance, key in found]
+
+    def search(self, cls, query, limit=None):
+        """returns the objects of cls matching the words of query
+
+        The objects come with their BM25 score as (object, score) pairs,
+        best first, at most limit of them. The text index of cls is built
+        by the first search.
+        """
+        name = self._class_name(cls)
+        index = self._index_of(name, TextIndex)
+        with self.__lock:
+            partition = self._partition(name)
+            if not index.built:
+                index.build(partition.items())
+            found = [(score, key) for score, key in index.search(query)
+                     if key in partition][:limit]
+            return [(self._hydrate(key, partition[key]), score)
+                    for score, key in found]
+
+    def _index_of(self, name, kind):
+        """returns the index of type kind of class `name`, loaded
+
+        Raises ValueError if the class has no such index.
+        """
+        self._require(name)
+        for index in self._indexes(name):
+            if isinstance(index, kind):
+                return index
+        raise ValueError("{} has no {}".format(name, kind.__name__))
 
     def new(self, obj):
-        """sets in __objects the obj with key <obj class name>.id"""
+        """sets in __objects the obj with key <obj class name>.id
+
+        Raises ValueError if a unique attribute of obj is taken. An
+        object already stored is not checked again: its changes were
+        checked by check_unique().
+        """
         if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            name = obj.__class__.__name__
+            key = name + "." + obj.id
+            self._require(name)
+            with self.__lock:
+                if self.__objects.get(key) is not obj:
+                    for index in self._indexes(name):
+                        self._check(index, key, index.value_of(obj))
+                self._put(key, obj)
+                self.__dirty.add(key)
+
+    def bulk_new(self, objs):
+        """stores every object of objs, then saves them in a single write
+
+        Unique indexes are checked for the whole batch first: nothing is
+        stored when one object conflicts with a stored object or with
+        another object of the batch.
+
+        Returns:
+            The number of objects stored
+        """
+        batch = {}
+        for obj in objs:
+            name = obj.__class__.__name__
+            self._require(name)
+            batch[name + "." + obj.id] = obj
+        with self.__lock:
+            taken = {}
+            for key, obj in batch.items():
+                name = key.partition(".")[0]
+                for index in self._indexes(name):
+                    value = index.value_of(obj)
+                    self._check(index, key, value)
+                    if not index.unique or value is None or value == "":
+                        continue
+                    if taken.setdefault((name, index.attr, value),
+                                        key) != key:
+                        raise ValueError("{} {} {!r} already exists".format(
+                            name, index.attr, value))
+            for key, obj in batch.items():
+                self._put(key, obj)
+                self.__dirty.add(key)
+        if batch:
+            self.save()
+        return len(batch)
+
+    @staticmethod
+    def _check(index, key, value):
+        """raises ValueError if a unique index holds value for another key"""
+        if index.conflicts(key, value):
+            raise ValueError("{} {} {!r} already exists".format(
+                key.partition(".")[0], index.attr, value))
+
+    def check_unique(self, obj, attr, value):
+        """raises ValueError if value of attr is taken by another object
+
+        Only stored objects and unique indexes are checked, and only
+        when value differs from the current one.
+        """
+        name = obj.__class__.__name__
+        index = self.__indexes.get(name, {}).get(attr)
+        if index is not None and index.unique and \
+                obj.__dict__.get(attr) != value:
+            key = name + "." + obj.__dict__.get("id", "")
+            with self.__lock:
+                if self.__objects.get(key) is obj:
+                    self._check(index, key, value)
+
+    def touch(self, obj, attr=None):
+        """flags obj as changed since the last save if it is stored
+
+        A change of an indexed attribute moves obj in its index.
+        """
+        name = obj.__class__.__name__
+        key = name + "." + obj.__dict__.get("id", "")
+        with self.__lock:
+            if self.__objects.get(key) is obj:
+                self.__dirty.add(key)
+                index = self.__indexes.get(name, {}).get(attr)
+                if index is not None:
+                    index.add(key, obj)
+                if self.__results is not None:
+                    self.__results.bump((name,))
+
+    def query(self, cls, where=None, order_by=None, limit=None, offset=0,
+              load=None):
+        """returns the objects of cls matching where, ordered and sliced
+
+        where maps attributes to the values they must equal. order_by
+        names an attribute, prefixed by "-" for a descending order; the
+        objects keep their insertion order otherwise. The most selective
+        index of the where attributes narrows the objects looked at, and
+        a sorted index of order_by over every object spares the sort.
+        load is accepted for DBStorage: relationships are index lookups.
+
+        If HBNB_QUERY_CACHE_SIZE enables it, the result is cached until
+        an object of cls is stored, changed or removed.
+        """
+        name = self._class_name(cls)
+        self._require(name)
+        where = where or {}
+        key = None
+        if self.__results is not None:
+            key = ("query", name, tuple(sorted(where.items())), order_by,
+                   limit, offset)
+            try:
+                hash(key)
+            except TypeError:
+                key = None
+        if key is not None:
+            objects = self.__results.get(key, (name,))
+            if objects is not None:
+                return list(objects)
+            generations = self.__results.generation((name,))
+            objects = self._query(name, where, order_by, limit, offset)
+            self.__results.put(key, (name,), generations, objects)
+            return list(objects)
+        return self._query(name, where, order_by, limit, offset)
+
+    def _query(self, name, where, order_by, limit, offset):
+        """returns the objects of class `name` matching a query()"""
+        indexes = self.__indexes.get(name, {})
+        attr = order_by.lstrip("-") if order_by else None
+        reverse = bool(order_by) and order_by.startswith("-")
+        stop = None if limit is None else offset + limit
+        with self.__lock:
+            partition = self._partition(name)
+            keys = None
+            for where_attr, value in where.items():
+                index = indexes.get(where_attr)
+                if isinstance(index, HashIndex) and \
+                        (value in (None, "") or not hashable(value)):
+                    # class defaults and unhashable values are not in
+                    # hash indexes
+                    continue
+                if isinstance(index, SortedIndex) and \
+                        not isinstance(value, (int, float)):
+                    continue
+                if isinstance(index, (HashIndex, SortedIndex)):
+                    found = index.lookup(value)
+                    if keys is None or len(found) < len(keys):
+                        keys = found
+            index = indexes.get(attr)
+            ordered = (keys is None and isinstance(index, SortedIndex) and
+                       len(index) == len(partition))
+            if ordered:
+                keys = index.range()[::-1 if reverse else 1]
+            elif keys is None:
+                keys = list(partition)
+            objects = []
+            for key in keys:
+                if key not in partition:
+                    continue
+                obj = self._hydrate(key, partition[key])
+                if all(getattr(obj, where_attr, None) == value
+                       for where_attr, value in where.items()):
+                    objects.append(obj)
+                    if ordered and len(objects) == stop:
+                        break
+        if attr is not None and not ordered:
+            objects.sort(key=lambda obj: _sort_key(getattr(obj, attr, None)),
+                         reverse=reverse)
+        return objects[offset:stop]
+
+    def iter(self, cls, after=None, batch_size=1000):
+        """yields the objects of cls ordered by (created_at, id)
+
+        Only the objects after the cursor after are yielded, see
+        models.engine.keyset. The keys are sorted once, then hydrated
+        batch_size at a time; objects deleted meanwhile are skipped.
+        """
+        name = self._class_name(cls)
+        self._require(name)
+        after = parse_cursor(after)
+        with self.__lock:
+            cursors = [(cursor_of(value), key) for key, value
+                       in self._partition(name).items()]
+        keys = [key for cursor, key in sorted(cursors)
+                if after is None or cursor > after]
+        del cursors
+        for start in range(0, len(keys), batch_size):
+            with self.__lock:
+                partition = self._partition(name)
+                batch = [self._hydrate(key, partition[key])
+                         for key in keys[start:start + batch_size]
+                         if key in partition]
+            yield from batch
+
+    def related(self, cls, attr, value):
+        """returns the objects of cls whose attribute attr equals value"""
+        return self.query(cls, where={attr: value})
+
+    def find_by(self, cls, attr, value):
+        """returns the first object of cls whose attr equals value
+
+        Returns:
+            The object if found, otherwise None
+        """
+        objects = self.query(cls, where={attr: value}, limit=1)
+        return objects[0] if objects else None
+
+    def find_range(self, cls, **bounds):
+        """returns the objects of cls whose attributes lie within bounds
+
+        Each bound is a (low, high) pair, included, either side None for
+        an open range. Attributes with a sorted index are bisected, the
+        others compared on the remaining objects. The objects are ordered
+        by the first attribute.
+        """
+        name = self._class_name(cls)
+        self._require(name)
+        indexes = self.__indexes.get(name, {})
+        checks = []
+        with self.__lock:
+            keys = None
+            for attr, (low, high) in bounds.items():
+                index = indexes.get(attr)
+                if not isinstance(index, SortedIndex):
+                    checks.append((attr, low, high))
+                elif keys is None:
+                    keys = index.range(low, high)
+                else:
+                    found = set(index.range(low, high))
+                    keys = [key for key in keys if key in found]
+            partition = self._partition(name)
+            objects = [self._hydrate(key, partition[key])
+                       for key in (partition if keys is None else keys)
+                       if key in partition]
+        objects = [obj for obj in objects
+                   if all(_within(getattr(obj, attr, None), low, high)
+                          for attr, low, high in checks)]
+        if checks and checks[0][0] == next(iter(bounds)):
+            # the first attribute has no sorted index to order them by
+            objects.sort(key=lambda obj: getattr(obj, checks[0][0]))
+        return objects
 
     def get(self, cls, id):
         """ Retrieves one object based on class and its ID
@@ -47,9 +649,12 @@ class FileStorage:
             The object if found, otherwise None
         """
         if cls and id:
-            get_obj = "{}.{}".format(cls.__name__, id)
-            objects = self.all(cls)
-            return objects.get(get_obj)
+            name = self._class_name(cls)
+            self._require(name)
+            partition = self.__by_class.get(name)
+            if partition is not None:
+                key = name + "." + id
+                return self._hydrate(key, partition.get(key))
         return None
 
     def count(self, cls=None):
@@ -59,40 +664,394 @@ class FileStorage:
             The count of the objects matching the given class,
             or all objects if None
         """
-        return len(self.all(cls))
+        if cls is None:
+            self._require()
+            return len(self.__objects)
+        name = self._class_name(cls)
+        self._require(name)
+        return len(self.__by_class.get(name, ()))
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        """serializes __objects to the JSON file (path: __file_path)
+
+        In group commit mode, waits until a batched commit that includes
+        the changes made so far is durable.
+        """
+        if self.__group_commit:
+            self._writer().submit().result()
+        else:
+            self._commit()
+
+    def _writer(self):
+        """returns the group commit writer, starting it if needed"""
+        with self.__lock:
+            if FileStorage.__writer is None:
+                FileStorage.__writer = GroupCommitWriter(
+                    self._commit, self.__commit_window)
+            return FileStorage.__writer
+
+    def query_cache_stats(self):
+        """returns the query result cache metrics, or None if disabled"""
+        if self.__results is None:
+            return None
+        return self.__results.stats()
+
+    def commit_stats(self):
+        """returns the group commit metrics, or None outside that mode"""
+        if FileStorage.__writer is None:
+            return None
+        return FileStorage.__writer.stats()
+
+    def _commit(self):
+        """writes the changes to the journal or to a new JSON snapshot
+
+        The sharded layout rewrites the shards of the changed classes.
+        """
+        with self.__io_lock, self._file_lock():
+            if self.__shared:
+                self._sync()
+            if self.__sharded:
+                self._write_shards()
+            elif self.__journal:
+                self._append_journal()
+            else:
+                self._write_snapshot()
+
+    def _encode(self, key, obj, dirty):
+        """returns the cached encoding of obj, refreshed if stale"""
+        cached = self.__fragments.get(key)
+        if cached is None or cached[0] is not obj or key in dirty:
+            cached = (obj, self.__codec.encode(key, obj))
+            self.__fragments[key] = cached
+        return cached[1]
+
+    def _write_snapshot(self):
+        """writes every object to the JSON file, re-encoding dirty ones
+
+        The file is replaced atomically by an fsync'ed temporary file.
+        Objects are encoded from a snapshot, outside of the lock.
+        """
+        with self.__io_lock:
+            with self.__lock:
+                objects = self._snapshot()
+                dirty = set(self.__dirty)
+                self.__dirty.clear()
+            fragments = [self._encode(key, obj, dirty)
+                         for key, obj in objects.items()]
+            self.__codec.write(self.__file_path, fragments)
+            FileStorage.__signature = self._file_signature()
+
+    def _write_shards(self):
+        """rewrites the shard of every class with dirty objects"""
+        with self.__io_lock:
+            with self.__lock:
+                dirty = set(self.__dirty)
+                self.__dirty.clear()
+                shards = {key.partition(".")[0]: None for key in dirty}
+                for name in shards:
+                    shards[name] = self._snapshot(name)
+            for name, objects in shards.items():
+                fragments = [self._encode(key, obj, dirty)
+                             for key, obj in objects.items()]
+                path = self._shard_path(name)
+                self.__codec.write(path, fragments)
+                self.__shard_signatures[name] = self._path_signature(path)
+
+    def _append_journal(self):
+        """appends the records changed since the last save to the journal
+
+        Deleted objects are appended as tombstones.
+        """
+        with self.__lock:
+            fragments = []
+            persisted = self.__persisted
+            for key in self.__dirty:
+                obj = self.__objects.get(key)
+                if obj is not None:
+                    fragments.append(self._encode(key, obj, self.__dirty))
+                    persisted.add(key)
+                elif key in persisted:
+                    persisted.discard(key)
+                    fragments.append(self.__codec.tombstone(key))
+            self.__dirty.clear()
+        if fragments:
+            size = self.__codec.append(self.__journal_path, fragments)
+            FileStorage.__signature = self._file_signature()
+            if size > self.__journal_max:
+                self.compact()
+
+    def compact(self):
+        """folds the journal into a new snapshot of the JSON file"""
+        with self.__io_lock, self._file_lock():
+            if self.__shared:
+                self._sync()
+            with self.__lock:
+                self._write_snapshot()
+                self.__persisted.clear()
+                self.__persisted.update(self.__objects)
+            open(self.__journal_path, 'w').close()
+            FileStorage.__signature = self._file_signature()
+
+    @staticmethod
+    def _path_signature(path):
+        """returns the (inode, size, mtime) of path, None if missing"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _file_signature(self):
+        """returns the (inode, size, mtime) of the files backing storage"""
+        paths = [self.__file_path]
+        if self.__journal:
+            paths.append(self.__journal_path)
+        return tuple(self._path_signature(path) for path in paths)
+
+    def reload_stats(self):
+        """returns how many reloads were performed and skipped"""
+        return dict(self.__reload_stats)
 
     def reload(self):
-        """deserializes the JSON file to __objects"""
+        """deserializes the JSON file to __objects
+
+        Does nothing if the files are unchanged since this process last
+        read or wrote them. The sharded layout only reads the shards of
+        the classes loaded so far. In multi-process mode the changes of
+        other processes are merged with the unsaved ones of this process.
+        """
+        if self.__shared:
+            with self.__io_lock, self._file_lock():
+                merged = self._sync()
+            self.__reload_stats["performed" if merged else "skipped"] += 1
+            return
+        if self.__sharded:
+            self._check_layout()
+            self._reload_shards()
+            return
+        with self.__io_lock:
+            signature = self._file_signature()
+            if signature == FileStorage.__signature:
+                self.__reload_stats["skipped"] += 1
+                return
+            with self.__lock:
+                try:
+                    for key, record in self.__codec.read(self.__file_path):
+                        self._load(key, record)
+                except Exception:
+                    pass
+                if self.__journal and self._replay_journal():
+                    signature = self._file_signature()
+            FileStorage.__signature = signature
+            self.__reload_stats["performed"] += 1
+
+    def _reload_shards(self):
+        """reads again the loaded shards that changed on disk"""
+        with self.__io_lock:
+            changed = [name for name in self.__loaded
+                       if self._path_signature(self._shard_path(name)) !=
+                       self.__shard_signatures.get(name)]
+            with self.__lock:
+                for name in changed:
+                    self._load_shard(name)
+            if changed:
+                self.__reload_stats["performed"] += 1
+            else:
+                self.__reload_stats["skipped"] += 1
+
+    @contextmanager
+    def _file_lock(self):
+        """holds the lock file shared with other processes, if enabled
+
+        Must be entered with __io_lock held; nested uses lock only once.
+        """
+        if not self.__shared or FileStorage.__lock_file is not None:
+            yield
+            return
+        if fcntl is None:
+            raise OSError("multi-process mode needs fcntl file locks")
+        with open(self.__file_path + ".lock", 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            FileStorage.__lock_file = f
+            try:
+                yield
+            finally:
+                FileStorage.__lock_file = None
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _sync(self):
+        """merges the files changed by other processes since last seen
+
+        Files whose signature is unchanged are not read again.
+
+        Returns:
+            True if a file was read, otherwise False
+        """
+        if self.__sharded:
+            merged = False
+            for name in list(self.__loaded):
+                path = self._shard_path(name)
+                signature = self._path_signature(path)
+                if signature != self.__shard_signatures.get(name):
+                    self._merge(self._read_records(path), name)
+                    self.__shard_signatures[name] = signature
+                    merged = True
+            return merged
+        signature = self._file_signature()
+        if signature == FileStorage.__signature:
+            return False
+        self._merge(self._read_records())
+        # the file lock is held: only a torn journal cut off by
+        # _read_records() can have changed the files since
+        FileStorage.__signature = self._file_signature()
+        return True
+
+    def _read_records(self, path=None):
+        """returns the records of a shard, or of the file and journal"""
+        records = {}
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
+            for key, record in self.__codec.read(path or self.__file_path):
+                records[key] = record
         except Exception:
             pass
+        if path is None and self.__journal:
+            try:
+                for key, record in self.__codec.read_journal(
+                        self.__journal_path):
+                    if record is None:
+                        records.pop(key, None)
+                    else:
+                        records[key] = record
+            except FileNotFoundError:
+                pass
+            except TornJournalError as error:
+                os.truncate(self.__journal_path, error.offset)
+        return records
+
+    def _merge(self, records, name=None):
+        """applies records read from disk to the objects of this process
+
+        Objects created, changed or deleted here since the last save keep
+        their local state. The others follow the records, deletions
+        included. Only the objects of class `name` are merged if given.
+        """
+        with self.__lock:
+            local = self.__objects if name is None else self._partition(name)
+            for key in [key for key in local
+                        if key not in records and key not in self.__dirty]:
+                self._remove(key)
+                self.__dirty.discard(key)
+                self.__persisted.discard(key)
+            for key, record in records.items():
+                if key in self.__dirty:
+                    continue
+                value = local.get(key)
+                if value is not None and record == (
+                        value if type(value) is dict else value.to_dict()):
+                    continue
+                self._load(key, record)
+
+    def _load(self, key, record):
+        """stores the object built from a record read from disk as clean
+
+        In lazy mode the record itself is stored until first accessed.
+        The object is only encoded by the first save.
+        """
+        if self.__lazy:
+            self._put(key, record)
+        else:
+            self._put(key, classes[record["__class__"]](**record))
+        self.__fragments.pop(key, None)
+        self.__dirty.discard(key)
+        if self.__journal:
+            self.__persisted.add(key)
+
+    def _replay_journal(self):
+        """applies the journal records on top of the loaded snapshot
+
+        A torn tail left by a crash is cut off, so that the next append
+        starts after the last good record.
+
+        Returns:
+            True if the journal was truncated, otherwise False
+        """
+        try:
+            for key, record in self.__codec.read_journal(self.__journal_path):
+                if record is None:
+                    self._remove(key)
+                    self.__dirty.discard(key)
+                    self.__persisted.discard(key)
+                else:
+                    self._load(key, record)
+        except FileNotFoundError:
+            pass
+        except TornJournalError as error:
+            os.truncate(self.__journal_path, error.offset)
+            return True
+        return False
+
+    def _remove(self, key):
+        """removes the object stored under key, if any"""
+        with self.__lock:
+            if key in self.__objects:
+                name = key.partition(".")[0]
+                for index in self._indexes(name):
+                    index.discard(key)
+                del self.__objects[key]
+                self._partition(name).pop(key, None)
+                self.__snapshots.pop(None, None)
+                self.__snapshots.pop(name, None)
+                self.__fragments.pop(key, None)
+                self.__dirty.add(key)
+                if self.__results is not None:
+                    self.__results.bump((name,))
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
-            key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            self._require(obj.__class__.__name__)
+            self._remove(obj.__class__.__name__ + '.' + obj.id)
+
+    def bulk_delete(self, cls, ids):
+        """deletes the objects of cls with the given ids in a single write
+
+        Returns:
+            The number of objects deleted
+        """
+        name = self._class_name(cls)
+        self._require(name)
+        deleted = 0
+        with self.__lock:
+            for id in ids:
+                key = name + "." + id
+                if key in self.__objects:
+                    self._remove(key)
+                    deleted += 1
+        if deleted:
+            self.save()
+        return deleted
 
     def delete_all(self):
         """Delete all objects from __objects"""
-        self.__objects = {}
+        self._require()
+        with self.__lock:
+            self.__dirty.update(self.__objects)
+            self.__objects.clear()
+            self.__by_class.clear()
+            self.__fragments.clear()
+            self.__snapshots.clear()
+            for name in self.__indexes:
+                for index in self._indexes(name):
+                    index.clear()
+            if self.__results is not None:
+                self.__results.clear()
         self.save()
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
+        """call reload() method for deserializing the JSON file to objects
+
+        The files are only parsed again if another process changed them.
+        """
         self.reload()
 
 
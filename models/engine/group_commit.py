@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Contains the GroupCommitWriter class
+"""
+
+from concurrent.futures import Future
+import threading
+import time
+
+
+class GroupCommitWriter:
+    """runs the commits requested by many threads on one writer thread
+
+    Requests arriving within `window` seconds of the first pending one
+    share a single call to `commit`.
+    """
+
+    def __init__(self, commit, window=0.005):
+        """Starts the writer thread for the `commit` callable"""
+        self.__commit = commit
+        self.__window = window
+        self.__pending = []
+        self.__cond = threading.Condition()
+        self.__stopped = False
+        self.__stats = {"batches": 0, "requests": 0, "max_batch": 0,
+                        "last_latency": 0.0, "max_latency": 0.0,
+                        "total_latency": 0.0}
+        self.__thread = threading.Thread(target=self.__run, daemon=True,
+                                         name="hbnb-group-commit")
+        self.__thread.start()
+
+    def submit(self):
+        """requests a commit
+
+        Returns:
+            A Future resolved once a commit started after this call is done
+        """
+        future = Future()
+        with self.__cond:
+            if self.__stopped:
+                raise RuntimeError("group commit writer is stopped")
+            self.__pending.append(future)
+            self.__cond.notify()
+        return future
+
+    def stop(self):
+        """commits the pending requests and stops the writer thread"""
+        with self.__cond:
+            self.__stopped = True
+            self.__cond.notify()
+        self.__thread.join()
+
+    def stats(self):
+        """returns the batch size and commit latency metrics
+
+        Latencies are in seconds and measure the commit itself.
+        """
+        with self.__cond:
+            stats = dict(self.__stats)
+        batches = stats["batches"]
+        stats["mean_batch"] = stats["requests"] / batches if batches else 0
+        stats["mean_latency"] = (stats.pop("total_latency") / batches
+                                 if batches else 0.0)
+        return stats
+
+    def __run(self):
+        """waits for requests and commits them in batches"""
+        while True:
+            with self.__cond:
+                while not self.__pending and not self.__stopped:
+                    self.__cond.wait()
+                if not self.__pending:
+                    return
+                deadline = time.monotonic() + self.__window
+                while not self.__stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__cond.wait(remaining)
+                batch = self.__pending
+                self.__pending = []
+            error = None
+            start = time.perf_counter()
+            try:
+                self.__commit()
+            except Exception as e:
+                error = e
+            latency = time.perf_counter() - start
+            with self.__cond:
+                stats = self.__stats
+                stats["batches"] += 1
+                stats["requests"] += len(batch)
+                stats["max_batch"] = max(stats["max_batch"], len(batch))
+                stats["last_latency"] = latency
+                stats["max_latency"] = max(stats["max_latency"], latency)
+                stats["total_latency"] += latency
+            for future in batch:
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
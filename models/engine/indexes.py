@@ -0,0 +1,450 @@
+#!/usr/bin/python3
+"""
+Contains the in-memory indexes kept by FileStorage
+"""
+
+import bisect
+from collections import Counter
+import heapq
+import math
+import re
+
+earth_radius_km = 6371.0088
+
+
+def tokenize(text):
+    """returns the lowercase words of text"""
+    return re.findall(r"\w+", text.lower())
+
+
+def hashable(value):
+    """tells if value can be a key of a hash index"""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """returns the great-circle distance in km between two points"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) *
+         math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * earth_radius_km * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """returns the (south, north, west, east) degrees around a circle
+
+    West and east are None when the circle spans every longitude, and
+    west is greater than east when it crosses the antimeridian.
+    """
+    angle = radius_km / earth_radius_km
+    south = lat - math.degrees(angle)
+    north = lat + math.degrees(angle)
+    if south <= -90 or north >= 90 or angle >= math.pi / 2:
+        return max(south, -90.0), min(north, 90.0), None, None
+    spread = math.sin(angle) / math.cos(math.radians(lat))
+    if spread >= 1:
+        return south, north, None, None
+    dlng = math.degrees(math.asin(spread))
+    west = (lng - dlng + 180) % 360 - 180
+    east = (lng + dlng + 180) % 360 - 180
+    return south, north, west, east
+
+
+class HashIndex:
+    """maps the values of one attribute to the keys of the objects
+
+    Objects may be instances or the records kept by a lazy reload. Keys
+    sharing a value are kept in insertion order. A unique index does not
+    refuse them itself: callers check conflicts() before a change. Values
+    that cannot be hashed, such as lists, are not indexed.
+    """
+
+    def __init__(self, attr, unique=False):
+        """Builds an empty index of the attribute attr"""
+        self.attr = attr
+        self.unique = unique
+        # dictionary - keys (as an ordered dict of None) by value
+        self.__keys = {}
+        # dictionary - indexed value by key
+        self.__values = {}
+
+    def value_of(self, obj):
+        """returns the indexed attribute of an instance or a record
+
+        Class defaults of instances and unhashable values are not
+        indexed: None is returned for them.
+        """
+        if type(obj) is dict:
+            value = obj.get(self.attr)
+        else:
+            value = obj.__dict__.get(self.attr)
+        return value if hashable(value) else None
+
+    def add(self, key, obj):
+        """indexes obj under key, replacing its previous value if any"""
+        value = self.value_of(obj)
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+            self.discard(key)
+        if value is None:
+            return
+        self.__values[key] = value
+        self.__keys.setdefault(value, {})[key] = None
+
+    def discard(self, key):
+        """removes key from the index if it is there"""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        keys = self.__keys[value]
+        del keys[key]
+        if not keys:
+            del self.__keys[value]
+
+    def conflicts(self, key, value):
+        """tells if a unique index holds value for a key other than key
+
+        Empty and unhashable values never conflict.
+        """
+        if not self.unique or value is None or value == "" or \
+                not hashable(value):
+            return False
+        return any(other != key for other in self.__keys.get(value, ()))
+
+    def lookup(self, value):
+        """returns the list of keys whose indexed attribute equals value
+
+        Unhashable values are not indexed: callers look them up by
+        comparing the objects themselves.
+        """
+        if not hashable(value):
+            return []
+        return list(self.__keys.get(value, ()))
+
+    def clear(self):
+        """removes every key from the index"""
+        self.__keys.clear()
+        self.__values.clear()
+
+    def __len__(self):
+        """returns the number of indexed keys"""
+        return len(self.__values)
+
+
+class NonUniqueIndex:
+    """base of the indexes that never refuse a value
+
+    They only serve lookups, so there is no conflict to check.
+    """
+    unique = False
+
+    def conflicts(self, key, value):
+        """tells if value is taken by another key, never for this index"""
+        return False
+
+
+class SortedIndex(NonUniqueIndex):
+    """keeps the keys of the objects sorted by one numeric attribute
+
+    Range lookups bisect the sorted values. Objects without their own
+    value are indexed under the class default; values that are not
+    numbers are not indexed. Keys added since the last lookup are only
+    sorted in by the next one, so a reload sorts them once.
+    """
+
+    def __init__(self, attr, default=None):
+        """Builds an empty index of the attribute attr"""
+        self.attr = attr
+        self.default = default
+        # list - (value, key) pairs in ascending order
+        self.__sorted = []
+        # dictionary - value by key of the keys not sorted in yet
+        self.__pending = {}
+        # dictionary - indexed value by key
+        self.__values = {}
+
+    def value_of(self, obj):
+        """returns the indexed attribute of an instance or a record"""
+        if type(obj) is dict:
+            return obj.get(self.attr, self.default)
+        return getattr(obj, self.attr, self.default)
+
+    def add(self, key, obj):
+        """indexes obj under key, replacing its previous value if any"""
+        value = self.value_of(obj)
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+            self.discard(key)
+        if not isinstance(value, (int, float)) or value != value:
+            # NaN is not ordered
+            return
+        self.__values[key] = value
+        self.__pending[key] = value
+
+    def discard(self, key):
+        """removes key from the index if it is there"""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        if self.__pending.pop(key, None) is not None:
+            return
+        i = bisect.bisect_left(self.__sorted, (value, key))
+        del self.__sorted[i]
+
+    def _settle(self):
+        """sorts the pending keys in"""
+        pending = self.__pending
+        if len(pending) < 16:
+            for key, value in pending.items():
+                bisect.insort(self.__sorted, (value, key))
+        else:
+            self.__sorted.extend((value, key)
+                                 for key, value in pending.items())
+            self.__sorted.sort()
+        pending.clear()
+
+    def lookup(self, value):
+        """returns the list of keys whose indexed attribute equals value"""
+        return self.range(value, value)
+
+    def range(self, low=None, high=None):
+        """returns the keys whose value lies between low and high included
+
+        Either bound may be None for an open range. Keys are ordered by
+        value.
+        """
+        if self.__pending:
+            self._settle()
+        entries = self.__sorted
+        start = 0 if low is None else bisect.bisect_left(entries, (low,))
+        if high is None:
+            end = len(entries)
+        else:
+            end = bisect.bisect_left(entries, (high,), start)
+            while end < len(entries) and entries[end][0] == high:
+                end += 1
+        return [key for value, key in entries[start:end]]
+
+    def clear(self):
+        """removes every key from the index"""
+        self.__sorted.clear()
+        self.__pending.clear()
+        self.__values.clear()
+
+    def __len__(self):
+        """returns the number of indexed keys"""
+        return len(self.__values)
+
+
+class GridIndex(NonUniqueIndex):
+    """buckets the keys of the objects by latitude/longitude grid cell
+
+    Radius lookups only measure the distance to the objects in the cells
+    overlapping the bounding box of the circle. Objects without their
+    own numeric coordinates are not indexed.
+    """
+
+    def __init__(self, lat_attr, lng_attr, cell_deg=0.1):
+        """Builds an empty index of the coordinates lat_attr, lng_attr"""
+        self.attrs = (lat_attr, lng_attr)
+        self.cell_deg = cell_deg
+        # integer - number of cells around a parallel
+        self.__columns = math.ceil(360 / cell_deg)
+        # dictionary - keys (as an ordered dict of None) by (row, column)
+        self.__cells = {}
+        # dictionary - indexed (latitude, longitude) by key
+        self.__points = {}
+
+    def value_of(self, obj):
+        """returns the (latitude, longitude) of an instance or a record"""
+        values = obj if type(obj) is dict else obj.__dict__
+        lat, lng = (values.get(attr) for attr in self.attrs)
+        if not isinstance(lat, (int, float)) or \
+                not isinstance(lng, (int, float)) or not -90 <= lat <= 90:
+            return None
+        return (float(lat), (lng + 180) % 360 - 180)
+
+    def _cell(self, lat, lng):
+        """returns the (row, column) of the cell holding a point"""
+        return (math.floor(lat / self.cell_deg),
+                math.floor((lng + 180) / self.cell_deg) % self.__columns)
+
+    def add(self, key, obj):
+        """indexes obj under key, replacing its previous point if any"""
+        point = self.value_of(obj)
+        if key in self.__points:
+            if self.__points[key] == point:
+                return
+            self.discard(key)
+        if point is None:
+            return
+        self.__points[key] = point
+        self.__cells.setdefault(self._cell(*point), {})[key] = None
+
+    def discard(self, key):
+        """removes key from the index if it is there"""
+        if key not in self.__points:
+            return
+        cell = self._cell(*self.__points.pop(key))
+        keys = self.__cells[cell]
+        del keys[key]
+        if not keys:
+            del self.__cells[cell]
+
+    def within(self, lat, lng, radius_km):
+        """returns the (distance, key) pairs within radius_km of a point
+
+        Distances are in km, nearest first.
+        """
+        south, north, west, east = bounding_box(lat, lng, radius_km)
+        rows = range(math.floor(south / self.cell_deg),
+                     math.floor(north / self.cell_deg) + 1)
+        if west is None:
+            columns = range(self.__columns)
+        else:
+            first, last = self._cell(0, west)[1], self._cell(0, east)[1]
+            if last < first:
+                last += self.__columns
+            columns = [column % self.__columns
+                       for column in range(first, last + 1)]
+        if len(rows) * len(columns) > len(self.__cells):
+            # fewer occupied cells than cells in the box: filter those
+            columns = set(columns)
+            cells = [keys for (row, column), keys in self.__cells.items()
+                     if row in rows and column in columns]
+        else:
+            cells = [self.__cells[(row, column)] for row in rows
+                     for column in columns
+                     if (row, column) in self.__cells]
+        found = []
+        for keys in cells:
+            for key in keys:
+                distance = haversine(lat, lng, *self.__points[key])
+                if distance <= radius_km:
+                    found.append((distance, key))
+        found.sort()
+        return found
+
+    def clear(self):
+        """removes every key from the index"""
+        self.__cells.clear()
+        self.__points.clear()
+
+    def __len__(self):
+        """returns the number of indexed keys"""
+        return len(self.__points)
+
+
+class TextIndex(NonUniqueIndex):
+    """inverted index of the words of one or more text attributes
+
+    Searches rank the objects by BM25 over the words of the query. A
+    lazy index ignores every change until build() fills it.
+    """
+    # float - term frequency saturation of BM25
+    k1 = 1.2
+    # float - document length normalization of BM25
+    b = 0.75
+
+    def __init__(self, *attrs, lazy=False):
+        """Builds an empty index of the words of attrs"""
+        self.attrs = attrs
+        # boolean - tells if the index follows the changes
+        self.built = not lazy
+        # dictionary - frequency of a word by key, by word
+        self.__postings = {}
+        # dictionary - Counter of the words by key
+        self.__words = {}
+        # dictionary - number of words by key
+        self.__lengths = {}
+        # integer - number of words of every indexed object
+        self.__total = 0
+
+    def value_of(self, obj):
+        """returns the text of the attributes of an instance or a record"""
+        values = obj if type(obj) is dict else obj.__dict__
+        return " ".join(value for value in
+                        (values.get(attr) for attr in self.attrs)
+                        if isinstance(value, str))
+
+    def add(self, key, obj):
+        """indexes the words of obj under key, replacing previous ones"""
+        if not self.built:
+            return
+        words = Counter(tokenize(self.value_of(obj)))
+        if self.__words.get(key) == words:
+            return
+        self.discard(key)
+        if not words:
+            return
+        self.__words[key] = words
+        self.__lengths[key] = sum(words.values())
+        self.__total += self.__lengths[key]
+        for word, frequency in words.items():
+            self.__postings.setdefault(word, {})[key] = frequency
+
+    def discard(self, key):
+        """removes key from the index if it is there"""
+        words = self.__words.pop(key, None)
+        if words is None:
+            return
+        self.__total -= self.__lengths.pop(key)
+        for word in words:
+            postings = self.__postings[word]
+            del postings[key]
+            if not postings:
+                del self.__postings[word]
+
+    def build(self, items):
+        """indexes every (key, object) pair of items from scratch
+
+        The index follows the changes from then on.
+        """
+        self.clear()
+        self.built = True
+        for key, obj in items:
+            self.add(key, obj)
+
+    def search(self, query, limit=None):
+        """returns the (score, key) pairs of the objects matching query
+
+        Pairs are ordered by decreasing BM25 score, at most limit of them.
+        """
+        count = len(self.__words)
+        if not count:
+            return []
+        average = self.__total / count
+        scores = {}
+        for word in set(tokenize(query)):
+            postings = self.__postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) /
+                           (len(postings) + 0.5))
+            for key, frequency in postings.items():
+                norm = frequency + self.k1 * (
+                    1 - self.b + self.b * self.__lengths[key] / average)
+                scores[key] = (scores.get(key, 0) +
+                               idf * frequency * (self.k1 + 1) / norm)
+        found = [(score, key) for key, score in scores.items()]
+        order = (lambda item: (-item[0], item[1]))
+        if limit is None:
+            return sorted(found, key=order)
+        return heapq.nsmallest(limit, found, key=order)
+
+    def clear(self):
+        """removes every key from the index"""
+        self.__postings.clear()
+        self.__words.clear()
+        self.__lengths.clear()
+        self.__total = 0
+
+    def __len__(self):
+        """returns the number of indexed keys"""
+        return len(self.__words)
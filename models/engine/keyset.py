@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+"""
+Contains the keyset cursor helpers of storage.iter()
+
+A cursor is the (created_at, id) pair of the last object a caller saw.
+Objects are iterated in that order, so the objects after a cursor stay
+the same whatever is inserted or deleted before it.
+"""
+
+from datetime import datetime
+from models.base_model import time
+
+
+def _datetime(value):
+    """returns value as a datetime, parsing it if it is a string"""
+    if isinstance(value, str):
+        return datetime.strptime(value, time)
+    return value
+
+
+def cursor_of(obj):
+    """returns the (created_at, id) cursor of an instance or a record"""
+    if type(obj) is dict:
+        return (_datetime(obj.get("created_at")), obj.get("id"))
+    return (_datetime(obj.created_at), obj.id)
+
+
+def parse_cursor(after):
+    """returns the (created_at, id) cursor given by after, or None
+
+    after is an object or a (created_at, id) pair, created_at being a
+    datetime or a string in the format of to_dict().
+    """
+    if after is None:
+        return None
+    if isinstance(after, tuple):
+        created_at, id = after
+        return (_datetime(created_at), id)
+    return cursor_of(after)
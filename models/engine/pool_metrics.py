@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+"""
+Contains the PoolMetrics class and the TimedQueuePool used by DBStorage
+"""
+
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """a QueuePool reporting how long each checkout took to its metrics
+
+    The time includes waiting for a free connection and opening a new
+    one.
+    """
+    # PoolMetrics - receives the checkout times, if any
+    metrics = None
+
+    def connect(self):
+        """checks a connection out, timing the call"""
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.metrics is not None:
+                self.metrics.waited(time.perf_counter() - start)
+
+    def recreate(self):
+        """returns a new pool of the same settings and metrics"""
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class PoolMetrics:
+    """counts the connections of an engine and the sessions using them
+
+    Times are in seconds. A session lives from its first transaction
+    until it is closed, that is for one API request.
+    """
+
+    def __init__(self):
+        """Builds empty metrics"""
+        self.__lock = threading.Lock()
+        self.__engine = None
+        self.__stats = {"checkouts": 0, "checkins": 0, "connects": 0,
+                        "invalidations": 0, "max_wait": 0.0,
+                        "total_wait": 0.0, "sessions": 0,
+                        "max_session": 0.0, "total_session": 0.0}
+
+    def attach(self, engine):
+        """listens to the pool events of engine"""
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = self
+        self.__engine = engine
+        for name in ("checkout", "checkin", "connect", "invalidate"):
+            event.listen(engine, name, self.__counter(name))
+
+    def watch(self, session_factory):
+        """records when the sessions of session_factory start"""
+        event.listen(session_factory, "after_transaction_create",
+                     self.__started)
+
+    def __counter(self, name):
+        """returns a pool event listener counting the event name"""
+        stat = {"checkout": "checkouts", "checkin": "checkins",
+                "connect": "connects", "invalidate": "invalidations"}[name]
+
+        def count(*args):
+            """counts one event"""
+            with self.__lock:
+                self.__stats[stat] += 1
+        return count
+
+    @staticmethod
+    def __started(session, transaction):
+        """stamps a session with the start of its first transaction"""
+        if transaction.parent is None:
+            session.info.setdefault("hbnb_started", time.perf_counter())
+
+    def waited(self, seconds):
+        """records a checkout of seconds"""
+        with self.__lock:
+            self.__stats["total_wait"] += seconds
+            self.__stats["max_wait"] = max(self.__stats["max_wait"], seconds)
+
+    def closed(self, session):
+        """records the lifetime of a session about to be closed"""
+        started = session.info.pop("hbnb_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        with self.__lock:
+            self.__stats["sessions"] += 1
+            self.__stats["total_session"] += seconds
+            self.__stats["max_session"] = max(self.__stats["max_session"],
+                                              seconds)
+
+    def stats(self):
+        """returns the pool and session metrics
+
+        size, checked_out and overflow describe the pool right now and are
+        None for pools without those limits.
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+        checkouts = stats["checkouts"]
+        stats["mean_wait"] = (stats.pop("total_wait") / checkouts
+                              if checkouts else 0.0)
+        sessions = stats["sessions"]
+        stats["mean_session"] = (stats.pop("total_session") / sessions
+                                 if sessions else 0.0)
+        pool = self.__engine.pool if self.__engine is not None else None
+        for name, attr in (("size", "size"), ("checked_out", "checkedout"),
+                           ("overflow", "overflow")):
+            stats[name] = (getattr(pool, attr)()
+                           if isinstance(pool, QueuePool) else None)
+        return stats
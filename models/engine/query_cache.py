@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""
+Contains the QueryCache class, the query result cache of the storages
+"""
+
+from collections import OrderedDict
+from os import getenv
+import threading
+import time
+from models.engine.session_cache import SessionCache
+
+
+class QueryCache(SessionCache):
+    """an LRU cache of query results invalidated by class generations
+
+    Every class has a generation, bumped whenever one of its objects is
+    created, changed or deleted. A result is stored with the generations
+    of the classes it was computed from and is only served while they
+    are unchanged. At most max_size results of at most max_rows rows are
+    kept, each for ttl seconds.
+
+    Results are computed by the caller: FileStorage bumps the classes it
+    stores or removes objects of, while watch() bumps the classes flushed
+    by the sessions of DBStorage.
+    """
+    info_key = "result_classes"
+
+    def __init__(self, max_size=256, ttl=60.0, max_rows=1000):
+        """Builds an empty cache"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.__lock = threading.Lock()
+        # OrderedDict - (expiry time, generations, result) by key, oldest
+        # use first
+        self.__entries = OrderedDict()
+        # dictionary - generation by class name
+        self.__generations = {}
+        # integer - generation of every class, bumped by clear()
+        self.__epoch = 0
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0,
+                        "expirations": 0, "stale": 0}
+
+    def _token(self, names):
+        """returns the generations of the classes names, lock held"""
+        return (self.__epoch,) + tuple(self.__generations.get(name, 0)
+                                       for name in names)
+
+    def generation(self, names):
+        """returns the generations of the classes names, to hand to put()
+
+        Take it before computing the result.
+        """
+        with self.__lock:
+            return self._token(names)
+
+    def get(self, key, names):
+        """returns the result cached under key for the classes names
+
+        Returns:
+            The result, or None if it is missing, expired or stale
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if entry[0] <= time.monotonic():
+                    stat = "expirations"
+                elif entry[1] != self._token(names):
+                    stat = "stale"
+                else:
+                    self.__entries.move_to_end(key)
+                    self.__stats["hits"] += 1
+                    return entry[2]
+                del self.__entries[key]
+                self.__stats[stat] += 1
+            self.__stats["misses"] += 1
+            return None
+
+    def put(self, key, names, generations, result):
+        """caches result under key if the classes names are still at the
+        generations returned by generation(names)
+
+        Results of more than max_rows rows are not cached, and neither
+        are results whose classes changed while they were computed.
+        """
+        if self.max_size <= 0 or \
+                (isinstance(result, list) and len(result) > self.max_rows):
+            return
+        with self.__lock:
+            if generations != self._token(names):
+                return
+            self.__entries[key] = (time.monotonic() + self.ttl, generations,
+                                   result)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__stats["evictions"] += 1
+
+    def bump(self, names):
+        """starts a new generation of the classes names"""
+        with self.__lock:
+            for name in names:
+                self.__generations[name] = self.__generations.get(name, 0) + 1
+
+    def clear(self):
+        """drops every result and starts a new generation of every class"""
+        with self.__lock:
+            self.__epoch += 1
+            self.__entries.clear()
+
+    def _written(self, session):
+        """returns the names of the classes a flush of session writes"""
+        return {obj.__class__.__name__ for obj in
+                list(session.new) + list(session.dirty) +
+                list(session.deleted)}
+
+    def _expire(self, names):
+        """bumps the written classes"""
+        self.bump(names)
+
+    def _counts(self):
+        """returns the hit, miss, eviction and staleness counts, and the
+        number of results"""
+        with self.__lock:
+            return dict(self.__stats), len(self.__entries)
+
+
+def get_query_cache():
+    """returns the query result cache set by the environment, or None
+
+    HBNB_QUERY_CACHE_SIZE results are kept for HBNB_QUERY_CACHE_TTL
+    seconds, each of at most HBNB_QUERY_CACHE_ROWS rows.
+    """
+    size = int(getenv("HBNB_QUERY_CACHE_SIZE", "0"))
+    if size <= 0:
+        return None
+    return QueryCache(size, float(getenv("HBNB_QUERY_CACHE_TTL", "60")),
+                      int(getenv("HBNB_QUERY_CACHE_ROWS", "1000")))
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""
+Contains the SessionCache class, the base of the caches of DBStorage
+"""
+
+from sqlalchemy import event
+
+
+class SessionCache:
+    """base of the caches kept in sync with the writes of sessions
+
+    What a session writes is expired when it is flushed and again once
+    the transaction is committed, since other sessions may refill the
+    cache in between. Until then, session.info keeps it under info_key.
+
+    Subclasses return what a flush writes from _written(), expire it in
+    _expire() and return their counts and size from _counts().
+    """
+    # string - key of session.info remembering the writes of a transaction
+    info_key = None
+
+    def watch(self, session_factory):
+        """expires what the sessions of session_factory write"""
+        event.listen(session_factory, "before_flush", self.__flushing)
+        event.listen(session_factory, "after_commit", self.__committed)
+        event.listen(session_factory, "after_rollback", self.__rolled_back)
+
+    def __flushing(self, session, context, instances):
+        """expires and remembers what is about to be written"""
+        written = self._written(session)
+        session.info.setdefault(self.info_key, set()).update(written)
+        self._expire(written)
+
+    def __committed(self, session):
+        """expires what the committed transaction wrote"""
+        written = session.info.pop(self.info_key, None)
+        if written:
+            self._expire(written)
+
+    def __rolled_back(self, session):
+        """forgets what a rolled back transaction wrote"""
+        session.info.pop(self.info_key, None)
+
+    def stats(self):
+        """returns the counts of the cache, its size and its hit ratio"""
+        stats, size = self._counts()
+        stats["size"] = size
+        stats["max_size"] = self.max_size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""
+Contains the StatementBudget class, a guard against N+1 queries
+"""
+
+import threading
+from sqlalchemy import event
+
+
+class StatementBudgetExceeded(AssertionError):
+    """raised when a block runs more statements than its budget"""
+
+
+class StatementBudget:
+    """counts the statements engines run for the current thread
+
+    Used as a context manager around a request or a loop, it raises
+    StatementBudgetExceeded on exit when more than limit statements ran,
+    which is how a lazy relationship loaded once per row shows up.
+    """
+
+    def __init__(self, engine, limit):
+        """Builds a budget of limit statements
+
+        engine is an engine or a list of engines, such as a primary and
+        its replica.
+        """
+        self.engines = engine if isinstance(engine, list) else [engine]
+        self.limit = limit
+        # list - statements run by the thread inside the block
+        self.statements = []
+        self.__thread = None
+
+    def __record(self, conn, cursor, statement, parameters, context,
+                 executemany):
+        """records a statement of the thread that entered the block"""
+        if threading.get_ident() == self.__thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        """starts counting"""
+        self.__thread = threading.get_ident()
+        del self.statements[:]
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self.__record)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """stops counting and checks the budget unless the block raised"""
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self.__record)
+        if exc_type is None and len(self.statements) > self.limit:
+            raise StatementBudgetExceeded(
+                "{:d} statements run, {:d} allowed:\n{}".format(
+                    len(self.statements), self.limit,
+                    "\n".join(self.statements)))
+        return False
@@ -4,20 +4,25 @@ import models
 from models.base_model import BaseModel, Base
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 
 
 class Review(BaseModel, Base):
     """Representation of Review """
     if models.storage_t == 'db':
         __tablename__ = 'reviews'
-        place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
-        user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+        __table_args__ = (Index('ft_reviews', 'text',
+                                mysql_prefix='FULLTEXT'),)
+        place_id = Column(String(60), ForeignKey('places.id'), nullable=False,
+                          index=True)
+        user_id = Column(String(60), ForeignKey('users.id'), nullable=False,
+                         index=True)
         text = Column(String(1024), nullable=False)
     else:
         place_id = ""
         user_id = ""
         text = ""
+    indexed = {"place_id": "hash", "user_id": "hash", "text": "text"}
 
     def __init__(self, *args, **kwargs):
         """initializes Review"""
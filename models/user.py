@@ -12,7 +12,8 @@ class User(BaseModel, Base):
     """Representation of a user """
     if models.storage_t == 'db':
         __tablename__ = 'users'
-        email = Column(String(128), nullable=False)
+        email = Column(String(128), nullable=False, index=True,
+                       unique=True)
         password = Column(String(128), nullable=False)
         first_name = Column(String(128), nullable=True)
         last_name = Column(String(128), nullable=True)
@@ -23,6 +24,7 @@ class User(BaseModel, Base):
         password = ""
         first_name = ""
         last_name = ""
+    indexed = {"email": "unique"}
 
     def __init__(self, *args, **kwargs):
         """initializes user"""
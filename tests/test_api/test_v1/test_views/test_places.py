@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Contains the TestPlacesNearbyView class
+"""
+
+from api.v1.app import app
+from models import storage
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+import pep8
+import unittest
+
+
+class TestPlacesNearbyView(unittest.TestCase):
+    """Test GET /api/v1/places/nearby"""
+    def setUp(self):
+        """Stores places around a remote point, listed out of order"""
+        self.client = app.test_client()
+        state = State(name="Nearbyland")
+        city = City(name="Nearbyville", state_id=state.id)
+        user = User(email="{}@nearby.io".format(state.id), password="pwd")
+        self.places = {}
+        for name, lat in (("second", -79.99), ("far", -79.5),
+                          ("first", -80.0), ("third", -79.98)):
+            self.places[name] = Place(name=name, city_id=city.id,
+                                      user_id=user.id, latitude=lat,
+                                      longitude=100.0)
+        self.objs = [state, city, user] + list(self.places.values())
+        for obj in self.objs:
+            storage.new(obj)
+        storage.save()
+
+    def tearDown(self):
+        """Deletes the stored objects"""
+        for obj in reversed(self.objs):
+            storage.delete(storage.get(type(obj), obj.id))
+        storage.save()
+        storage.close()
+
+    def nearby(self, query):
+        """returns the status code and the JSON body of a nearby request"""
+        response = self.client.get("/api/v1/places/nearby" + query)
+        return response.status_code, response.get_json()
+
+    def test_pep8_conformance_test_places(self):
+        """Test that test_places.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(
+            ['tests/test_api/test_v1/test_views/test_places.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_invalid_lat_lng(self):
+        """Test that lat and lng must be numbers within their range"""
+        for query in ("", "?lat=-80", "?lng=100", "?lat=x&lng=100",
+                      "?lat=90.1&lng=100", "?lat=-90.1&lng=100",
+                      "?lat=-80&lng=180.1", "?lat=-80&lng=-180.1"):
+            self.assertEqual(self.nearby(query),
+                             (400, {"error": "Invalid lat/lng"}))
+
+    def test_invalid_radius_and_limit(self):
+        """Test that radius_km and limit must be positive numbers"""
+        for params in ("radius_km=x", "radius_km=0", "radius_km=-1",
+                       "limit=x", "limit=1.5", "limit=0"):
+            self.assertEqual(self.nearby("?lat=-80&lng=100&" + params),
+                             (400, {"error": "Invalid radius_km/limit"}))
+
+    def test_ordered_by_distance(self):
+        """Test that the places within radius_km come nearest first"""
+        status, places = self.nearby("?lat=-80&lng=100")
+        self.assertEqual(status, 200)
+        self.assertEqual([place["name"] for place in places],
+                         ["first", "second", "third"])
+        distances = [place["distance_km"] for place in places]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(distances[0], 0)
+        self.assertAlmostEqual(distances[1], 1.112, places=2)
+
+    def test_limit(self):
+        """Test that results are truncated to limit"""
+        status, places = self.nearby("?lat=-80&lng=100&radius_km=100&limit=2")
+        self.assertEqual(status, 200)
+        self.assertEqual([place["name"] for place in places],
+                         ["first", "second"])
+        status, places = self.nearby("?lat=-80&lng=100&radius_km=100")
+        self.assertEqual([place["name"] for place in places],
+                         ["first", "second", "third", "far"])
+
+
+if __name__ == "__main__":
+    unittest.main()
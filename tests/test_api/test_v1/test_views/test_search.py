@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""
+Contains the TestSearchView class
+"""
+
+from api.v1.app import app
+from models import storage
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+import pep8
+import unittest
+
+
+class TestSearchView(unittest.TestCase):
+    """Test GET /api/v1/search"""
+    def setUp(self):
+        """Stores places and a review with uncommon words"""
+        self.client = app.test_client()
+        state = State(name="Searchland")
+        city = City(name="Searchville", state_id=state.id)
+        user = User(email="{}@search.io".format(state.id), password="pwd")
+        self.both = Place(name="Quokka wombat", city_id=city.id,
+                          user_id=user.id, description="Wombat burrow")
+        self.one = Place(name="Quokka hut", city_id=city.id,
+                         user_id=user.id)
+        self.review = Review(text="A quokka came by", place_id=self.one.id,
+                             user_id=user.id)
+        self.objs = [state, city, user, self.both, self.one, self.review]
+        for obj in self.objs:
+            storage.new(obj)
+        storage.save()
+
+    def tearDown(self):
+        """Deletes the stored objects"""
+        for obj in reversed(self.objs):
+            storage.delete(storage.get(type(obj), obj.id))
+        storage.save()
+        storage.close()
+
+    def search(self, query):
+        """returns the status code and the JSON body of a search"""
+        response = self.client.get("/api/v1/search" + query)
+        return response.status_code, response.get_json()
+
+    def test_pep8_conformance_test_search(self):
+        """Test that test_search.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(
+            ['tests/test_api/test_v1/test_views/test_search.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_missing_q(self):
+        """Test that a missing or blank q is rejected"""
+        for query in ("", "?q=", "?q=%20%20"):
+            self.assertEqual(self.search(query),
+                             (400, {"error": "Missing q"}))
+
+    def test_invalid_type(self):
+        """Test that only places and reviews can be searched"""
+        self.assertEqual(self.search("?q=quokka&type=city"),
+                         (400, {"error": "Invalid type"}))
+
+    def test_invalid_limit(self):
+        """Test that limit must be a positive integer"""
+        for limit in ("abc", "0", "-1", "1.5"):
+            self.assertEqual(self.search("?q=quokka&limit=" + limit),
+                             (400, {"error": "Invalid limit"}))
+
+    def test_ordering(self):
+        """Test that results come best first with their score"""
+        status, results = self.search("?q=quokka+wombat")
+        self.assertEqual(status, 200)
+        self.assertEqual(results[0]["id"], self.both.id)
+        self.assertEqual(sorted(result["id"] for result in results),
+                         sorted([self.both.id, self.one.id, self.review.id]))
+        scores = [result["score"] for result in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertGreater(scores[0], scores[1])
+
+    def test_type_and_limit(self):
+        """Test that type and limit narrow the results"""
+        status, results = self.search("?q=quokka&type=review")
+        self.assertEqual(status, 200)
+        self.assertEqual([(result["id"], result["__class__"])
+                          for result in results],
+                         [(self.review.id, "Review")])
+        status, results = self.search("?q=quokka+wombat&limit=1")
+        self.assertEqual(status, 200)
+        self.assertEqual([result["id"] for result in results],
+                         [self.both.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Contains the TestUsersView class
+"""
+
+from api.v1.app import app
+from models import storage
+from models.user import User
+import pep8
+import unittest
+import uuid
+
+
+class TestUsersView(unittest.TestCase):
+    """Test POST /api/v1/users"""
+    def setUp(self):
+        """Stores a user whose email is taken"""
+        self.client = app.test_client()
+        self.user = User(email="{}@users.io".format(uuid.uuid4()),
+                         password="pwd")
+        storage.new(self.user)
+        storage.save()
+
+    def tearDown(self):
+        """Deletes the stored users"""
+        storage.delete(storage.get(User, self.user.id))
+        storage.save()
+        storage.close()
+
+    def post(self, json):
+        """returns the status code and the JSON body of a user creation"""
+        response = self.client.post("/api/v1/users", json=json)
+        return response.status_code, response.get_json()
+
+    def test_pep8_conformance_test_users(self):
+        """Test that test_users.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(
+            ['tests/test_api/test_v1/test_views/test_users.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_email_already_exists(self):
+        """Test that a taken email is rejected"""
+        count = storage.count(User)
+        self.assertEqual(self.post({"email": self.user.email,
+                                    "password": "other"}),
+                         (400, {"error": "Email already exists"}))
+        self.assertEqual(storage.count(User), count)
+
+    def test_invalid_email(self):
+        """Test that an email must be a string"""
+        count = storage.count(User)
+        for email in (5, None, ["a@b.c"]):
+            self.assertEqual(self.post({"email": email, "password": "pwd"}),
+                             (400, {"error": "Invalid email"}))
+        self.assertEqual(storage.count(User), count)
+
+    def test_create(self):
+        """Test that a free email creates a user"""
+        email = "{}@users.io".format(uuid.uuid4())
+        status, body = self.post({"email": email, "password": "pwd"})
+        self.assertEqual(status, 201)
+        self.assertEqual(body["email"], email)
+        storage.delete(storage.get(User, body["id"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,17 @@
 #!/usr/bin/python3
 """
-Contains the class TestConsoleDocs
+Contains the TestConsoleDocs and TestConsoleCreate classes
 """
 
 import console
+from io import StringIO
 import inspect
+import models
+from models.user import User
 import pep8
 import unittest
+from unittest import mock
+import uuid
 HBNBCommand = console.HBNBCommand
 
 
@@ -39,3 +44,26 @@ class TestConsoleDocs(unittest.TestCase):
                          "HBNBCommand class needs a docstring")
         self.assertTrue(len(HBNBCommand.__doc__) >= 1,
                         "HBNBCommand class needs a docstring")
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestConsoleCreate(unittest.TestCase):
+    """Test the create command of the console"""
+    def create(self, arg):
+        """returns the output of create with arg"""
+        with mock.patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create " + arg)
+        return output.getvalue().strip()
+
+    def test_create_taken_email(self):
+        """Test that a taken email is reported, not raised"""
+        email = "{}@console.io".format(uuid.uuid4())
+        id = self.create('User email="{}"'.format(email))
+        user = models.storage.get(User, id)
+        self.addCleanup(models.storage.save)
+        self.addCleanup(models.storage.delete, user)
+        self.assertEqual(user.email, email)
+        count = models.storage.count(User)
+        self.assertEqual(self.create('User email="{}"'.format(email)),
+                         "** User email {!r} already exists **".format(email))
+        self.assertEqual(models.storage.count(User), count)
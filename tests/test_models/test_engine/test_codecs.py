@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+"""
+Contains the TestCodecsDocs and TestCodecs classes
+"""
+
+from datetime import datetime
+import inspect
+import io
+import json
+import marshal
+import models
+from models.engine import codecs
+from models.engine.codecs import _iter_json_object, get_codec
+from models.engine.codecs import FramedCodec, JSONCodec, TornJournalError
+from models.city import City
+from models.state import State
+import os
+from os import environ, path, remove
+import pep8
+import unittest
+
+STORAGE_TYPE = models.storage_t
+
+
+class TestCodecsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the codecs module"""
+    def test_pep8_conformance_codecs(self):
+        """Test that models/engine/codecs.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/codecs.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_codecs(self):
+        """Test that tests/test_models/test_engine/test_codecs.py
+        conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_codecs.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_codecs_module_docstring(self):
+        """Test for the codecs.py module docstring"""
+        self.assertIsNot(codecs.__doc__, None,
+                         "codecs.py needs a docstring")
+
+    def test_codecs_func_docstrings(self):
+        """Test for the presence of docstrings in the codec classes"""
+        for cls in [JSONCodec, FramedCodec]:
+            for func in inspect.getmembers(cls, inspect.isfunction):
+                self.assertIsNot(func[1].__doc__, None,
+                                 "{:s} method needs a docstring".format(
+                                     func[0]))
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is db')
+class TestCodecs(unittest.TestCase):
+    """Test every registered codec"""
+    def setUp(self):
+        """Builds two objects to encode"""
+        self.state = State(name="California")
+        self.city = City(name="Fresno", state_id=self.state.id)
+        self.objs = {"State." + self.state.id: self.state,
+                     "City." + self.city.id: self.city}
+
+    def tearDown(self):
+        """Removes the scratch files"""
+        for name in ["test_codec.snap", "test_codec.log"]:
+            if path.exists(name):
+                remove(name)
+
+    def check_record(self, obj, record):
+        """Checks that a decoded record rebuilds obj"""
+        rebuilt = obj.__class__(**record)
+        self.assertEqual(rebuilt.to_dict(), obj.to_dict())
+
+    def test_snapshot_round_trip(self):
+        """Test that each codec reads back the snapshot it wrote"""
+        for name, codec in codecs.codecs.items():
+            with self.subTest(codec=name):
+                codec.write("test_codec.snap",
+                            [codec.encode(k, v) for k, v in self.objs.items()])
+                records = dict(codec.read("test_codec.snap"))
+                self.assertEqual(set(records), set(self.objs))
+                for key, obj in self.objs.items():
+                    self.check_record(obj, records[key])
+
+    def test_journal_round_trip(self):
+        """Test that each codec replays its journal up to a torn entry"""
+        for name, codec in codecs.codecs.items():
+            with self.subTest(codec=name):
+                if path.exists("test_codec.log"):
+                    remove("test_codec.log")
+                key = "State." + self.state.id
+                codec.append("test_codec.log",
+                             [codec.encode(key, self.state)])
+                size = codec.append("test_codec.log",
+                                    [codec.tombstone(key)])
+                self.assertEqual(size, os.stat("test_codec.log").st_size)
+                with open("test_codec.log", "ab") as f:
+                    f.write(b"\x05")
+                entries = []
+                with self.assertRaises(TornJournalError) as torn:
+                    for entry in codec.read_journal("test_codec.log"):
+                        entries.append(entry)
+                self.assertEqual(torn.exception.offset, size)
+                self.assertEqual([k for k, r in entries], [key, key])
+                self.check_record(self.state, entries[0][1])
+                self.assertIsNone(entries[1][1])
+
+    def test_json_torn_journal(self):
+        """Test that a JSON journal is torn at its first bad line"""
+        codec = get_codec("json")
+        key = "State." + self.state.id
+        size = codec.append("test_codec.log", [codec.encode(key, self.state)])
+        for tail in [b'["State.x", {"__cla', b'["State.x", null]']:
+            with self.subTest(tail=tail):
+                with open("test_codec.log", "ab") as f:
+                    f.write(tail)
+                entries = []
+                with self.assertRaises(TornJournalError) as torn:
+                    for entry in codec.read_journal("test_codec.log"):
+                        entries.append(entry)
+                self.assertEqual([k for k, r in entries], [key])
+                self.assertEqual(torn.exception.offset, size)
+                os.truncate("test_codec.log", size)
+
+    def test_framed_undecodable_frame(self):
+        """Test that a frame whose payload cannot be decoded is torn"""
+        for name in ["marshal", "marshal.gz"]:
+            with self.subTest(codec=name):
+                if path.exists("test_codec.log"):
+                    remove("test_codec.log")
+                codec = get_codec(name)
+                key = "State." + self.state.id
+                size = codec.append("test_codec.log",
+                                    [codec.encode(key, self.state)])
+                codec.append("test_codec.log",
+                             [FramedCodec.header.pack(2) + b"\xff\xff"])
+                codec.append("test_codec.log", [codec.tombstone(key)])
+                entries = []
+                with self.assertRaises(TornJournalError) as torn:
+                    for entry in codec.read_journal("test_codec.log"):
+                        entries.append(entry)
+                self.assertEqual([k for k, r in entries], [key])
+                self.assertEqual(torn.exception.offset, size)
+
+    def test_json_format_unchanged(self):
+        """Test that the JSON codec still writes file.json as before"""
+        codec = get_codec("json")
+        codec.write("test_codec.snap",
+                    [codec.encode(k, v) for k, v in self.objs.items()])
+        with open("test_codec.snap", "r") as f:
+            self.assertEqual(json.load(f), {k: v.to_dict()
+                                            for k, v in self.objs.items()})
+
+    def test_framed_timestamps_are_integers(self):
+        """Test that the binary codec stores timestamps as integers"""
+        codec = get_codec("marshal")
+        frame = codec.encode("State." + self.state.id, self.state)
+        key, record = marshal.loads(frame[FramedCodec.header.size:])
+        self.assertIs(type(record["created_at"]), int)
+        self.assertEqual(record["__class__"], "State")
+
+    def test_unknown_codec(self):
+        """Test that an unknown codec name is rejected"""
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
+
+    def test_streaming_parse(self):
+        """Test that JSON snapshots are parsed a few bytes at a time"""
+        js = json.dumps({k: v.to_dict() for k, v in self.objs.items()})
+        for size in [1, 7, 4096]:
+            with self.subTest(chunk_size=size):
+                records = dict(_iter_json_object(io.StringIO(js),
+                                                 chunk_size=size))
+                self.assertEqual(records, json.loads(js))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,18 +5,25 @@ Contains the TestDBStorageDocs and TestDBStorage classes
 
 from datetime import datetime
 import inspect
+import itertools
 import models
 from models import *
 from models.state import State
-from models.engine.db_storage import db_storage, DBStorage
+from models.engine import db_storage
+from models.engine.db_storage import DBStorage
 from models.base_model import Base
 from os import environ, stat
 import os
 import pep8
+import shutil
+import sqlalchemy
+import sqlalchemy.orm
+import tempfile
 import unittest
+from unittest import mock
 
 
-STORAGE_TYPE = environ.get('HBNB_TYPE_STORAGE')
+STORAGE_TYPE = models.storage_t
 
 
 @unittest.skipIf(STORAGE_TYPE != 'db', 'skip if environ is not db')
@@ -95,6 +102,672 @@ class TestDBStorageGetCount(unittest.TestCase):
         self.assertEqual(new_count, start + 1)
         self.assertEqual(self.storage.count(), self.storage.count())
 
+    def statements(self):
+        """returns the list of statements run by the engine from now on"""
+        run = []
+
+        def record(conn, cursor, statement, parameters, context, many):
+            """records one statement"""
+            run.append(statement)
+        engine = self.storage._DBStorage__engine
+        sqlalchemy.event.listen(engine, "before_cursor_execute", record)
+        self.addCleanup(sqlalchemy.event.remove, engine,
+                        "before_cursor_execute", record)
+        return run
+
+    def test_get_primary_key(self):
+        """Test that get is one primary key query, none once loaded"""
+        state = State(name="GetState")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.close()
+        run = self.statements()
+        gotten = self.storage.get(State, state.id)
+        self.assertEqual(gotten.id, state.id)
+        self.assertEqual(len(run), 1)
+        self.assertNotIn("JOIN", run[0].upper())
+        self.assertIs(self.storage.get("State", state.id), gotten)
+        self.assertEqual(len(run), 1)
+        self.assertIsNone(self.storage.get(State, "missing"))
+        self.assertIsNone(self.storage.get("Missing", state.id))
+        self.assertEqual(len(run), 2)
+
+    def test_count_single_query(self):
+        """Test that count runs a single SELECT COUNT query"""
+        self.storage.save()
+        run = self.statements()
+        self.storage.count(State)
+        self.storage.count()
+        self.assertEqual(len(run), 2)
+        for statement in run:
+            self.assertIn("count(", statement.lower())
+        self.assertEqual(self.storage.count(),
+                         sum(self.storage.count(cls)
+                             for cls in db_storage.classes.values()))
+        self.assertEqual(self.storage.count("Missing"), 0)
+
+    def test_find_by(self):
+        """Test finding a user by email with an indexed query"""
+        from models.user import User
+        user = User(email="find_by@test.com", password="pwd")
+        self.storage.new(user)
+        self.storage.save()
+        found = self.storage.find_by(User, "email", "find_by@test.com")
+        self.assertEqual(found.id, user.id)
+        self.assertIsNone(self.storage.find_by(User, "email", "missing"))
+
+    def test_query(self):
+        """Test a filtered, ordered and sliced query"""
+        state = State(name="QueryState")
+        self.storage.new(state)
+        self.storage.save()
+        found = self.storage.query(State, where={"name": "QueryState"},
+                                   order_by="-created_at", limit=1)
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0].name, "QueryState")
+        names = [s.name for s in self.storage.query("State",
+                                                    order_by="name")]
+        self.assertEqual(names, sorted(names))
+
+    def test_find_range(self):
+        """Test a price and guests range query on places"""
+        found = self.storage.find_range("Place", price_by_night=(50, 120),
+                                        max_guest=(4, None))
+        for place in found:
+            self.assertTrue(50 <= place.price_by_night <= 120)
+            self.assertGreaterEqual(place.max_guest, 4)
+
+    def test_search(self):
+        """Test a keyword search on places"""
+        found = self.storage.search("Place", "cozy", limit=5)
+        self.assertLessEqual(len(found), 5)
+        scores = [score for place, score in found]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+@unittest.skipIf(environ.get('HBNB_TYPE_STORAGE') != 'sqlite',
+                 'skip if environ is not sqlite')
+class TestDBStorageSQLite(unittest.TestCase):
+    """ Tests for the SQLite engine of DBStorage """
+    def setUp(self):
+        """ Gets the engine of the storage """
+        self.engine = storage._DBStorage__engine
+
+    def test_wal_and_foreign_keys(self):
+        """Test that connections use WAL and enforce foreign keys"""
+        with self.engine.connect() as connection:
+            pragma = sqlalchemy.text("PRAGMA foreign_keys")
+            self.assertEqual(connection.execute(pragma).scalar(), 1)
+            if environ.get('HBNB_SQLITE_PATH') != ':memory:':
+                pragma = sqlalchemy.text("PRAGMA journal_mode")
+                self.assertEqual(connection.execute(pragma).scalar(), "wal")
+
+    def test_foreign_key_indexes(self):
+        """Test that the foreign key columns are indexed"""
+        inspector = sqlalchemy.inspect(self.engine)
+        for table, column in [("cities", "state_id"), ("places", "city_id"),
+                              ("places", "user_id"), ("reviews", "place_id"),
+                              ("reviews", "user_id")]:
+            indexed = [index["column_names"]
+                       for index in inspector.get_indexes(table)]
+            self.assertIn([column], indexed)
+
+
+@unittest.skipIf(STORAGE_TYPE != 'db', 'skip if environ is not db')
+class TestDBStorageEagerLoading(unittest.TestCase):
+    """ Tests for the eager loading of relationships by DBStorage """
+    @classmethod
+    def setUpClass(cls):
+        """ Stores states with cities and a place with reviews """
+        from models.amenity import Amenity
+        from models.city import City
+        from models.place import Place
+        from models.review import Review
+        from models.user import User
+        cls.storage = storage
+        user = User(email="eager@test.com", password="pwd")
+        cls.storage.new(user)
+        for i in range(3):
+            state = State(name="EagerState{:d}".format(i))
+            cls.storage.new(state)
+            for j in range(2):
+                city = City(name="EagerCity{:d}{:d}".format(i, j),
+                            state_id=state.id)
+                cls.storage.new(city)
+        cls.place = Place(name="Eager", city_id=city.id, user_id=user.id)
+        cls.storage.new(cls.place)
+        for i in range(2):
+            cls.storage.new(Review(text="Eager review", user_id=user.id,
+                                   place_id=cls.place.id))
+            cls.place.amenities.append(Amenity(name="Eager{:d}".format(i)))
+        cls.storage.save()
+        cls.storage.close()
+
+    def tearDown(self):
+        """ Closes the session holding the loaded objects """
+        self.storage.close()
+
+    def cities(self, states):
+        """returns the names of the cities of states"""
+        return sorted(city.name for state in states for city in state.cities)
+
+    def test_lazy_cities_exceed_budget(self):
+        """Test that lazy cities run one query per state"""
+        with self.assertRaises(AssertionError):
+            with self.storage.statement_budget(2):
+                self.cities(self.storage.query(State))
+
+    def test_selectin_cities(self):
+        """Test that selectin loading runs one more query in total"""
+        with self.storage.statement_budget(2) as budget:
+            states = self.storage.query(State, load=["cities"])
+            names = self.cities(states)
+        self.assertEqual(len(budget.statements), 2)
+        self.assertGreaterEqual(len(names), 6)
+        self.assertIn("EagerCity21", names)
+
+    def test_joined_cities(self):
+        """Test that joined loading runs a single query"""
+        with self.storage.statement_budget(1):
+            states = self.storage.query(State, where={"name": "EagerState1"},
+                                        load={"cities": "joined"})
+            names = self.cities(states)
+        self.assertEqual(names, ["EagerCity10", "EagerCity11"])
+
+    def test_place_reviews_and_amenities(self):
+        """Test loading the reviews and amenities of places"""
+        with self.storage.statement_budget(3):
+            places = self.storage.query("Place", where={"id": self.place.id},
+                                        load=["reviews", "amenities"])
+            self.assertEqual(len(places[0].reviews), 2)
+            self.assertEqual(sorted(a.name for a in places[0].amenities),
+                             ["Eager0", "Eager1"])
+
+    def test_cities_by_states_page(self):
+        """Test that the cities by states page has no N+1 queries"""
+        import importlib
+        web = importlib.import_module("web_flask.8-cities_by_states")
+        with self.storage.statement_budget(2):
+            response = web.app.test_client().get("/cities_by_states")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"EagerCity21", response.data)
+
+
+@unittest.skipIf(STORAGE_TYPE != 'db', 'skip if environ is not db')
+class TestDBStorageBulk(unittest.TestCase):
+    """ Tests for the bulk and set-based writes of DBStorage """
+    def setUp(self):
+        """ Starts each test from a fresh session """
+        self.storage = storage
+        self.storage.close()
+
+    def tearDown(self):
+        """ Closes the session of the test """
+        self.storage.close()
+
+    def run_kind(self, budget, kind):
+        """returns the statements of budget starting with kind"""
+        return [statement for statement in budget.statements
+                if statement.lstrip().upper().startswith(kind)]
+
+    def test_bulk_new_and_delete(self):
+        """Test that batches are inserted and deleted in few statements"""
+        start = self.storage.count(State)
+        states = [State(name="Bulk{:d}".format(i)) for i in range(50)]
+        with self.storage.statement_budget(5) as budget:
+            self.assertEqual(self.storage.bulk_new(states), 50)
+        self.assertEqual(len(self.run_kind(budget, "INSERT")), 1)
+        self.assertEqual(self.storage.count(State), start + 50)
+        ids = [state.id for state in states[:45]] + ["missing"]
+        with self.storage.statement_budget(5) as budget:
+            deleted = self.storage.bulk_delete("State", ids, batch_size=20)
+        self.assertEqual(deleted, 45)
+        self.assertEqual(len(self.run_kind(budget, "DELETE")), 3)
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), start + 5)
+        self.assertIsNone(self.storage.get(State, states[0].id))
+        self.assertIsNotNone(self.storage.get(State, states[49].id))
+
+    def test_delete_waits_for_save(self):
+        """Test that delete is only written by save"""
+        state = State(name="Deleted")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.close()
+        self.assertIsNotNone(self.storage.get(State, state.id))
+        self.storage.delete(self.storage.get(State, state.id))
+        self.storage.save()
+        self.storage.close()
+        self.assertIsNone(self.storage.get(State, state.id))
+
+    def test_delete_all(self):
+        """Test that delete_all empties every table in one statement each"""
+        from models.city import City
+        state = State(name="Doomed")
+        self.storage.bulk_new([state, City(name="Doomed",
+                                           state_id=state.id)])
+        with self.storage.statement_budget(10) as budget:
+            self.storage.delete_all()
+        self.assertEqual(len(self.run_kind(budget, "DELETE")),
+                         len(Base.metadata.sorted_tables))
+        self.assertEqual(self.storage.count(), 0)
+        self.assertIsNone(self.storage.get(State, state.id))
+
+
+@unittest.skipIf(environ.get('HBNB_TYPE_STORAGE') != 'sqlite',
+                 'skip if environ is not sqlite')
+class TestDBStorageReplica(unittest.TestCase):
+    """ Tests for the read/write splitting of DBStorage """
+    def setUp(self):
+        """ Opens a storage on a primary and a replica SQLite file """
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": os.path.join(tmp, "primary.db"),
+                "HBNB_SQLITE_REPLICA_PATH": os.path.join(tmp, "replica.db"),
+                "HBNB_DB_CACHE_SIZE": "0", "HBNB_QUERY_CACHE_SIZE": "0"}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.primary = self.storage._DBStorage__engine
+        self.replica = self.storage._DBStorage__replica
+        Base.metadata.create_all(self.replica)
+        self.addCleanup(self.primary.dispose)
+        self.addCleanup(self.replica.dispose)
+        self.addCleanup(self.storage.close)
+
+    def replicate(self, state):
+        """copies state to the replica, as replication would"""
+        with sqlalchemy.orm.Session(self.replica) as session:
+            session.add(State(id=state.id, name=state.name,
+                              created_at=state.created_at,
+                              updated_at=state.updated_at))
+            session.commit()
+
+    def test_reads_go_to_replica(self):
+        """Test that a new session reads from the replica"""
+        state = State(name="Primary")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 0)
+        self.assertIsNone(self.storage.get(State, state.id))
+        self.storage.close()
+        self.replicate(state)
+        self.assertEqual(self.storage.get(State, state.id).name, "Primary")
+        self.assertEqual(len(self.storage.query(State)), 1)
+
+    def test_reads_follow_writes(self):
+        """Test that a session reads its own writes until it is closed"""
+        self.assertEqual(self.storage.count(State), 0)
+        self.storage.new(State(name="Sticky"))
+        self.storage.save()
+        with self.storage.statement_budget(1):
+            self.assertEqual(self.storage.count(State), 1)
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 0)
+
+    def test_writes_go_to_primary(self):
+        """Test that set-based writes run on the primary"""
+        state = State(name="Deleted")
+        self.storage.bulk_new([state])
+        self.replicate(state)
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.storage.bulk_delete(State, [state.id]), 1)
+        self.assertEqual(self.storage.count(State), 0)
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 1)
+
+    def test_entity_cache_filled_from_primary(self):
+        """Test that the entity cache never keeps a lagging replica row"""
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": self.primary.url.database,
+                "HBNB_SQLITE_REPLICA_PATH": self.replica.url.database,
+                "HBNB_DB_CACHE_SIZE": "16"}):
+            storage = DBStorage()
+        storage.reload()
+        self.addCleanup(storage._DBStorage__engine.dispose)
+        self.addCleanup(storage._DBStorage__replica.dispose)
+        self.addCleanup(storage.close)
+        state = State(name="Old")
+        storage.bulk_new([state])
+        self.replicate(state)
+        storage.close()
+        state = storage.get(State, state.id)
+        state.name = "New"
+        storage.save()
+        storage.close()
+        self.assertEqual(storage.get(State, state.id).name, "New")
+        storage.close()
+        with storage.statement_budget(0):
+            self.assertEqual(storage.get(State, state.id).name, "New")
+        storage.close()
+        other = State(name="Other")
+        storage.bulk_new([other])
+        self.replicate(other)
+        storage.close()
+        states = {state.id: state for state in storage.query(State)}
+        self.assertIs(storage.get(State, other.id), states[other.id])
+        self.assertEqual(storage.cache_stats()["size"], 1)
+
+    def test_query_cache_filled_from_primary(self):
+        """Test that the query cache never keeps lagging replica rows"""
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": self.primary.url.database,
+                "HBNB_SQLITE_REPLICA_PATH": self.replica.url.database,
+                "HBNB_QUERY_CACHE_SIZE": "16"}):
+            storage = DBStorage()
+        storage.reload()
+        self.addCleanup(storage._DBStorage__engine.dispose)
+        self.addCleanup(storage._DBStorage__replica.dispose)
+        self.addCleanup(storage.close)
+        state = State(name="New")
+        storage.bulk_new([state])
+        storage.close()
+        self.assertEqual([s.name for s in storage.query(State)], ["New"])
+        self.assertEqual(storage.count(State), 1)
+        self.assertEqual(storage.count(), 1)
+        storage.close()
+        self.replicate(state)
+        with storage.statement_budget(0):
+            self.assertEqual(len(storage.query(State)), 1)
+            self.assertEqual(storage.count(State), 1)
+            self.assertEqual(storage.count(), 1)
+        stats = storage.query_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 3))
+
+    def test_pool_stats(self):
+        """Test that the replica pool is reported on its own"""
+        before = self.storage.pool_stats()
+        self.storage.count(State)
+        self.storage.close()
+        stats = self.storage.pool_stats()
+        self.assertEqual(stats["replica"]["checkouts"],
+                         before["replica"]["checkouts"] + 1)
+        self.assertEqual(stats["checkouts"], before["checkouts"])
+        self.assertEqual(stats["replica"]["checked_out"], 0)
+        self.assertNotIn("sessions", stats["replica"])
+        self.assertEqual(stats["sessions"], 1)
+        self.storage.new(State(name="Written"))
+        self.storage.save()
+        self.storage.close()
+        after = self.storage.pool_stats()
+        self.assertEqual(after["replica"]["checkouts"],
+                         stats["replica"]["checkouts"])
+        self.assertGreater(after["checkouts"], stats["checkouts"])
+
+
+@unittest.skipIf(environ.get('HBNB_TYPE_STORAGE') != 'sqlite',
+                 'skip if environ is not sqlite')
+class TestDBStorageEntityCache(unittest.TestCase):
+    """ Tests for the entity cache in front of DBStorage.get """
+    def setUp(self):
+        """ Opens a storage with the entity cache on a temporary file """
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": os.path.join(tmp, "hbnb.db"),
+                "HBNB_DB_CACHE_SIZE": "16"}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.addCleanup(self.storage._DBStorage__engine.dispose)
+        self.addCleanup(self.storage.close)
+        self.state = State(name="Cached")
+        self.storage.new(self.state)
+        self.storage.save()
+        self.storage.close()
+
+    def test_get_across_requests(self):
+        """Test that a later request gets the object without a query"""
+        with self.storage.statement_budget(1):
+            self.assertEqual(self.storage.get(State, self.state.id).name,
+                             "Cached")
+        self.storage.close()
+        with self.storage.statement_budget(0):
+            state = self.storage.get("State", self.state.id)
+        self.assertEqual(state.name, "Cached")
+        stats = self.storage.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["size"], 1)
+
+    def test_save_invalidates(self):
+        """Test that a saved change is seen by the next request"""
+        self.storage.get(State, self.state.id)
+        self.storage.close()
+        state = self.storage.get(State, self.state.id)
+        state.name = "Renamed"
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, self.state.id).name,
+                         "Renamed")
+
+    def test_unsaved_changes_kept(self):
+        """Test that a cache hit does not undo changes in the session"""
+        self.storage.get(State, self.state.id)
+        self.storage.close()
+        state = self.storage.get(State, self.state.id)
+        state.name = "New"
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        self.assertEqual(state.name, "New")
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, self.state.id).name, "New")
+
+    def test_delete_invalidates(self):
+        """Test that deleted objects are not served from the cache"""
+        self.storage.get(State, self.state.id)
+        self.storage.close()
+        self.storage.delete(self.storage.get(State, self.state.id))
+        self.storage.save()
+        self.storage.close()
+        self.assertIsNone(self.storage.get(State, self.state.id))
+        other = State(name="Other")
+        self.storage.bulk_new([other])
+        self.storage.close()
+        self.storage.get(State, other.id)
+        self.storage.bulk_delete(State, [other.id])
+        self.storage.close()
+        self.assertIsNone(self.storage.get(State, other.id))
+
+    def test_disabled_by_default(self):
+        """Test that the shared storage has no entity cache"""
+        if environ.get("HBNB_DB_CACHE_SIZE") in (None, "", "0"):
+            self.assertIsNone(storage.cache_stats())
+
+
+@unittest.skipIf(environ.get('HBNB_TYPE_STORAGE') != 'sqlite',
+                 'skip if environ is not sqlite')
+class TestDBStorageQueryCache(unittest.TestCase):
+    """ Tests for the query result cache of DBStorage """
+    def setUp(self):
+        """ Opens a storage with the query cache on a temporary file """
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": os.path.join(tmp, "hbnb.db"),
+                "HBNB_QUERY_CACHE_SIZE": "16"}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.addCleanup(self.storage._DBStorage__engine.dispose)
+        self.addCleanup(self.storage.close)
+        self.state = State(name="Cached")
+        self.storage.bulk_new([self.state])
+        self.storage.close()
+
+    def test_repeated_requests(self):
+        """Test that later requests run no query until State changes"""
+        with self.storage.statement_budget(2):
+            self.assertEqual(self.storage.count(State), 1)
+            self.assertEqual(len(self.storage.query(State)), 1)
+        self.storage.close()
+        with self.storage.statement_budget(0):
+            self.assertEqual(self.storage.count("State"), 1)
+            states = self.storage.query("State")
+        self.assertEqual(states[0].name, "Cached")
+        self.assertIn(states[0], self.storage._DBStorage__session())
+        self.assertEqual(self.storage.query_cache_stats()["hits"], 2)
+
+    def test_writes_invalidate(self):
+        """Test that saved and deleted objects are seen by the next request"""
+        self.storage.query(State)
+        self.storage.count()
+        self.storage.close()
+        other = State(name="Other")
+        self.storage.new(other)
+        self.assertEqual(self.storage.count(), 2)
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(len(self.storage.query(State)), 2)
+        self.storage.get(State, other.id).name = "Renamed"
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.query(State, where={"name": "Renamed"})
+                         [0].id, other.id)
+        self.storage.close()
+        self.storage.bulk_delete(State, [other.id])
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 1)
+        self.storage.delete_all()
+        self.storage.close()
+        self.assertEqual(self.storage.query(State), [])
+
+    def test_uncommitted_not_cached(self):
+        """Test that a flushed but uncommitted result is never served"""
+        session = self.storage._DBStorage__session
+        self.storage.new(State(name="Pending"))
+        session.flush()
+        self.assertEqual(self.storage.count(State), 2)
+        session.rollback()
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.storage.query_cache_stats()["size"], 1)
+
+    def test_disabled_by_default(self):
+        """Test that the shared storage has no query cache"""
+        if environ.get("HBNB_QUERY_CACHE_SIZE") in (None, "", "0"):
+            self.assertIsNone(storage.query_cache_stats())
+
+
+@unittest.skipIf(environ.get('HBNB_TYPE_STORAGE') != 'sqlite',
+                 'skip if environ is not sqlite')
+class TestDBStorageIter(unittest.TestCase):
+    """ Tests for the keyset iteration of DBStorage """
+    def setUp(self):
+        """ Opens a storage on a temporary file with a few states """
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": os.path.join(tmp, "hbnb.db")}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.addCleanup(self.storage._DBStorage__engine.dispose)
+        self.addCleanup(self.storage.close)
+        old = datetime(2017, 1, 1)
+        self.states = [State(name="State{:d}".format(i),
+                             created_at=old if i % 2 else datetime.utcnow())
+                       for i in range(7)]
+        self.storage.bulk_new(self.states)
+        self.storage.close()
+        self.ids = [state.id for state in sorted(
+            self.states, key=lambda state: (state.created_at, state.id))]
+
+    def test_batches(self):
+        """Test that rows come in order, one query per batch"""
+        with self.storage.statement_budget(4) as budget:
+            ids = [state.id for state in
+                   self.storage.iter(State, batch_size=2)]
+        self.assertEqual(ids, self.ids)
+        self.assertEqual(len(budget.statements), 4)
+        self.assertEqual(list(self.storage.iter("City")), [])
+        indexed = [index["column_names"] for index in sqlalchemy.inspect(
+            self.storage._DBStorage__engine).get_indexes("states")]
+        self.assertIn(["created_at"], indexed)
+
+    def test_pages_after_cursor(self):
+        """Test that paging by cursors visits every row once"""
+        ids = []
+        after = None
+        while True:
+            self.storage.close()
+            page = list(itertools.islice(
+                self.storage.iter(State, after=after, batch_size=2), 3))
+            if not page:
+                break
+            ids.extend(state.id for state in page)
+            after = page[-1].to_dict()["created_at"], page[-1].id
+        self.assertEqual(ids, self.ids)
+        after = self.storage.get(State, self.ids[3])
+        self.assertEqual([state.id for state in
+                          self.storage.iter(State, after=after)],
+                         self.ids[4:])
+
+
+class TestDBStoragePoolOptions(unittest.TestCase):
+    """ Tests for the pool options of DBStorage """
+    def test_defaults(self):
+        """Test that connections are pinged and recycled by default"""
+        with mock.patch.dict(environ):
+            for name in ("HBNB_DB_POOL_SIZE", "HBNB_DB_MAX_OVERFLOW",
+                         "HBNB_DB_POOL_TIMEOUT", "HBNB_DB_POOL_RECYCLE",
+                         "HBNB_DB_POOL_PRE_PING"):
+                environ.pop(name, None)
+            options = db_storage._pool_options()
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(options["pool_recycle"], 3600)
+        self.assertEqual(options["pool_size"], 5)
+        self.assertEqual(options["max_overflow"], 10)
+        self.assertEqual(options["pool_timeout"], 30)
+
+    def test_environment(self):
+        """Test that the environment sets the pool options"""
+        with mock.patch.dict(environ, {"HBNB_DB_POOL_SIZE": "2",
+                                       "HBNB_DB_MAX_OVERFLOW": "0",
+                                       "HBNB_DB_POOL_TIMEOUT": "0.5",
+                                       "HBNB_DB_POOL_RECYCLE": "60",
+                                       "HBNB_DB_POOL_PRE_PING": "0"}):
+            options = db_storage._pool_options()
+            memory = db_storage._pool_options(memory=True)
+        self.assertEqual(options["pool_size"], 2)
+        self.assertEqual(options["max_overflow"], 0)
+        self.assertEqual(options["pool_timeout"], 0.5)
+        self.assertEqual(options["pool_recycle"], 60)
+        self.assertFalse(options["pool_pre_ping"])
+        self.assertNotIn("pool_size", memory)
+        self.assertEqual(memory["pool_recycle"], 60)
+
+
+@unittest.skipIf(environ.get('HBNB_TYPE_STORAGE') != 'sqlite',
+                 'skip if environ is not sqlite')
+class TestDBStoragePoolStats(unittest.TestCase):
+    """ Tests for the pool and session metrics of DBStorage """
+    def setUp(self):
+        """ Opens a storage on a temporary SQLite file """
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with mock.patch.dict(environ, {
+                "HBNB_SQLITE_PATH": os.path.join(tmp, "hbnb.db"),
+                "HBNB_DB_POOL_SIZE": "1", "HBNB_DB_MAX_OVERFLOW": "0",
+                "HBNB_QUERY_CACHE_SIZE": "0"}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.addCleanup(self.storage._DBStorage__engine.dispose)
+
+    def test_pool_stats(self):
+        """Test that requests are counted with their session lifetimes"""
+        for i in range(3):
+            self.storage.count(State)
+            self.storage.close()
+        self.storage.close()
+        stats = self.storage.pool_stats()
+        self.assertGreaterEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["sessions"], 3)
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["checked_out"], 0)
+        for name in ("max_wait", "mean_wait", "max_session",
+                     "mean_session"):
+            self.assertGreaterEqual(stats[name], 0)
+
 
 @unittest.skipIf(STORAGE_TYPE != 'db', 'skip if environ is not db')
 class TestFileStorage(unittest.TestCase):
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+"""
+Contains the TestEntityCacheDocs and TestEntityCache classes
+"""
+
+import inspect
+import pep8
+import time
+import unittest
+from models.engine import entity_cache
+from models.engine.entity_cache import EntityCache
+from models.engine.statement_budget import StatementBudget
+from sqlalchemy import Column, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+Base = declarative_base()
+
+
+class Thing(Base):
+    """a mapped class standing in for the models"""
+    __tablename__ = "things"
+    id = Column(String(60), primary_key=True)
+    name = Column(String(128))
+
+
+class TestEntityCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of EntityCache"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.ec_f = inspect.getmembers(EntityCache, inspect.isfunction)
+
+    def test_pep8_conformance_entity_cache(self):
+        """Test that models/engine/entity_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/entity_cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_entity_cache(self):
+        """Test that test_entity_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_entity_cache.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_entity_cache_module_docstring(self):
+        """Test for the entity_cache.py module docstring"""
+        self.assertIsNot(entity_cache.__doc__, None,
+                         "entity_cache.py needs a docstring")
+
+    def test_entity_cache_func_docstrings(self):
+        """Test for the presence of docstrings in EntityCache"""
+        for func in self.ec_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestEntityCache(unittest.TestCase):
+    """Test the EntityCache class on an in-memory SQLite database"""
+    def setUp(self):
+        """Stores a few things"""
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(self.engine.dispose)
+        Base.metadata.create_all(self.engine)
+        self.factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        with self.factory() as session:
+            session.add_all([Thing(id=str(i), name="thing{:d}".format(i))
+                             for i in range(3)])
+            session.commit()
+        self.cache = EntityCache(max_size=2, ttl=60)
+
+    def load(self, id, session=None):
+        """caches the thing with id as loaded by a session"""
+        session = session or self.factory()
+        version = self.cache.version()
+        thing = session.get(Thing, id)
+        self.cache.put(thing, version)
+        return thing
+
+    def test_merge_without_query(self):
+        """Test that a cached copy is merged into a session for free"""
+        thing = self.load("0")
+        copy = self.cache.get(Thing, "0")
+        self.assertIsNot(copy, thing)
+        self.assertEqual(copy.name, "thing0")
+        with self.factory() as session:
+            with StatementBudget(self.engine, 0):
+                merged = session.merge(copy, load=False)
+            self.assertEqual(merged.name, "thing0")
+            self.assertIn(merged, session)
+            self.assertIsNot(merged, copy)
+        self.assertIsNone(self.cache.get(Thing, "1"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used copy is evicted"""
+        self.load("0")
+        self.load("1")
+        self.cache.get(Thing, "0")
+        self.load("2")
+        self.assertIsNotNone(self.cache.get(Thing, "0"))
+        self.assertIsNone(self.cache.get(Thing, "1"))
+        stats = self.cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["max_size"], 2)
+
+    def test_ttl(self):
+        """Test that copies expire after ttl seconds"""
+        self.cache.ttl = 0.01
+        self.load("0")
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get(Thing, "0"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_stale_put_ignored(self):
+        """Test that an object loaded before an invalidation is not cached"""
+        version = self.cache.version()
+        thing = self.factory().get(Thing, "0")
+        self.cache.invalidate([("Thing", "0")])
+        self.cache.put(thing, version)
+        self.assertIsNone(self.cache.get(Thing, "0"))
+
+    def test_disabled(self):
+        """Test that a cache of size 0 keeps nothing"""
+        self.cache.max_size = 0
+        self.load("0")
+        self.assertIsNone(self.cache.get(Thing, "0"))
+
+    def test_watch_invalidates_writes(self):
+        """Test that committed changes and deletions are invalidated"""
+        self.cache.watch(self.factory)
+        self.load("0")
+        self.load("1")
+        with self.factory() as session:
+            session.merge(self.cache.get(Thing, "0"), load=False).name = "x"
+            session.delete(session.get(Thing, "1"))
+            session.commit()
+        self.assertIsNone(self.cache.get(Thing, "0"))
+        self.assertIsNone(self.cache.get(Thing, "1"))
+        self.assertEqual(self.load("0").name, "x")
+        with self.factory() as session:
+            session.get(Thing, "2").name = "y"
+            session.flush()
+            session.rollback()
+            self.assertNotIn("cache_keys", session.info)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()["size"], 0)
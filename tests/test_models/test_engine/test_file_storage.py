@@ -10,7 +10,11 @@ from datetime import datetime
 import inspect
 import models
 from models import engine
-from models.engine.file_storage import file_storage
+from models.engine.codecs import get_codec
+from models.engine.file_storage import file_storage, FileStorage
+from models.engine.file_storage import build_indexes
+from models.engine.indexes import GridIndex, TextIndex
+from models.engine.query_cache import QueryCache
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -18,20 +22,41 @@ from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+import itertools
 import json
+import multiprocessing
+import shutil
+import threading
+from unittest import mock
 from os import environ, stat, remove, path
 
 
-STORAGE_TYPE = environ.get('HBNB_TYPE_STORAGE')
+STORAGE_TYPE = models.storage_t
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
-if STORAGE_TYPE != 'db':
-    FileStorage = models.file_storage.FileStorage
 storage = models.storage
 F = './dev/file.json'
 
 
+def hammer(worker, count):
+    """ Saves then deletes every third state, as another worker would """
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__by_class = {}
+    FileStorage._FileStorage__dirty = set()
+    FileStorage._FileStorage__fragments = {}
+    FileStorage._FileStorage__signature = None
+    storage = FileStorage()
+    storage.reload()
+    for i in range(count):
+        state = State(name="{}-{}".format(worker, i))
+        storage.new(state)
+        storage.save()
+        if i % 3 == 0:
+            storage.delete(state)
+            storage.save()
+
+
 @unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
 class TestFileStorageDocs(unittest.TestCase):
     """Tests to check the documentation and style of FileStorage class"""
@@ -86,18 +111,21 @@ class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_all_returns_dict(self):
-        """Test that all returns the FileStorage.__objects attr"""
+        """Test that all returns a snapshot of FileStorage.__objects"""
         storage = FileStorage()
         new_dict = storage.all()
-        self.assertEqual(type(new_dict), dict)
-        self.assertIs(new_dict, storage._FileStorage__objects)
+        self.assertEqual(dict(new_dict), storage._FileStorage__objects)
+        with self.assertRaises(TypeError):
+            new_dict["State.x"] = State()
 
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_new(self):
         """test that new adds an object to the FileStorage.__objects attr"""
         storage = FileStorage()
         save = FileStorage._FileStorage__objects
+        save_by_class = FileStorage._FileStorage__by_class
         FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__by_class = {}
         test_dict = {}
         for key, value in classes.items():
             with self.subTest(key=key, value=value):
@@ -107,6 +135,7 @@ class TestFileStorage(unittest.TestCase):
                 test_dict[instance_key] = instance
                 self.assertEqual(test_dict, storage._FileStorage__objects)
         FileStorage._FileStorage__objects = save
+        FileStorage._FileStorage__by_class = save_by_class
 
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_save(self):
@@ -159,5 +188,1130 @@ class TestFileStorageGetCount(unittest.TestCase):
         self.assertEqual(self.storage.count(), self.storage.count())
 
 
+class FileStorageTestCase(unittest.TestCase):
+    """ Base class of the tests swapping out the state of FileStorage
+
+    setUp saves every private class attribute of FileStorage, restored
+    after the test, and swaps in empty objects and indexes. Subclasses
+    name their scratch file in file_path, list the other files and
+    directories they write in scratch, and override setUp only to
+    switch on the mode they test.
+    """
+    file_path = None
+    scratch = ()
+
+    def setUp(self):
+        """ Saves FileStorage and swaps in empty objects """
+        self.save = {name: value for name, value in vars(FileStorage).items()
+                     if name.startswith("_FileStorage__")}
+        self.addCleanup(self.restore)
+        if self.file_path is not None:
+            FileStorage._FileStorage__file_path = self.file_path
+        FileStorage._FileStorage__reload_stats = {"performed": 0,
+                                                  "skipped": 0}
+        self.reset()
+        self.storage = FileStorage()
+
+    def restore(self):
+        """ Restores FileStorage and removes the scratch files """
+        for name, value in self.save.items():
+            setattr(FileStorage, name, value)
+        for name in (self.file_path,) + tuple(self.scratch):
+            if name is None:
+                continue
+            if path.isdir(name):
+                shutil.rmtree(name)
+            elif path.exists(name):
+                remove(name)
+
+    def reset(self):
+        """ Forgets every object, as a new process would """
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__by_class = {}
+        FileStorage._FileStorage__snapshots = {}
+        FileStorage._FileStorage__persisted = set()
+        FileStorage._FileStorage__dirty = set()
+        FileStorage._FileStorage__fragments = {}
+        FileStorage._FileStorage__loaded = set()
+        FileStorage._FileStorage__shard_signatures = {}
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__distinct = {}
+        FileStorage._FileStorage__signature = None
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStoragePartitions(FileStorageTestCase):
+    """ Test the per-class partitions behind all, get and count """
+    def test_all_cls_only_returns_cls(self):
+        """Test that all(cls) only holds objects of that class"""
+        state = State(name="California")
+        city = City(name="Fresno")
+        self.storage.new(state)
+        self.storage.new(city)
+        self.assertEqual(dict(self.storage.all(State)),
+                         {"State." + state.id: state})
+        self.assertEqual(dict(self.storage.all("City")),
+                         {"City." + city.id: city})
+        self.assertEqual(len(self.storage.all(Amenity)), 0)
+
+    def test_all_cls_is_read_only(self):
+        """Test that all(cls) cannot be used to change storage"""
+        state = State(name="California")
+        self.storage.new(state)
+        with self.assertRaises(TypeError):
+            self.storage.all(State)["State.x"] = state
+
+    def test_get_and_count_follow_delete(self):
+        """Test that get and count see new and delete"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertIs(self.storage.get("State", state.id), state)
+        self.assertIsNone(self.storage.get(City, state.id))
+        self.assertEqual(self.storage.count(State), 1)
+        self.storage.delete(state)
+        self.assertIsNone(self.storage.get(State, state.id))
+        self.assertEqual(self.storage.count(State), 0)
+        self.assertEqual(self.storage.count(), 0)
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageJournal(FileStorageTestCase):
+    """ Test the append-only journal persistence mode """
+    file_path = "test_journal.json"
+    scratch = ("test_journal.json.log",)
+
+    def setUp(self):
+        """ Switches FileStorage to journal mode on empty objects """
+        super().setUp()
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__journal_path = "test_journal.json.log"
+
+    def reloaded(self):
+        """ Returns the objects found by a reload from the files """
+        self.reset()
+        self.storage.reload()
+        return self.storage.all()
+
+    def journal_lines(self):
+        """ Returns the records written to the journal """
+        with open("test_journal.json.log", "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_save_appends_changes_only(self):
+        """Test that save only appends new, changed and deleted records"""
+        state = State(name="California")
+        city = City(name="Fresno")
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        self.assertEqual(len(self.journal_lines()), 2)
+        self.storage.save()
+        self.assertEqual(len(self.journal_lines()), 2)
+        state.name = "Nevada"
+        self.storage.delete(city)
+        self.storage.save()
+        lines = self.journal_lines()
+        self.assertEqual(len(lines), 4)
+        self.assertCountEqual(lines[2:], [["State." + state.id,
+                                           state.to_dict()],
+                                          ["City." + city.id, None]])
+        self.assertFalse(path.exists("test_journal.json"))
+
+    def test_reload_replays_journal(self):
+        """Test that reload replays the journal on top of the snapshot"""
+        state = State(name="California")
+        city = City(name="Fresno")
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.compact()
+        state.name = "Nevada"
+        self.storage.delete(city)
+        self.storage.save()
+        objects = self.reloaded()
+        self.assertEqual(list(objects), ["State." + state.id])
+        self.assertEqual(objects["State." + state.id].name, "Nevada")
+        self.assertEqual(self.storage.count(City), 0)
+
+    def test_compaction_past_threshold(self):
+        """Test that the journal is folded into a snapshot when too big"""
+        FileStorage._FileStorage__journal_max = 1024
+        for i in range(20):
+            self.storage.new(State(name="State{:d}".format(i)))
+            self.storage.save()
+        self.assertTrue(path.exists("test_journal.json"))
+        self.assertLess(stat("test_journal.json.log").st_size, 1024)
+        self.assertEqual(len(self.reloaded()), 20)
+
+    def test_torn_journal_tail(self):
+        """Test that a partially written last record is ignored"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open("test_journal.json.log", "a") as f:
+            f.write('["State.x", {"__cla')
+        self.assertEqual(list(self.reloaded()), ["State." + state.id])
+
+    def test_framed_torn_tail(self):
+        """Test that binary journals are cut at a torn frame on reload"""
+        FileStorage._FileStorage__codec = get_codec("marshal")
+        states = [State(name="State{:d}".format(i)) for i in range(3)]
+        self.storage.new(states[0])
+        self.storage.save()
+        with open("test_journal.json.log", "ab") as f:
+            f.write(b"\x40\x00\x00\x00\xfa")
+        self.storage.new(states[1])
+        self.storage.save()
+        self.assertEqual(list(self.reloaded()), ["State." + states[0].id])
+        self.storage.new(states[1])
+        self.storage.new(states[2])
+        self.storage.save()
+        self.assertCountEqual(self.reloaded(),
+                              ["State." + state.id for state in states])
+
+    def test_appends_after_torn_tail(self):
+        """Test that saves made after a torn tail survive a restart"""
+        states = [State(name="State{:d}".format(i)) for i in range(3)]
+        self.storage.new(states[0])
+        self.storage.save()
+        size = stat("test_journal.json.log").st_size
+        with open("test_journal.json.log", "a") as f:
+            f.write('["State.x", {"__cla')
+        self.reloaded()
+        self.assertEqual(stat("test_journal.json.log").st_size, size)
+        for state in states[1:]:
+            self.storage.new(state)
+            self.storage.save()
+        self.assertCountEqual(self.reloaded(),
+                              ["State." + state.id for state in states])
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageDirty(FileStorageTestCase):
+    """ Test that save only re-encodes the objects that changed """
+    file_path = "test_dirty.json"
+
+    def test_new_change_and_delete_mark_dirty(self):
+        """Test that new, attribute changes and delete flag the key"""
+        state = State(name="California")
+        key = "State." + state.id
+        dirty = FileStorage._FileStorage__dirty
+        self.assertNotIn(key, dirty)
+        self.storage.new(state)
+        self.assertIn(key, dirty)
+        self.storage.save()
+        self.assertEqual(dirty, set())
+        state.name = "Nevada"
+        self.assertIn(key, dirty)
+        self.storage.save()
+        self.storage.delete(state)
+        self.assertIn(key, dirty)
+
+    def test_save_only_encodes_dirty(self):
+        """Test that clean objects are not serialized again"""
+        states = [State(name="State{:d}".format(i)) for i in range(5)]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        states[2].name = "Changed"
+        with mock.patch.object(State, "to_dict",
+                               autospec=True,
+                               side_effect=State.to_dict) as to_dict:
+            self.storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+        with open("test_dirty.json", "r") as f:
+            js = json.load(f)
+        self.assertEqual(len(js), 5)
+        self.assertEqual(js["State." + states[2].id]["name"], "Changed")
+
+    def test_reload_is_clean(self):
+        """Test that objects read back from the file are not dirty"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__by_class = {}
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        self.assertEqual(FileStorage._FileStorage__dirty, set())
+        self.assertEqual(self.storage.count(State), 1)
+
+    def test_unstored_assignments_skip_storage(self):
+        """Test that only the assignments of stored objects reach storage"""
+        with mock.patch.object(FileStorage, "touch") as touch, \
+                mock.patch.object(FileStorage, "check_unique") as check:
+            state = State(name="California")
+            state.name = "Nevada"
+        self.assertFalse(touch.called or check.called)
+        self.storage.new(state)
+        state.name = "Oregon"
+        self.assertIn("State." + state.id, FileStorage._FileStorage__dirty)
+        self.assertNotIn("_stored", state.to_dict())
+        self.assertNotIn("_stored", str(state))
+
+    def test_reload_encodes_on_first_save(self):
+        """Test that reloaded objects are only encoded by the next save"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.reset()
+        self.storage.reload()
+        self.assertEqual(FileStorage._FileStorage__fragments, {})
+        reloaded = self.storage.get(State, state.id)
+        reloaded.name = "Nevada"
+        self.storage.save()
+        self.assertEqual(list(FileStorage._FileStorage__fragments),
+                         ["State." + state.id])
+        with open("test_dirty.json", "r") as f:
+            self.assertEqual(json.load(f)["State." + state.id]["name"],
+                             "Nevada")
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageGroupCommit(FileStorageTestCase):
+    """ Test saving through the group commit writer thread """
+    file_path = "test_group.json"
+
+    def setUp(self):
+        """ Switches FileStorage to group commit mode on empty objects """
+        super().setUp()
+        FileStorage._FileStorage__group_commit = True
+        FileStorage._FileStorage__commit_window = 0.02
+        FileStorage._FileStorage__writer = None
+
+    def tearDown(self):
+        """ Stops the writer before FileStorage is restored """
+        if FileStorage._FileStorage__writer is not None:
+            FileStorage._FileStorage__writer.stop()
+
+    def test_concurrent_saves(self):
+        """Test that concurrent saves are batched and all durable"""
+        errors = []
+
+        def create(i):
+            """creates and saves one state"""
+            try:
+                self.storage.new(State(name="State{:d}".format(i)))
+                self.storage.save()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=create, args=(i,))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with open("test_group.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 20)
+        stats = self.storage.commit_stats()
+        self.assertEqual(stats["requests"], 20)
+        self.assertLess(stats["batches"], 20)
+        self.assertFalse(path.exists("test_group.json.tmp"))
+
+    def test_commit_stats_outside_group_commit(self):
+        """Test that commit_stats is None until the writer starts"""
+        self.assertIsNone(self.storage.commit_stats())
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageLazy(FileStorageTestCase):
+    """ Test the lazy hydration of reloaded records """
+    file_path = "test_lazy.json"
+
+    def setUp(self):
+        """ Writes a file of states and cities, then reloads it lazily """
+        super().setUp()
+        self.state = State(name="California")
+        self.city = City(name="Fresno", state_id=self.state.id)
+        self.storage.new(self.state)
+        self.storage.new(self.city)
+        self.storage.save()
+        self.reset()
+        FileStorage._FileStorage__lazy = True
+        self.storage.reload()
+
+    def test_reload_keeps_records(self):
+        """Test that reload does not build instances"""
+        FileStorage._FileStorage__signature = None
+        with mock.patch.object(State, "__init__") as init:
+            self.storage.reload()
+        self.assertFalse(init.called)
+        objects = FileStorage._FileStorage__objects
+        self.assertIs(type(objects["State." + self.state.id]), dict)
+        self.assertEqual(self.storage.count(), 2)
+
+    def test_get_hydrates_once(self):
+        """Test that get builds the instance on first access only"""
+        state = self.storage.get(State, self.state.id)
+        self.assertIs(type(state), State)
+        self.assertEqual(state.created_at, self.state.created_at)
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        objects = FileStorage._FileStorage__objects
+        self.assertIs(type(objects["City." + self.city.id]), dict)
+
+    def test_all_hydrates(self):
+        """Test that all and all(cls) hand out instances"""
+        cities = list(self.storage.all(City).values())
+        self.assertEqual([type(city) for city in cities], [City])
+        self.assertEqual(cities[0].state_id, self.state.id)
+        for obj in self.storage.all().values():
+            self.assertIsNot(type(obj), dict)
+
+    def test_save_keeps_records(self):
+        """Test that records saved before hydration are written as is"""
+        self.storage.get(State, self.state.id).name = "Nevada"
+        self.storage.save()
+        with open("test_lazy.json", "r") as f:
+            js = json.load(f)
+        self.assertEqual(js["State." + self.state.id]["name"], "Nevada")
+        self.assertEqual(js["City." + self.city.id], self.city.to_dict())
+
+    def test_delete_unhydrated(self):
+        """Test that a record can be deleted before being hydrated"""
+        self.storage.delete(self.city)
+        self.assertEqual(self.storage.count(City), 0)
+        self.assertIsNone(self.storage.get(City, self.city.id))
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageReloadSkip(FileStorageTestCase):
+    """ Test that reload and close skip unchanged files """
+    file_path = "test_skip.json"
+
+    def setUp(self):
+        """ Saves a state to the scratch file """
+        super().setUp()
+        self.state = State(name="California")
+        self.storage.new(self.state)
+        self.storage.save()
+
+    def test_close_after_save_is_skipped(self):
+        """Test that close does not parse the file this process wrote"""
+        before = self.storage.reload_stats()
+        with mock.patch.object(State, "__init__") as init:
+            self.storage.close()
+            self.storage.close()
+        self.assertFalse(init.called)
+        after = self.storage.reload_stats()
+        self.assertEqual(after["skipped"], before["skipped"] + 2)
+        self.assertEqual(after["performed"], before["performed"])
+
+    def test_reload_after_external_write(self):
+        """Test that a file written by someone else is reloaded"""
+        with open("test_skip.json", "r") as f:
+            js = json.load(f)
+        js["State." + self.state.id]["name"] = "Nevada"
+        with open("test_skip.json.new", "w") as f:
+            json.dump(js, f)
+        os.replace("test_skip.json.new", "test_skip.json")
+        before = self.storage.reload_stats()
+        self.storage.close()
+        after = self.storage.reload_stats()
+        self.assertEqual(after["performed"], before["performed"] + 1)
+        self.assertEqual(self.storage.get(State, self.state.id).name,
+                         "Nevada")
+        self.storage.close()
+        self.assertEqual(self.storage.reload_stats()["skipped"],
+                         after["skipped"] + 1)
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageSharded(FileStorageTestCase):
+    """ Test the one-file-per-class layout """
+    file_path = "test_shards.json"
+    scratch = ("test_shards", "test_shards.json.log")
+
+    def setUp(self):
+        """ Switches FileStorage to the sharded layout on empty objects """
+        super().setUp()
+        FileStorage._FileStorage__sharded = True
+        FileStorage._FileStorage__shard_dir = "test_shards"
+        FileStorage._FileStorage__journal_path = "test_shards.json.log"
+
+    def test_one_file_per_class(self):
+        """Test that each class is saved to its own file"""
+        state = State(name="California")
+        amenity = Amenity(name="Wifi")
+        self.storage.new(state)
+        self.storage.new(amenity)
+        self.storage.save()
+        self.assertEqual(sorted(os.listdir("test_shards")),
+                         ["Amenity.json", "State.json"])
+        with open("test_shards/State.json", "r") as f:
+            self.assertEqual(json.load(f),
+                             {"State." + state.id: state.to_dict()})
+
+    def test_shards_load_on_demand(self):
+        """Test that a shard is read the first time its class is used"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.new(Amenity(name="Wifi"))
+        self.storage.save()
+        self.reset()
+        self.assertEqual(self.storage.get(State, state.id).name,
+                         "California")
+        self.assertEqual(FileStorage._FileStorage__loaded, {"State"})
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(FileStorage._FileStorage__loaded, set(classes))
+
+    def test_only_dirty_shards_written(self):
+        """Test that save leaves the shards of clean classes alone"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.new(Amenity(name="Wifi"))
+        self.storage.save()
+        before = stat("test_shards/Amenity.json")
+        state.name = "Nevada"
+        self.storage.save()
+        after = stat("test_shards/Amenity.json")
+        self.assertEqual((before.st_ino, before.st_mtime_ns),
+                         (after.st_ino, after.st_mtime_ns))
+        self.reset()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+
+    def test_new_keeps_unloaded_shard(self):
+        """Test that adding to a class does not drop its saved objects"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.reset()
+        self.storage.new(State(name="Nevada"))
+        self.storage.save()
+        self.reset()
+        self.assertEqual(self.storage.count(State), 2)
+
+    def test_migration_from_single_file(self):
+        """Test that an existing single file is split into shards"""
+        state = State(name="California")
+        city = City(name="Fresno", state_id=state.id)
+        with open("test_shards.json", "w") as f:
+            json.dump({"State." + state.id: state.to_dict(),
+                       "City." + city.id: city.to_dict()}, f)
+        self.assertEqual(self.storage.get(City, city.id).state_id, state.id)
+        self.assertTrue(path.exists("test_shards/State.json"))
+        self.assertEqual(self.storage.count(State), 1)
+
+    def test_migration_replays_journal(self):
+        """Test that the changes journaled on the single file migrate"""
+        kept, changed, deleted = [State(name=name) for name in
+                                  ("Kept", "Changed", "Deleted")]
+        added = City(name="Added")
+        with open("test_shards.json", "w") as f:
+            json.dump({"State." + state.id: state.to_dict()
+                       for state in (kept, changed, deleted)}, f)
+        changed.name = "Renamed"
+        with open("test_shards.json.log", "w") as f:
+            for key, record in [("State." + changed.id, changed.to_dict()),
+                                ("City." + added.id, added.to_dict()),
+                                ("State." + deleted.id, None)]:
+                f.write(json.dumps([key, record]) + "\n")
+            f.write('["State.x", {"__cla')
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.get(State, changed.id).name, "Renamed")
+        self.assertIsNone(self.storage.get(State, deleted.id))
+        self.assertEqual(self.storage.get(City, added.id).name, "Added")
+
+    def test_interrupted_migration_runs_again(self):
+        """Test that a failed migration leaves no shard directory behind"""
+        state = State(name="California")
+        with open("test_shards.json", "w") as f:
+            json.dump({"State." + state.id: state.to_dict()}, f)
+        codec = FileStorage._FileStorage__codec
+        with mock.patch.object(codec, "write", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.count()
+        self.assertFalse(path.exists("test_shards"))
+        self.assertFalse(path.exists("test_shards.tmp"))
+        os.mkdir("test_shards")
+        self.assertEqual(self.storage.get(State, state.id).name,
+                         "California")
+
+    def test_journal_rejected(self):
+        """Test that the sharded layout refuses to ignore a journal"""
+        FileStorage._FileStorage__journal = True
+        with self.assertRaises(ValueError):
+            self.storage.count()
+        with self.assertRaises(ValueError):
+            self.storage.reload()
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageCodec(FileStorageTestCase):
+    """ Test FileStorage with a binary codec """
+    file_path = "test_codec.marshal.gz"
+
+    def setUp(self):
+        """ Switches FileStorage to the compressed marshal codec """
+        super().setUp()
+        FileStorage._FileStorage__codec = get_codec("marshal.gz")
+
+    def test_save_and_reload(self):
+        """Test that objects survive a save and reload"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.reset()
+        self.storage.reload()
+        reloaded = self.storage.get(State, state.id)
+        self.assertIsNot(reloaded, state)
+        self.assertEqual(reloaded.to_dict(), state.to_dict())
+        self.assertEqual(reloaded.created_at, state.created_at)
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageRelationships(FileStorageTestCase):
+    """ Test the foreign-key indexes behind the relationship properties """
+    def setUp(self):
+        """ Stores a state for the tests to relate to """
+        super().setUp()
+        self.state = State(name="California")
+        self.storage.new(self.state)
+
+    def test_cities_follow_new_and_delete(self):
+        """Test that State.cities sees new and deleted cities"""
+        fresno = City(name="Fresno", state_id=self.state.id)
+        reno = City(name="Reno", state_id="other")
+        self.storage.new(fresno)
+        self.storage.new(reno)
+        self.assertEqual(self.state.cities, [fresno])
+        self.storage.delete(fresno)
+        self.assertEqual(self.state.cities, [])
+
+    def test_cities_follow_foreign_key_change(self):
+        """Test that changing state_id moves a city between states"""
+        nevada = State(name="Nevada")
+        self.storage.new(nevada)
+        city = City(name="Reno", state_id=self.state.id)
+        self.storage.new(city)
+        city.state_id = nevada.id
+        self.assertEqual(self.state.cities, [])
+        self.assertEqual(nevada.cities, [city])
+
+    def test_unhashable_foreign_key(self):
+        """Test that a list foreign key is stored, found and deleted"""
+        city = City(name="Fresno", state_id=self.state.id)
+        self.storage.new(city)
+        city.state_id = [self.state.id]
+        self.assertEqual(self.state.cities, [])
+        self.assertEqual(self.storage.query(
+            City, where={"state_id": [self.state.id]}), [city])
+        self.storage.delete(city)
+        self.assertIsNone(self.storage.get(City, city.id))
+        self.assertIn("City." + city.id, FileStorage._FileStorage__dirty)
+
+    def test_cities_scan_nothing(self):
+        """Test that State.cities does not go through all()"""
+        city = City(name="Fresno", state_id=self.state.id)
+        self.storage.new(city)
+        with mock.patch.object(FileStorage, "all") as all_:
+            self.assertEqual(self.state.cities, [city])
+        self.assertFalse(all_.called)
+
+    def test_reviews_and_user_places(self):
+        """Test Place.reviews and the user_id indexes"""
+        place = Place(name="Home", user_id="u1")
+        review = Review(text="Nice", place_id=place.id, user_id="u1")
+        self.storage.new(place)
+        self.storage.new(review)
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(self.storage.related(Place, "user_id", "u1"),
+                         [place])
+        self.assertEqual(self.storage.related("Review", "user_id", "u1"),
+                         [review])
+
+    def test_amenities_use_amenity_ids(self):
+        """Test that Place.amenities resolves amenity_ids"""
+        wifi = Amenity(name="Wifi")
+        self.storage.new(wifi)
+        place = Place(name="Home", amenity_ids=[wifi.id, "missing"])
+        self.assertEqual(place.amenities, [wifi])
+
+    def test_related_without_index(self):
+        """Test that related compares attributes that are not indexed"""
+        self.assertEqual(self.storage.related(State, "name", "California"),
+                         [self.state])
+
+    def test_query_where_order_limit(self):
+        """Test that query filters, orders and slices"""
+        names = ["Fresno", "Anaheim", "Davis", "Berkeley", "Chico"]
+        cities = [City(name=name, state_id=self.state.id) for name in names]
+        for city in cities:
+            self.storage.new(city)
+        self.storage.new(City(name="Reno", state_id="other"))
+        where = {"state_id": self.state.id}
+        self.assertEqual(self.storage.query(City, where=where), cities)
+        found = self.storage.query("City", where=where, order_by="name",
+                                   limit=2, offset=1)
+        self.assertEqual([city.name for city in found],
+                         ["Berkeley", "Chico"])
+        found = self.storage.query(City, where=where, order_by="-name")
+        self.assertEqual([city.name for city in found], sorted(names)[::-1])
+        self.assertEqual(self.storage.query(City, where={"name": "Reno",
+                                                         "state_id": "x"}),
+                         [])
+        self.assertEqual(len(self.storage.query(City)), 6)
+
+    def test_query_uses_indexes(self):
+        """Test that query narrows by index and orders by sorted index"""
+        places = [Place(name=str(i), city_id="c", price_by_night=price)
+                  for i, price in enumerate([90, 40, 120, 60])]
+        for place in places:
+            self.storage.new(place)
+        with mock.patch.object(FileStorage, "all") as all_:
+            found = self.storage.query(Place, order_by="-price_by_night",
+                                       limit=2)
+            self.assertEqual(found, [places[2], places[0]])
+            found = self.storage.query(Place, where={"price_by_night": 60})
+            self.assertEqual(found, [places[3]])
+            found = self.storage.query(Place, where={"city_id": "c"},
+                                       order_by="price_by_night")
+            self.assertEqual(found, [places[1], places[3], places[0],
+                                     places[2]])
+        self.assertFalse(all_.called)
+
+    def test_find_by_email(self):
+        """Test that users are found by email through their index"""
+        user = User(email="a@b.c", password="pwd")
+        self.storage.new(user)
+        self.storage.new(User(email="d@e.f", password="pwd"))
+        with mock.patch.object(FileStorage, "all") as all_:
+            self.assertIs(self.storage.find_by(User, "email", "a@b.c"),
+                          user)
+            self.assertIsNone(self.storage.find_by("User", "email", "x"))
+        self.assertFalse(all_.called)
+        user.email = "x"
+        self.assertIs(self.storage.find_by(User, "email", "x"), user)
+        self.assertIsNone(self.storage.find_by(User, "email", "a@b.c"))
+
+    def test_find_range(self):
+        """Test range queries over the sorted indexes of Place"""
+        places = [Place(name=str(i), price_by_night=price, max_guest=guests)
+                  for i, (price, guests) in enumerate(
+                      [(40, 6), (60, 2), (90, 4), (120, 8), (150, 4)])]
+        for place in reversed(places):
+            self.storage.new(place)
+        with mock.patch.object(FileStorage, "all") as all_:
+            found = self.storage.find_range(Place, price_by_night=(50, 120),
+                                            max_guest=(4, None))
+        self.assertFalse(all_.called)
+        self.assertEqual(found, [places[2], places[3]])
+        places[1].max_guest = 5
+        found = self.storage.find_range(Place, max_guest=(4, None),
+                                        price_by_night=(50, 120))
+        self.assertEqual(found, [places[2], places[1], places[3]])
+        found = self.storage.find_range(Place, name=("1", "3"),
+                                        number_rooms=(0, 0))
+        self.assertEqual(found, places[1:4])
+        self.storage.delete(places[3])
+        self.assertEqual(self.storage.find_range(Place, max_guest=(8, 8)),
+                         [])
+
+    def test_nearby(self):
+        """Test that nearby finds places through the spatial index"""
+        sf = Place(name="sf", latitude=37.7749, longitude=-122.4194)
+        oak = Place(name="oak", latitude=37.8044, longitude=-122.2712)
+        la = Place(name="la", latitude=34.0522, longitude=-118.2437)
+        for place in (la, oak, sf, Place(name="nowhere")):
+            self.storage.new(place)
+        with mock.patch.object(FileStorage, "all") as all_:
+            found = self.storage.nearby(Place, 37.77, -122.41, 50)
+        self.assertFalse(all_.called)
+        self.assertEqual([place for place, distance in found], [sf, oak])
+        self.assertLess(found[0][1], found[1][1])
+        oak.latitude = 34.06
+        oak.longitude = -118.25
+        found = self.storage.nearby("Place", 34.05, -118.24, 50, limit=1)
+        self.assertEqual([place for place, distance in found], [la])
+        self.storage.delete(la)
+        found = self.storage.nearby(Place, 34.05, -118.24, 50)
+        self.assertEqual([place for place, distance in found], [oak])
+        with self.assertRaises(ValueError):
+            self.storage.nearby(State, 0, 0, 10)
+
+    def test_search(self):
+        """Test that search ranks places and reviews by their words"""
+        loft = Place(name="Cozy loft", description="A cozy loft downtown")
+        cabin = Place(name="Cabin", description="Quiet cabin")
+        review = Review(text="So cozy", place_id=cabin.id)
+        for obj in (loft, cabin, review):
+            self.storage.new(obj)
+        with mock.patch.object(FileStorage, "all") as all_:
+            found = self.storage.search(Place, "cozy loft")
+        self.assertFalse(all_.called)
+        self.assertEqual([place for place, score in found], [loft])
+        cabin.description = "Cozy cabin"
+        found = self.storage.search(Place, "cozy", limit=1)
+        self.assertEqual(len(found), 1)
+        self.assertEqual([r for r, score in self.storage.search(
+            "Review", "cozy")], [review])
+        self.storage.delete(loft)
+        self.assertEqual([place for place, score in self.storage.search(
+            Place, "cozy")], [cabin])
+
+    def test_text_index_built_on_first_search(self):
+        """Test that the text index is only filled by the first search"""
+        loft = Place(name="Cozy loft")
+        self.storage.new(loft)
+        self.storage._load("Place.cabin", {
+            "__class__": "Place", "id": "cabin", "name": "Cozy cabin",
+            "created_at": "2017-01-01T00:00:00.000000",
+            "updated_at": "2017-01-01T00:00:00.000000"})
+        loft.description = "A loft downtown"
+        index = self.storage._index_of("Place", TextIndex)
+        self.assertFalse(index.built)
+        self.assertEqual(len(index), 0)
+        found = self.storage.search(Place, "cozy")
+        self.assertTrue(index.built)
+        self.assertEqual(sorted(place.id for place, score in found),
+                         sorted([loft.id, "cabin"]))
+        loft.name = "Loft"
+        self.assertEqual([place.id for place, score in self.storage.search(
+            Place, "cozy")], ["cabin"])
+
+    def test_unique_email(self):
+        """Test that two stored users cannot share an email"""
+        user = User(email="a@b.c", password="pwd")
+        self.storage.new(user)
+        self.storage.new(user)
+        with self.assertRaises(ValueError):
+            self.storage.new(User(email="a@b.c", password="pwd"))
+        other = User(email="d@e.f", password="pwd")
+        self.storage.new(other)
+        with self.assertRaises(ValueError):
+            other.email = "a@b.c"
+        self.assertEqual(other.email, "d@e.f")
+        self.storage.new(User())
+        self.storage.new(User())
+        self.assertEqual(self.storage.count(User), 4)
+
+    def test_composite_indexes_updated_once(self):
+        """Test that spatial and text indexes see each change once"""
+        place = Place(name="Loft", latitude=37.77, longitude=-122.41)
+        with mock.patch.object(TextIndex, "add", autospec=True,
+                               side_effect=TextIndex.add) as text_add, \
+                mock.patch.object(GridIndex, "discard", autospec=True,
+                                  side_effect=GridIndex.discard) as discard:
+            self.storage.new(place)
+            self.storage.delete(place)
+        self.assertEqual(text_add.call_count, 1)
+        self.assertEqual(discard.call_count, 1)
+
+    def test_stored_duplicates_stay_writable(self):
+        """Test that users read with a shared email can still be stored"""
+        for id in ("u1", "u2"):
+            self.storage._load("User." + id, {
+                "__class__": "User", "id": id, "email": "a@b.c",
+                "created_at": "2017-01-01T00:00:00.000000",
+                "updated_at": "2017-01-01T00:00:00.000000"})
+        user = self.storage.get(User, "u2")
+        user.first_name = "Bob"
+        user.email = "a@b.c"
+        self.storage.new(user)
+        self.assertEqual(self.storage.get(User, "u2").first_name, "Bob")
+
+    def test_reload_indexes_records(self):
+        """Test that objects read from disk are indexed"""
+        city = City(name="Fresno", state_id=self.state.id)
+        self.storage._load("City." + city.id, city.to_dict())
+        self.assertEqual([c.id for c in self.state.cities], [city.id])
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageSnapshots(FileStorageTestCase):
+    """ Test the snapshots handed out by all() to concurrent readers """
+    file_path = "test_snapshots.json"
+
+    def test_snapshot_is_stable(self):
+        """Test that a snapshot does not see later changes"""
+        state = State(name="California")
+        self.storage.new(state)
+        snapshot = self.storage.all()
+        states = self.storage.all(State)
+        self.storage.new(State(name="Nevada"))
+        self.storage.delete(state)
+        self.assertEqual(list(snapshot), ["State." + state.id])
+        self.assertEqual(list(states), ["State." + state.id])
+        self.assertEqual(len(self.storage.all()), 1)
+
+    def test_snapshot_is_shared(self):
+        """Test that readers share a snapshot until the objects change"""
+        self.storage.new(State(name="California"))
+        self.assertIs(self.storage.all(), self.storage.all())
+        states = self.storage.all(State)
+        self.storage.new(City(name="Fresno"))
+        self.assertIs(self.storage.all(State), states)
+
+    def test_concurrent_readers_and_writers(self):
+        """Test that iterating all() races with neither new nor delete"""
+        errors = []
+        done = threading.Event()
+
+        def write(n):
+            try:
+                for i in range(300):
+                    state = State(name="{}-{}".format(n, i))
+                    self.storage.new(state)
+                    if i % 2:
+                        self.storage.delete(state)
+                    if i % 100 == 0:
+                        self.storage.save()
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                while not done.is_set():
+                    for cls in (None, State):
+                        objects = self.storage.all(cls)
+                        size = len(objects)
+                        seen = sum(1 for key, obj in objects.items())
+                        if seen != size:
+                            errors.append(AssertionError(
+                                "snapshot changed while iterated"))
+            except Exception as e:
+                errors.append(e)
+
+        writers = [threading.Thread(target=write, args=(n,))
+                   for n in range(4)]
+        readers = [threading.Thread(target=read) for n in range(4)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.storage.count(State), 4 * 150)
+        self.storage.save()
+        with open("test_snapshots.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 4 * 150)
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageMultiProcess(FileStorageTestCase):
+    """ Test the file locking and merging of the multi-process mode """
+    file_path = "test_shared.json"
+    scratch = ("test_shared.json.lock",)
+
+    def setUp(self):
+        """ Switches FileStorage to multi-process mode on a scratch file """
+        super().setUp()
+        FileStorage._FileStorage__shared = True
+
+    def run_workers(self, workers, count):
+        """ Runs hammer in separate processes and waits for them """
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=hammer, args=(n, count))
+                     for n in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+    def test_workers_keep_each_other_writes(self):
+        """Test that concurrent workers lose none of their writes"""
+        self.run_workers(4, 30)
+        self.storage.reload()
+        names = sorted(state.name for state in self.storage.all(State)
+                       .values())
+        self.assertEqual(names, sorted("{}-{}".format(n, i)
+                                       for n in range(4) for i in range(30)
+                                       if i % 3))
+
+    def test_save_merges_other_writes(self):
+        """Test that save keeps the objects other workers wrote"""
+        self.storage.reload()
+        mine = State(name="Mine")
+        self.storage.new(mine)
+        self.run_workers(1, 2)
+        self.storage.save()
+        with open("test_shared.json", "r") as f:
+            js = json.load(f)
+        self.assertIn("State." + mine.id, js)
+        self.assertEqual(len(js), 2)
+        self.assertEqual(self.storage.count(State), 2)
+
+    def test_reload_follows_deletes(self):
+        """Test that objects deleted by another worker disappear here"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open("test_shared.json", "w") as f:
+            json.dump({}, f)
+        self.storage.reload()
+        self.assertIsNone(self.storage.get(State, state.id))
+
+    def test_reload_keeps_unsaved_changes(self):
+        """Test that local changes survive a merge until saved"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Nevada"
+        with open("test_shared.json", "r") as f:
+            js = json.load(f)
+        js["State." + state.id]["name"] = "Oregon"
+        with open("test_shared.json", "w") as f:
+            json.dump(js, f)
+        self.storage.reload()
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertEqual(state.name, "Nevada")
+
+    def test_unchanged_file_not_read(self):
+        """Test that reload skips a file no other worker changed"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(self.storage.reload_stats(),
+                         {"performed": 0, "skipped": 1})
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageBulk(FileStorageTestCase):
+    """ Test that bulk_new and bulk_delete write the file once """
+    file_path = "test_bulk.json"
+
+    def commits(self):
+        """returns a mock counting the commits of the storage"""
+        return mock.patch.object(FileStorage, "_commit", autospec=True,
+                                 side_effect=FileStorage._commit)
+
+    def test_bulk_new_writes_once(self):
+        """Test that a batch of objects is stored with a single commit"""
+        state = State(name="California")
+        cities = [City(name="City{:d}".format(i), state_id=state.id)
+                  for i in range(20)]
+        with self.commits() as commit:
+            self.assertEqual(self.storage.bulk_new([state] + cities), 21)
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(self.storage.count(City), 20)
+        self.assertEqual(state.cities, cities)
+        with open("test_bulk.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 21)
+        with self.commits() as commit:
+            self.assertEqual(self.storage.bulk_new([]), 0)
+        self.assertEqual(commit.call_count, 0)
+
+    def test_bulk_new_unique_conflicts(self):
+        """Test that a conflicting batch stores nothing"""
+        self.storage.new(User(email="a@b.c"))
+        with self.assertRaises(ValueError):
+            self.storage.bulk_new([User(email="d@e.f"), User(email="a@b.c")])
+        with self.assertRaises(ValueError):
+            self.storage.bulk_new([User(email="g@h.i"), User(email="g@h.i")])
+        self.assertEqual(self.storage.count(User), 1)
+        self.storage.bulk_new([User(email="j@k.l"), User(), User()])
+        self.assertEqual(self.storage.count(User), 4)
+
+    def test_bulk_delete_writes_once(self):
+        """Test that deleting a batch of ids is a single commit"""
+        states = [State(name="State{:d}".format(i)) for i in range(10)]
+        self.storage.bulk_new(states)
+        ids = [state.id for state in states[:6]] + ["missing"]
+        with self.commits() as commit:
+            self.assertEqual(self.storage.bulk_delete(State, ids), 6)
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(list(self.storage.all(State).values()), states[6:])
+        with self.commits() as commit:
+            self.assertEqual(self.storage.bulk_delete("State", ids), 0)
+        self.assertEqual(commit.call_count, 0)
+        with open("test_bulk.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageQueryCache(FileStorageTestCase):
+    """ Test the query result cache of FileStorage """
+    file_path = "test_results.json"
+
+    def setUp(self):
+        """ Switches on the query cache and stores a state """
+        super().setUp()
+        FileStorage._FileStorage__results = QueryCache(16, 60)
+        self.state = State(name="California")
+        self.storage.new(self.state)
+
+    def test_repeated_query_hits(self):
+        """Test that a repeated query is served from the cache"""
+        first = self.storage.query(State, order_by="name")
+        with mock.patch.object(FileStorage, "_query") as query:
+            second = self.storage.query("State", order_by="name")
+        query.assert_not_called()
+        self.assertEqual(second, [self.state])
+        self.assertIsNot(second, first)
+        stats = self.storage.query_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_writes_invalidate(self):
+        """Test that new, changed and deleted objects are seen at once"""
+        self.assertEqual(self.storage.query(State, where={"name": "Texas"}),
+                         [])
+        self.storage.query(City)
+        texas = State(name="Texas")
+        self.storage.new(texas)
+        self.assertEqual(self.storage.query(State, where={"name": "Texas"}),
+                         [texas])
+        self.state.name = "Texas"
+        self.assertEqual(len(self.storage.query(
+            State, where={"name": "Texas"})), 2)
+        self.storage.delete(texas)
+        self.assertEqual(self.storage.query(State, where={"name": "Texas"}),
+                         [self.state])
+        self.storage.query(City)
+        self.assertEqual(self.storage.query_cache_stats()["hits"], 1)
+        self.storage.delete_all()
+        self.assertEqual(self.storage.query(State), [])
+
+    def test_unhashable_where(self):
+        """Test that unhashable where values bypass the cache"""
+        self.assertEqual(self.storage.query(State, where={"name": []}), [])
+        self.assertEqual(self.storage.query_cache_stats()["misses"], 0)
+
+
+@unittest.skipIf(STORAGE_TYPE == 'db', 'skip if environ is not db')
+class TestFileStorageIter(FileStorageTestCase):
+    """ Test the keyset iteration of FileStorage """
+    def setUp(self):
+        """ Stores states created at two different times """
+        super().setUp()
+        old = datetime(2017, 1, 1)
+        self.states = [State(name="State{:d}".format(i),
+                             created_at=old if i % 2 else datetime.utcnow())
+                       for i in range(7)]
+        for state in reversed(self.states):
+            self.storage.new(state)
+        self.states.sort(key=lambda state: (state.created_at, state.id))
+
+    def test_ordered_by_cursor(self):
+        """Test that objects come ordered by (created_at, id)"""
+        self.storage.new(City(name="City"))
+        self.assertEqual(list(self.storage.iter(State, batch_size=2)),
+                         self.states)
+        self.assertEqual(list(self.storage.iter("Review")), [])
+
+    def test_pages_after_cursor(self):
+        """Test that paging by cursors visits every object once"""
+        seen = []
+        after = None
+        while True:
+            page = list(itertools.islice(
+                self.storage.iter(State, after=after, batch_size=2), 3))
+            if not page:
+                break
+            seen.extend(page)
+            after = page[-1].to_dict()["created_at"], page[-1].id
+        self.assertEqual(seen, self.states)
+        self.assertEqual(list(self.storage.iter(State, after=self.states[3])),
+                         self.states[4:])
+
+    def test_deleted_skipped(self):
+        """Test that objects deleted while iterating are skipped"""
+        found = self.storage.iter(State, batch_size=2)
+        self.assertIs(next(found), self.states[0])
+        self.storage.delete(self.states[5])
+        self.assertEqual(list(found),
+                         self.states[1:5] + self.states[6:])
+
+
 if __name__ == '__main__':
     unittest.main()
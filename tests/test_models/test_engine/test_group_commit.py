@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Contains the TestGroupCommitWriterDocs and TestGroupCommitWriter classes
+"""
+
+import inspect
+import pep8
+import threading
+import time
+import unittest
+from models.engine import group_commit
+from models.engine.group_commit import GroupCommitWriter
+
+
+class TestGroupCommitWriterDocs(unittest.TestCase):
+    """Tests to check the documentation and style of GroupCommitWriter"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.gc_f = inspect.getmembers(GroupCommitWriter, inspect.isfunction)
+
+    def test_pep8_conformance_group_commit(self):
+        """Test that models/engine/group_commit.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/group_commit.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_group_commit(self):
+        """Test that test_group_commit.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_group_commit.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_group_commit_module_docstring(self):
+        """Test for the group_commit.py module docstring"""
+        self.assertIsNot(group_commit.__doc__, None,
+                         "group_commit.py needs a docstring")
+
+    def test_group_commit_func_docstrings(self):
+        """Test for the presence of docstrings in GroupCommitWriter"""
+        for func in self.gc_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestGroupCommitWriter(unittest.TestCase):
+    """Test the GroupCommitWriter class"""
+    def test_requests_share_commits(self):
+        """Test that requests within the window are committed together"""
+        calls = []
+        writer = GroupCommitWriter(lambda: calls.append(1), window=0.05)
+        futures = []
+        threads = [threading.Thread(
+            target=lambda: futures.append(writer.submit()))
+            for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            self.assertIsNone(future.result(timeout=5))
+        writer.stop()
+        stats = writer.stats()
+        self.assertEqual(stats["requests"], 10)
+        self.assertEqual(stats["batches"], len(calls))
+        self.assertLess(len(calls), 10)
+        self.assertGreaterEqual(stats["max_batch"], 2)
+        self.assertGreaterEqual(stats["mean_batch"], 10 / len(calls))
+
+    def test_commit_starts_after_request(self):
+        """Test that a request is only resolved by a later commit"""
+        done = []
+
+        def commit():
+            """records the time of the commit"""
+            done.append(time.monotonic())
+        writer = GroupCommitWriter(commit, window=0)
+        before = time.monotonic()
+        writer.submit().result(timeout=5)
+        writer.stop()
+        self.assertGreaterEqual(done[-1], before)
+
+    def test_commit_error_reaches_every_request(self):
+        """Test that a failed commit fails all the requests of its batch"""
+        def commit():
+            """always fails"""
+            raise OSError("disk full")
+        writer = GroupCommitWriter(commit, window=0.01)
+        futures = [writer.submit() for i in range(3)]
+        for future in futures:
+            with self.assertRaises(OSError):
+                future.result(timeout=5)
+        writer.stop()
+        with self.assertRaises(RuntimeError):
+            writer.submit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+"""
+Contains the TestIndexesDocs, TestHashIndex, TestNonUniqueIndex,
+TestSortedIndex, TestGridIndex and TestTextIndex classes
+"""
+
+import inspect
+import pep8
+import unittest
+from models.engine import indexes
+from models.engine.indexes import GridIndex, HashIndex, NonUniqueIndex
+from models.engine.indexes import SortedIndex
+from models.engine.indexes import TextIndex, bounding_box, haversine
+from models.engine.indexes import tokenize
+from models.city import City
+
+
+class TestIndexesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the indexes"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.index_f = (inspect.getmembers(HashIndex, inspect.isfunction) +
+                       inspect.getmembers(NonUniqueIndex,
+                                          inspect.isfunction) +
+                       inspect.getmembers(SortedIndex, inspect.isfunction) +
+                       inspect.getmembers(GridIndex, inspect.isfunction) +
+                       inspect.getmembers(TextIndex, inspect.isfunction))
+
+    def test_pep8_conformance_indexes(self):
+        """Test that models/engine/indexes.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/indexes.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_indexes(self):
+        """Test that test_indexes.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_indexes.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_indexes_module_docstring(self):
+        """Test for the indexes.py module docstring"""
+        self.assertIsNot(indexes.__doc__, None,
+                         "indexes.py needs a docstring")
+
+    def test_index_func_docstrings(self):
+        """Test for the presence of docstrings in the index classes"""
+        for func in self.index_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestHashIndex(unittest.TestCase):
+    """Test the HashIndex class"""
+    def test_add_and_lookup(self):
+        """Test that keys are found by value in insertion order"""
+        index = HashIndex("state_id")
+        index.add("City.1", City(state_id="s1"))
+        index.add("City.2", {"state_id": "s2"})
+        index.add("City.3", City(state_id="s1"))
+        self.assertEqual(index.lookup("s1"), ["City.1", "City.3"])
+        self.assertEqual(index.lookup("s2"), ["City.2"])
+        self.assertEqual(index.lookup("s3"), [])
+        self.assertEqual(len(index), 3)
+
+    def test_add_moves_key(self):
+        """Test that adding a key again replaces its value"""
+        index = HashIndex("state_id")
+        index.add("City.1", {"state_id": "s1"})
+        index.add("City.1", {"state_id": "s2"})
+        self.assertEqual(index.lookup("s1"), [])
+        self.assertEqual(index.lookup("s2"), ["City.1"])
+
+    def test_discard_and_clear(self):
+        """Test that discarded and cleared keys are not found"""
+        index = HashIndex("state_id")
+        index.add("City.1", {"state_id": "s1"})
+        index.add("City.2", {"state_id": "s1"})
+        index.discard("City.1")
+        index.discard("City.missing")
+        self.assertEqual(index.lookup("s1"), ["City.2"])
+        index.clear()
+        self.assertEqual(index.lookup("s1"), [])
+        self.assertEqual(len(index), 0)
+
+    def test_conflicts(self):
+        """Test that only unique indexes report conflicting keys"""
+        index = HashIndex("email", unique=True)
+        index.add("User.1", {"email": "a@b.c"})
+        self.assertTrue(index.conflicts("User.2", "a@b.c"))
+        self.assertFalse(index.conflicts("User.1", "a@b.c"))
+        self.assertFalse(index.conflicts("User.2", "d@e.f"))
+        self.assertFalse(index.conflicts("User.2", ""))
+        index = HashIndex("state_id")
+        index.add("City.1", {"state_id": "s1"})
+        self.assertFalse(index.conflicts("City.2", "s1"))
+
+    def test_class_defaults_not_indexed(self):
+        """Test that instances are indexed on their own attributes"""
+        index = HashIndex("state_id")
+        index.add("City.1", City())
+        self.assertEqual(len(index), 0)
+
+    def test_unhashable_not_indexed(self):
+        """Test that unhashable values are neither indexed nor found"""
+        index = HashIndex("email", unique=True)
+        index.add("User.1", {"email": "a@b.c"})
+        index.add("User.1", {"email": ["a@b.c"]})
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.lookup(["a@b.c"]), [])
+        self.assertFalse(index.conflicts("User.2", ["a@b.c"]))
+
+    def test_none_not_indexed(self):
+        """Test that objects without the attribute are not indexed"""
+        index = HashIndex("state_id")
+        index.add("City.1", {})
+        self.assertEqual(len(index), 0)
+
+
+class TestNonUniqueIndex(unittest.TestCase):
+    """Test the NonUniqueIndex class"""
+    def test_never_conflicts(self):
+        """Test that sorted, spatial and text indexes accept any value"""
+        for index in (SortedIndex("price_by_night"),
+                      GridIndex("latitude", "longitude"),
+                      TextIndex("name")):
+            self.assertIsInstance(index, NonUniqueIndex)
+            self.assertFalse(index.unique)
+            index.add("Place.1", {"price_by_night": 1, "latitude": 1.0,
+                                  "longitude": 2.0, "name": "Loft"})
+            self.assertFalse(index.conflicts("Place.2", 1))
+            self.assertFalse(index.conflicts("Place.2", (1.0, 2.0)))
+            self.assertFalse(index.conflicts("Place.2", "Loft"))
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test the SortedIndex class"""
+    def setUp(self):
+        """Indexes places by price"""
+        self.index = SortedIndex("price_by_night", 0)
+        for i, price in enumerate([120, 50, 80, 50, 200]):
+            self.index.add("Place.{}".format(i), {"price_by_night": price})
+
+    def test_range(self):
+        """Test that ranges include their bounds and are ordered"""
+        self.assertEqual(self.index.range(50, 120),
+                         ["Place.1", "Place.3", "Place.2", "Place.0"])
+        self.assertEqual(self.index.range(100), ["Place.0", "Place.4"])
+        self.assertEqual(self.index.range(high=50), ["Place.1", "Place.3"])
+        self.assertEqual(self.index.range(121, 199), [])
+        self.assertEqual(len(self.index.range()), 5)
+        self.assertEqual(self.index.lookup(80), ["Place.2"])
+
+    def test_add_moves_and_discard(self):
+        """Test that keys follow value changes and removals"""
+        self.index.add("Place.1", {"price_by_night": 300})
+        self.index.discard("Place.3")
+        self.index.discard("Place.missing")
+        self.assertEqual(self.index.range(50, 50), [])
+        self.assertEqual(self.index.range(250), ["Place.1"])
+        self.assertEqual(len(self.index), 4)
+        self.index.clear()
+        self.assertEqual(self.index.range(), [])
+
+    def test_defaults_and_non_numbers(self):
+        """Test that class defaults are indexed and strings are not"""
+        index = SortedIndex("price_by_night", 0)
+        index.add("Place.1", {})
+        index.add("Place.2", {"price_by_night": "cheap"})
+        self.assertEqual(index.range(0, 0), ["Place.1"])
+        self.assertEqual(len(index), 1)
+        self.assertFalse(index.conflicts("Place.3", 0))
+
+    def test_bulk_add_and_shared_values(self):
+        """Test keys added in bulk, and discarded among equal values"""
+        index = SortedIndex("max_guest", 0)
+        keys = ["Place.{:03d}".format(i) for i in range(100)]
+        for key in reversed(keys):
+            index.add(key, {"max_guest": 0 if key < "Place.050" else 2})
+        index.add("Place.200", {"max_guest": float("nan")})
+        self.assertEqual(index.range(), keys)
+        index.discard("Place.010")
+        index.add("Place.020", {"max_guest": 1})
+        index.add("Place.300", {"max_guest": 0})
+        index.discard("Place.300")
+        self.assertEqual(index.lookup(1), ["Place.020"])
+        self.assertEqual(index.lookup(0),
+                         [key for key in keys[:50]
+                          if key not in ("Place.010", "Place.020")])
+        self.assertEqual(index.range(2), keys[50:])
+        self.assertEqual(len(index), 99)
+
+
+class TestGridIndex(unittest.TestCase):
+    """Test the GridIndex class and its distance helpers"""
+    def setUp(self):
+        """Indexes a few places around San Francisco and Los Angeles"""
+        self.index = GridIndex("latitude", "longitude")
+        points = {"Place.sf": (37.7749, -122.4194),
+                  "Place.oak": (37.8044, -122.2712),
+                  "Place.sj": (37.3382, -121.8863),
+                  "Place.la": (34.0522, -118.2437)}
+        for key, (lat, lng) in points.items():
+            self.index.add(key, {"latitude": lat, "longitude": lng})
+
+    def test_haversine(self):
+        """Test the distance between two known points"""
+        self.assertAlmostEqual(haversine(37.7749, -122.4194,
+                                         34.0522, -118.2437), 559, delta=1)
+        self.assertEqual(haversine(10, 20, 10, 20), 0)
+
+    def test_bounding_box(self):
+        """Test boxes that cross the antimeridian or a pole"""
+        south, north, west, east = bounding_box(0, 179.9, 100)
+        self.assertGreater(west, east)
+        self.assertEqual(bounding_box(89.9, 0, 100)[2:], (None, None))
+
+    def test_within_sorted_by_distance(self):
+        """Test that radius lookups are exact and nearest first"""
+        found = self.index.within(37.77, -122.41, 80)
+        self.assertEqual([key for distance, key in found],
+                         ["Place.sf", "Place.oak", "Place.sj"])
+        self.assertEqual(found, sorted(found))
+        self.assertEqual(len(self.index.within(37.77, -122.41, 1000)), 4)
+        self.assertEqual(self.index.within(0, 0, 1000), [])
+
+    def test_within_across_antimeridian(self):
+        """Test that points on both sides of longitude 180 are found"""
+        self.index.add("Place.east", {"latitude": -16.5, "longitude": 179.9})
+        self.index.add("Place.west", {"latitude": -16.5,
+                                      "longitude": -179.9})
+        found = self.index.within(-16.5, 179.99, 50)
+        self.assertEqual(sorted(key for distance, key in found),
+                         ["Place.east", "Place.west"])
+
+    def test_add_moves_and_discard(self):
+        """Test that keys follow coordinate changes and removals"""
+        self.index.add("Place.sf", {"latitude": 34.05, "longitude": -118.24})
+        self.index.discard("Place.oak")
+        self.index.add("Place.none", {"latitude": "x", "longitude": 0})
+        found = self.index.within(34.05, -118.24, 10)
+        self.assertEqual(sorted(key for distance, key in found),
+                         ["Place.la", "Place.sf"])
+        self.assertEqual(len(self.index), 3)
+        self.index.clear()
+        self.assertEqual(self.index.within(34.05, -118.24, 10), [])
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test the TextIndex class"""
+    def setUp(self):
+        """Indexes the names and descriptions of a few places"""
+        self.index = TextIndex("name", "description")
+        texts = {"Place.loft": ("Cozy loft", "A cozy loft downtown"),
+                 "Place.beach": ("Beach house", "On the beach, beach view"),
+                 "Place.cabin": ("Cabin", "A cozy cabin in the woods")}
+        for key, (name, description) in texts.items():
+            self.index.add(key, {"name": name, "description": description})
+
+    def test_tokenize(self):
+        """Test that words are lowercased and split on punctuation"""
+        self.assertEqual(tokenize("Cozy, quiet LOFT!"),
+                         ["cozy", "quiet", "loft"])
+
+    def test_search_ranks_by_bm25(self):
+        """Test that more frequent and rarer words rank higher"""
+        found = self.index.search("cozy loft")
+        self.assertEqual([key for score, key in found],
+                         ["Place.loft", "Place.cabin"])
+        self.assertGreater(found[0][0], found[1][0])
+        self.assertEqual(self.index.search("BEACH", limit=1)[0][1],
+                         "Place.beach")
+        self.assertEqual(self.index.search("castle"), [])
+        self.assertEqual(len(self.index.search("cozy", limit=1)), 1)
+
+    def test_add_replaces_and_discard(self):
+        """Test that keys follow text changes and removals"""
+        self.index.add("Place.loft", {"name": "Castle"})
+        self.index.discard("Place.cabin")
+        self.index.discard("Place.missing")
+        self.assertEqual(self.index.search("cozy"), [])
+        self.assertEqual(self.index.search("castle")[0][1], "Place.loft")
+        self.index.add("Place.loft", {"name": 5})
+        self.assertEqual(len(self.index), 1)
+        self.index.clear()
+        self.assertEqual(self.index.search("beach"), [])
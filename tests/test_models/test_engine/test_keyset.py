@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""
+Contains the TestKeysetDocs and TestKeyset classes
+"""
+
+from datetime import datetime
+import inspect
+import pep8
+import unittest
+from models.engine import keyset
+from models.engine.keyset import cursor_of, parse_cursor
+from models.state import State
+
+
+class TestKeysetDocs(unittest.TestCase):
+    """Tests to check the documentation and style of keyset"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.keyset_f = inspect.getmembers(keyset, inspect.isfunction)
+
+    def test_pep8_conformance_keyset(self):
+        """Test that models/engine/keyset.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/keyset.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_keyset(self):
+        """Test that test_keyset.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_keyset.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_keyset_module_docstring(self):
+        """Test for the keyset.py module docstring"""
+        self.assertIsNot(keyset.__doc__, None,
+                         "keyset.py needs a docstring")
+
+    def test_keyset_func_docstrings(self):
+        """Test for the presence of docstrings in keyset functions"""
+        for func in self.keyset_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} function needs a docstring".format(func[0]))
+
+
+class TestKeyset(unittest.TestCase):
+    """Test the keyset cursor helpers"""
+    def test_cursor_of(self):
+        """Test the cursor of an instance and of its record"""
+        state = State(name="California")
+        cursor = (state.created_at, state.id)
+        self.assertEqual(cursor_of(state), cursor)
+        self.assertEqual(cursor_of(state.to_dict()), cursor)
+
+    def test_parse_cursor(self):
+        """Test that objects, pairs and string dates give the same cursor"""
+        state = State(name="California")
+        cursor = (state.created_at, state.id)
+        self.assertIsNone(parse_cursor(None))
+        self.assertEqual(parse_cursor(state), cursor)
+        self.assertEqual(parse_cursor(cursor), cursor)
+        created_at = state.to_dict()["created_at"]
+        self.assertEqual(parse_cursor((created_at, state.id)), cursor)
+        self.assertIsInstance(parse_cursor((created_at, ""))[0], datetime)
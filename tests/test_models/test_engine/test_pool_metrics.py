@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""
+Contains the TestPoolMetricsDocs and TestPoolMetrics classes
+"""
+
+import inspect
+import os
+import pep8
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from models.engine import pool_metrics
+from models.engine.pool_metrics import PoolMetrics, TimedQueuePool
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+class TestPoolMetricsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of PoolMetrics"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.pm_f = [func for func in
+                    inspect.getmembers(PoolMetrics, inspect.isfunction) +
+                    inspect.getmembers(TimedQueuePool, inspect.isfunction)
+                    if func[1].__module__ == pool_metrics.__name__]
+
+    def test_pep8_conformance_pool_metrics(self):
+        """Test that models/engine/pool_metrics.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/pool_metrics.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_pool_metrics(self):
+        """Test that test_pool_metrics.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_pool_metrics.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_pool_metrics_module_docstring(self):
+        """Test for the pool_metrics.py module docstring"""
+        self.assertIsNot(pool_metrics.__doc__, None,
+                         "pool_metrics.py needs a docstring")
+
+    def test_pool_metrics_func_docstrings(self):
+        """Test for the presence of docstrings in the pool_metrics classes"""
+        for func in self.pm_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """Test PoolMetrics against a SQLite database"""
+    def setUp(self):
+        """Opens a pool of a single connection to a temporary database"""
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.engine = create_engine(
+            "sqlite:///" + os.path.join(tmp, "pool.db"),
+            poolclass=TimedQueuePool, pool_size=1, max_overflow=0,
+            pool_timeout=5, connect_args={"check_same_thread": False})
+        self.addCleanup(self.engine.dispose)
+        self.metrics = PoolMetrics()
+        self.metrics.attach(self.engine)
+        factory = sessionmaker(bind=self.engine)
+        self.metrics.watch(factory)
+        self.session = scoped_session(factory)
+
+    def request(self, hold=0):
+        """runs a query in a session of this thread, closed after hold"""
+        self.session.execute(text("SELECT 1"))
+        time.sleep(hold)
+        self.metrics.closed(self.session())
+        self.session.remove()
+
+    def test_checkouts_and_sessions(self):
+        """Test that checkouts and session lifetimes are counted"""
+        self.request()
+        self.request(0.05)
+        stats = self.metrics.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["checkins"], 2)
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["sessions"], 2)
+        self.assertGreaterEqual(stats["max_session"], 0.05)
+        self.assertLess(stats["mean_session"], stats["max_session"])
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertNotIn("total_wait", stats)
+
+    def test_unused_session_not_counted(self):
+        """Test that closing a session which never began is not counted"""
+        self.metrics.closed(self.session())
+        self.assertEqual(self.metrics.stats()["sessions"], 0)
+
+    def test_wait_on_saturated_pool(self):
+        """Test that waiting for the only connection is measured"""
+        holding = threading.Event()
+
+        def hold():
+            """holds the connection for a while"""
+            self.session.execute(text("SELECT 1"))
+            holding.set()
+            time.sleep(0.2)
+            self.metrics.closed(self.session())
+            self.session.remove()
+        thread = threading.Thread(target=hold)
+        thread.start()
+        holding.wait()
+        self.assertEqual(self.metrics.stats()["checked_out"], 1)
+        self.request()
+        thread.join()
+        stats = self.metrics.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertGreaterEqual(stats["max_wait"], 0.1)
+        self.assertEqual(stats["overflow"], 0)
+
+    def test_recreated_pool_keeps_metrics(self):
+        """Test that disposing the engine keeps timing checkouts"""
+        self.request()
+        self.engine.dispose()
+        self.request()
+        self.assertIs(self.engine.pool.metrics, self.metrics)
+        self.assertEqual(self.metrics.stats()["checkouts"], 2)
+
+    def test_static_pool(self):
+        """Test that pools without limits report no size"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        metrics = PoolMetrics()
+        metrics.attach(engine)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        stats = metrics.stats()
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertIsNone(stats["size"])
+        self.assertIsNone(stats["overflow"])
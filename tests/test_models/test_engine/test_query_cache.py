@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Contains the TestQueryCacheDocs and TestQueryCache classes
+"""
+
+import inspect
+import os
+import pep8
+import time
+import unittest
+from unittest import mock
+from models.engine import query_cache
+from models.engine.query_cache import QueryCache, get_query_cache
+from sqlalchemy import Column, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+Base = declarative_base()
+
+
+class Thing(Base):
+    """a mapped class standing in for the models"""
+    __tablename__ = "things"
+    id = Column(String(60), primary_key=True)
+    name = Column(String(128))
+
+
+class TestQueryCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of QueryCache"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.qc_f = (inspect.getmembers(QueryCache, inspect.isfunction) +
+                    [("get_query_cache", get_query_cache)])
+
+    def test_pep8_conformance_query_cache(self):
+        """Test that models/engine/query_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/query_cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_query_cache(self):
+        """Test that test_query_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_query_cache.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_query_cache_module_docstring(self):
+        """Test for the query_cache.py module docstring"""
+        self.assertIsNot(query_cache.__doc__, None,
+                         "query_cache.py needs a docstring")
+
+    def test_query_cache_func_docstrings(self):
+        """Test for the presence of docstrings in QueryCache"""
+        for func in self.qc_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test the QueryCache class"""
+    def setUp(self):
+        """Builds a cache of two results"""
+        self.cache = QueryCache(max_size=2, ttl=60, max_rows=3)
+
+    def store(self, key, names, result):
+        """caches result as computed at the current generations"""
+        self.cache.put(key, names, self.cache.generation(names), result)
+
+    def test_hit_until_bumped(self):
+        """Test that a result is served until one of its classes changes"""
+        self.store("states", ("State",), ["a", "b"])
+        self.store("count", ("State", "City"), 2)
+        self.assertEqual(self.cache.get("states", ("State",)), ["a", "b"])
+        self.cache.bump(["City"])
+        self.assertEqual(self.cache.get("states", ("State",)), ["a", "b"])
+        self.assertIsNone(self.cache.get("count", ("State", "City")))
+        self.cache.bump(["State"])
+        self.assertIsNone(self.cache.get("states", ("State",)))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.assertEqual(stats["stale"], 2)
+        self.assertEqual(stats["size"], 0)
+
+    def test_stale_put_ignored(self):
+        """Test that a result computed across a bump is not cached"""
+        generations = self.cache.generation(("State",))
+        self.cache.bump(["State"])
+        self.cache.put("states", ("State",), generations, ["a"])
+        self.assertIsNone(self.cache.get("states", ("State",)))
+        generations = self.cache.generation(("State",))
+        self.cache.clear()
+        self.cache.put("states", ("State",), generations, ["a"])
+        self.assertIsNone(self.cache.get("states", ("State",)))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used result is evicted"""
+        self.store(1, ("State",), [1])
+        self.store(2, ("State",), [2])
+        self.cache.get(1, ("State",))
+        self.store(3, ("State",), [3])
+        self.assertEqual(self.cache.get(1, ("State",)), [1])
+        self.assertIsNone(self.cache.get(2, ("State",)))
+        stats = self.cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["max_size"], 2)
+
+    def test_bounds(self):
+        """Test that large results and disabled caches keep nothing"""
+        self.store("big", ("State",), [1, 2, 3, 4])
+        self.assertIsNone(self.cache.get("big", ("State",)))
+        self.cache.max_size = 0
+        self.store("small", ("State",), [1])
+        self.assertIsNone(self.cache.get("small", ("State",)))
+
+    def test_ttl(self):
+        """Test that results expire after ttl seconds"""
+        self.cache.ttl = 0.01
+        self.store("states", ("State",), [])
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("states", ("State",)))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_watch_bumps_writes(self):
+        """Test that flushed and committed classes are bumped"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine, expire_on_commit=False)
+        self.cache.watch(factory)
+        self.store("things", ("Thing",), [])
+        with factory() as session:
+            session.add(Thing(id="0", name="thing0"))
+            session.flush()
+            self.assertEqual(session.info["result_classes"], {"Thing"})
+            self.assertIsNone(self.cache.get("things", ("Thing",)))
+            generations = self.cache.generation(("Thing",))
+            session.commit()
+            self.assertNotIn("result_classes", session.info)
+        self.assertNotEqual(self.cache.generation(("Thing",)), generations)
+        with factory() as session:
+            session.get(Thing, "0").name = "x"
+            session.flush()
+            session.rollback()
+            self.assertNotIn("result_classes", session.info)
+
+    def test_get_query_cache(self):
+        """Test that the environment sets the cache up"""
+        with mock.patch.dict(os.environ, {"HBNB_QUERY_CACHE_SIZE": "0"}):
+            self.assertIsNone(get_query_cache())
+        with mock.patch.dict(os.environ, {"HBNB_QUERY_CACHE_SIZE": "8",
+                                          "HBNB_QUERY_CACHE_TTL": "1.5",
+                                          "HBNB_QUERY_CACHE_ROWS": "10"}):
+            cache = get_query_cache()
+        self.assertEqual((cache.max_size, cache.ttl, cache.max_rows),
+                         (8, 1.5, 10))
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+Contains the TestSessionCacheDocs and TestSessionCache classes
+"""
+
+import inspect
+import pep8
+import unittest
+from models.engine import session_cache
+from models.engine.session_cache import SessionCache
+from sqlalchemy import Column, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+Base = declarative_base()
+
+
+class Thing(Base):
+    """a mapped class standing in for the models"""
+    __tablename__ = "things"
+    id = Column(String(60), primary_key=True)
+    name = Column(String(128))
+
+
+class IdCache(SessionCache):
+    """a cache recording the ids it expires"""
+    info_key = "ids"
+    max_size = 8
+
+    def __init__(self):
+        """Builds a cache that expired nothing yet"""
+        self.expired = []
+
+    def _written(self, session):
+        """returns the ids of the new objects"""
+        return {obj.id for obj in session.new}
+
+    def _expire(self, ids):
+        """records the expired ids"""
+        self.expired.append(ids)
+
+    def _counts(self):
+        """returns fixed counts"""
+        return {"hits": 3, "misses": 1}, 2
+
+
+class TestSessionCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of SessionCache"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.sc_f = inspect.getmembers(SessionCache, inspect.isfunction)
+
+    def test_pep8_conformance_session_cache(self):
+        """Test that models/engine/session_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/session_cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_session_cache(self):
+        """Test that test_session_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path_to_test = 'tests/test_models/test_engine/test_session_cache.py'
+        result = pep8s.check_files([path_to_test])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_session_cache_module_docstring(self):
+        """Test for the session_cache.py module docstring"""
+        self.assertIsNot(session_cache.__doc__, None,
+                         "session_cache.py needs a docstring")
+
+    def test_session_cache_func_docstrings(self):
+        """Test for the presence of docstrings in SessionCache"""
+        for func in self.sc_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestSessionCache(unittest.TestCase):
+    """Test the SessionCache class"""
+    def setUp(self):
+        """Watches the sessions of an in-memory database"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        self.factory = sessionmaker(bind=engine)
+        self.cache = IdCache()
+        self.cache.watch(self.factory)
+
+    def test_expired_on_flush_and_commit(self):
+        """Test that writes are expired when flushed and when committed"""
+        with self.factory() as session:
+            session.add(Thing(id="0"))
+            session.flush()
+            self.assertEqual(session.info["ids"], {"0"})
+            self.assertEqual(self.cache.expired, [{"0"}])
+            session.commit()
+            self.assertNotIn("ids", session.info)
+        self.assertEqual(self.cache.expired, [{"0"}, {"0"}])
+
+    def test_rollback_forgets_writes(self):
+        """Test that a rolled back transaction is not expired again"""
+        with self.factory() as session:
+            session.add(Thing(id="1"))
+            session.flush()
+            session.rollback()
+            self.assertNotIn("ids", session.info)
+        self.assertEqual(self.cache.expired, [{"1"}])
+
+    def test_stats(self):
+        """Test that stats adds the size and the hit ratio to the counts"""
+        self.assertEqual(self.cache.stats(),
+                         {"hits": 3, "misses": 1, "size": 2, "max_size": 8,
+                          "hit_ratio": 0.75})
+
+
+if __name__ == "__main__":
+    unittest.main()
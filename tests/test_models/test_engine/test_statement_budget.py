@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+Contains the TestStatementBudgetDocs and TestStatementBudget classes
+"""
+
+import inspect
+import pep8
+import threading
+import unittest
+from models.engine import statement_budget
+from models.engine.statement_budget import StatementBudget
+from models.engine.statement_budget import StatementBudgetExceeded
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+
+class TestStatementBudgetDocs(unittest.TestCase):
+    """Tests to check the documentation and style of StatementBudget"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.sb_f = inspect.getmembers(StatementBudget, inspect.isfunction)
+
+    def test_pep8_conformance_statement_budget(self):
+        """Test that models/engine/statement_budget.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/statement_budget.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_statement_budget(self):
+        """Test that test_statement_budget.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        path = 'tests/test_models/test_engine/test_statement_budget.py'
+        result = pep8s.check_files([path])
+        self.assertEqual(result.total_errors, 0, result.messages)
+
+    def test_statement_budget_module_docstring(self):
+        """Test for the statement_budget.py module docstring"""
+        self.assertIsNot(statement_budget.__doc__, None,
+                         "statement_budget.py needs a docstring")
+
+    def test_statement_budget_func_docstrings(self):
+        """Test for the presence of docstrings in StatementBudget"""
+        for func in self.sb_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestStatementBudget(unittest.TestCase):
+    """Test the StatementBudget class on an in-memory SQLite database"""
+    def setUp(self):
+        """Opens the database"""
+        self.engine = create_engine("sqlite://", poolclass=StaticPool,
+                                    connect_args={"check_same_thread": False})
+        self.addCleanup(self.engine.dispose)
+
+    def run_statements(self, count):
+        """runs count statements"""
+        with self.engine.connect() as connection:
+            for i in range(count):
+                connection.execute(text("SELECT 1"))
+
+    def test_within_budget(self):
+        """Test that a block within its budget passes and is recorded"""
+        with StatementBudget(self.engine, 2) as budget:
+            self.run_statements(2)
+        self.assertEqual(budget.statements, ["SELECT 1", "SELECT 1"])
+        self.run_statements(1)
+        self.assertEqual(len(budget.statements), 2)
+
+    def test_over_budget(self):
+        """Test that a block over its budget fails with its statements"""
+        with self.assertRaises(StatementBudgetExceeded) as error:
+            with StatementBudget(self.engine, 2):
+                self.run_statements(3)
+        self.assertIn("3 statements run, 2 allowed", str(error.exception))
+        self.assertIsInstance(error.exception, AssertionError)
+
+    def test_block_error_wins(self):
+        """Test that an error raised by the block is not replaced"""
+        with self.assertRaises(KeyError):
+            with StatementBudget(self.engine, 0):
+                self.run_statements(1)
+                raise KeyError("block")
+
+    def test_other_threads_not_counted(self):
+        """Test that statements of other threads do not count"""
+        with StatementBudget(self.engine, 1) as budget:
+            thread = threading.Thread(target=self.run_statements, args=(3,))
+            thread.start()
+            thread.join()
+            self.run_statements(1)
+        self.assertEqual(len(budget.statements), 1)
+
+    def test_several_engines(self):
+        """Test that the statements of every engine are counted"""
+        other = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(other.dispose)
+        with StatementBudget([self.engine, other], 2) as budget:
+            self.run_statements(1)
+            with other.connect() as connection:
+                connection.execute(text("SELECT 2"))
+        self.assertEqual(budget.statements, ["SELECT 1", "SELECT 2"])